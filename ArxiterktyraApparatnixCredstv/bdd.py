@@ -0,0 +1,259 @@
+"""
+Упорядоченные сокращенные диаграммы двоичных решений (ROBDD).
+
+При фиксированном порядке переменных у каждой логической функции ровно
+одна сокращенная диаграмма, поэтому две функции, построенные в одном
+менеджере, эквивалентны тогда и только тогда, когда их корни совпадают.
+Размер диаграммы зависит от структуры функции, а не от 2^N строк
+таблицы истинности, поэтому проверка работает и для десятков входов.
+"""
+from boolexpr import parse, variables as expression_variables
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD:
+    """Менеджер узлов: узел - (уровень переменной, младший, старший потомок)"""
+
+    def __init__(self, variables):
+        self.variables = list(variables)
+        self.level = {name: i for i, name in enumerate(self.variables)}
+        terminal = len(self.variables)
+        self.nodes = [(terminal, None, None), (terminal, None, None)]
+        self._unique = {}
+        self._ite_cache = {}
+
+    def _make(self, level, low, high):
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self._unique[key] = node
+        return node
+
+    def var(self, name):
+        """Диаграмма для одной переменной"""
+        if name not in self.level:
+            raise ValueError(f"Переменная '{name}' не входит в порядок BDD")
+        return self._make(self.level[name], FALSE, TRUE)
+
+    def _cofactors(self, node, level):
+        node_level, low, high = self.nodes[node]
+        if node_level == level:
+            return low, high
+        return node, node
+
+    def ite(self, f, g, h):
+        """if f then g else h - базовая операция, через которую выражаются остальные"""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        result = self._ite_cache.get(key)
+        if result is not None:
+            return result
+        level = min(self.nodes[f][0], self.nodes[g][0], self.nodes[h][0])
+        f0, f1 = self._cofactors(f, level)
+        g0, g1 = self._cofactors(g, level)
+        h0, h1 = self._cofactors(h, level)
+        result = self._make(level, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self._ite_cache[key] = result
+        return result
+
+    def negate(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def conj(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def disj(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def xor(self, f, g):
+        return self.ite(f, self.negate(g), g)
+
+    def from_tree(self, node):
+        """Строит диаграмму по дереву boolexpr"""
+        # Обход без рекурсии: длинные цепочки операций дают глубокие деревья.
+        # results - стек диаграмм уже построенных поддеревьев
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, ready = stack.pop()
+            kind = node[0]
+            if kind == "var":
+                results.append(self.var(node[1]))
+            elif kind == "const":
+                results.append(TRUE if node[1] else FALSE)
+            elif not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node[1:]))
+            elif kind == "not":
+                results.append(self.negate(results.pop()))
+            else:
+                right = results.pop()
+                left = results.pop()
+                if kind == "and":
+                    results.append(self.conj(left, right))
+                elif kind == "or":
+                    results.append(self.disj(left, right))
+                else:
+                    results.append(self.xor(left, right))
+        return results[0]
+
+    def cube(self, literals):
+        """Конъюнкция литералов: literals - словарь {переменная: значение}"""
+        result = TRUE
+        for name in sorted(literals, key=self.level.__getitem__, reverse=True):
+            variable = self.var(name)
+            result = self.conj(variable if literals[name] else self.negate(variable), result)
+        return result
+
+    def implies(self, f, g):
+        """Проверяет f -> g (f не имеет выполняющих наборов вне g)"""
+        return self.conj(f, self.negate(g)) == FALSE
+
+    def any_sat(self, f):
+        """
+        Возвращает один выполняющий набор {переменная: значение} или None.
+        Переменные, от которых результат не зависит, получают False.
+        """
+        if f == FALSE:
+            return None
+        assignment = dict.fromkeys(self.variables, False)
+        while f != TRUE:
+            level, low, high = self.nodes[f]
+            name = self.variables[level]
+            if low != FALSE:
+                assignment[name] = False
+                f = low
+            else:
+                assignment[name] = True
+                f = high
+        return assignment
+
+    def sat_count(self, f):
+        """Число выполняющих наборов по всем переменным порядка"""
+        memo = {}
+        total = len(self.variables)
+
+        def count(node):
+            if node == FALSE:
+                return 0, total
+            if node == TRUE:
+                return 1, total
+            if node in memo:
+                return memo[node]
+            level, low, high = self.nodes[node]
+            result = 0
+            for child in (low, high):
+                child_count, child_level = count(child)
+                result += child_count << (child_level - level - 1)
+            memo[node] = (result, level)
+            return memo[node]
+
+        result, level = count(f)
+        return result << level
+
+    def paths(self, f):
+        """Генератор кубов {переменная: значение} - путей от f до TRUE"""
+        if f == FALSE:
+            return
+        stack = [(f, {})]
+        while stack:
+            node, literals = stack.pop()
+            if node == TRUE:
+                yield literals
+                continue
+            level, low, high = self.nodes[node]
+            name = self.variables[level]
+            for value, child in ((True, high), (False, low)):
+                if child != FALSE:
+                    stack.append((child, {**literals, name: value}))
+
+    def isop(self, lower, upper=None):
+        """
+        Неизбыточное покрытие кубами (алгоритм Минато - Морреале): список
+        кубов {переменная: значение}, объединение которых лежит между
+        lower и upper. Работает по узлам BDD, без перебора минтермов.
+        """
+        if upper is None:
+            upper = lower
+        memo = {}
+
+        def cover(lower, upper):
+            if lower == FALSE:
+                return [], FALSE
+            if upper == TRUE:
+                return [{}], TRUE
+            key = (lower, upper)
+            if key in memo:
+                return memo[key]
+            level = min(self.nodes[lower][0], self.nodes[upper][0])
+            name = self.variables[level]
+            lower0, lower1 = self._cofactors(lower, level)
+            upper0, upper1 = self._cofactors(upper, level)
+            cubes0, f0 = cover(self.conj(lower0, self.negate(upper1)), upper0)
+            cubes1, f1 = cover(self.conj(lower1, self.negate(upper0)), upper1)
+            rest = self.disj(self.conj(lower0, self.negate(f0)),
+                             self.conj(lower1, self.negate(f1)))
+            cubes_rest, f_rest = cover(rest, self.conj(upper0, upper1))
+            cubes = ([{**cube, name: False} for cube in cubes0]
+                     + [{**cube, name: True} for cube in cubes1]
+                     + cubes_rest)
+            function = self.disj(self._make(level, f0, f1), f_rest)
+            memo[key] = (cubes, function)
+            return memo[key]
+
+        return cover(lower, upper)[0]
+
+    def size(self, f):
+        """Число внутренних узлов диаграммы f"""
+        seen = set()
+        stack = [f]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE or node in seen:
+                continue
+            seen.add(node)
+            _, low, high = self.nodes[node]
+            stack.extend((low, high))
+        return len(seen)
+
+
+def _tree(expression):
+    return parse(expression) if isinstance(expression, str) else expression
+
+
+def build(expression, variables=None):
+    """Строит BDD для выражения; возвращает (менеджер, корень)"""
+    tree = _tree(expression)
+    manager = BDD(variables if variables is not None else expression_variables(tree))
+    return manager, manager.from_tree(tree)
+
+
+def equivalent(first, second, variables=None):
+    """
+    Проверяет эквивалентность двух выражений без перебора таблицы
+    истинности. Возвращает (True, None) или (False, контрпример), где
+    контрпример - набор значений переменных, на котором выражения различаются.
+    """
+    first, second = _tree(first), _tree(second)
+    if variables is None:
+        variables = expression_variables(first)
+        variables += [name for name in expression_variables(second) if name not in variables]
+    manager = BDD(variables)
+    f = manager.from_tree(first)
+    g = manager.from_tree(second)
+    if f == g:
+        return True, None
+    return False, manager.any_sat(manager.xor(f, g))
@@ -0,0 +1,146 @@
+"""
+Компиляция логических выражений в функции Python.
+
+Выражение разбирается один раз и превращается в исходный текст функции,
+состоящий только из побитовых операций & | ^ над целыми числами.
+Отрицание записывается как x ^ m, где m - маска из единиц нужной ширины:
+при m = 1 функция вычисляет одну строку, при m = 2^n - 1 - сразу n
+упакованных строк (бит j каждого аргумента - j-я строка).
+
+Скомпилированные выражения хранятся в ограниченном LRU-кэше по тексту.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+from boolexpr import parse, to_string, variables as expression_variables
+
+CACHE_SIZE = 256
+
+_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_FROM_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+_SYMBOLS = {"and": "&", "or": "|", "xor": "^"}
+
+
+def _generate(tree, names):
+    """
+    Строит тело функции без вложенных скобок: по одному присваиванию
+    tN = a op b на вентиль в порядке обхода. Так длина цепочки операций не
+    упирается в ограничения парсера Python на вложенность и рекурсию.
+    Возвращает (строки присваиваний, выражение результата).
+    """
+    lines = []
+    results = {}
+    stack = [(tree, False)]
+    while stack:
+        node, ready = stack.pop()
+        kind = node[0]
+        if kind == "var":
+            results[id(node)] = names[node[1]]
+        elif kind == "const":
+            results[id(node)] = "_m" if node[1] else "0"
+        elif not ready:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node[1:]))
+        elif id(node) not in results:
+            operands = [results[id(child)] for child in node[1:]]
+            target = f"t{len(lines)}"
+            if kind == "not":
+                lines.append(f"{target} = {operands[0]} ^ _m")
+            else:
+                lines.append(f"{target} = {operands[0]} {_SYMBOLS[kind]} {operands[1]}")
+            results[id(node)] = target
+    return lines, results[id(tree)]
+
+
+class CompiledExpression:
+    """
+    Скомпилированное выражение с фиксированным порядком переменных.
+    expression - текст или уже разобранное дерево boolexpr.
+    """
+
+    def __init__(self, expression, variables=None):
+        if isinstance(expression, str):
+            tree = parse(expression)
+            text = expression
+        else:
+            tree = expression
+            text = to_string(tree)
+        used = expression_variables(tree)
+        if variables is None:
+            variables = used
+        else:
+            variables = list(variables)
+            missing = [name for name in used if name not in variables]
+            if missing:
+                raise ValueError(f"Не заданы переменные: {', '.join(missing)}")
+        self.text = text
+        self.variables = tuple(variables)
+        # Аргументы переименовываются в v0, v1, ..., чтобы имена переменных
+        # выражения не конфликтовали с ключевыми словами Python и маской _m
+        names = {name: f"v{i}" for i, name in enumerate(self.variables)}
+        arguments = ", ".join(["_m"] + list(names.values()))
+        lines, result = _generate(tree, names)
+        body = "".join(f"    {line}\n" for line in lines)
+        self.source = f"def _packed({arguments}):\n{body}    return {result}\n"
+        namespace = {}
+        exec(compile(self.source, "<boolexpr>", "exec"), namespace)
+        self.packed = namespace["_packed"]
+
+    def __call__(self, *values, **named):
+        """Вычисляет выражение для одной строки; значения - bool или 0/1"""
+        if named:
+            values = tuple(named[name] for name in self.variables)
+        return bool(self.packed(1, *values))
+
+    def evaluate_packed(self, columns, width):
+        """
+        Вычисляет width строк за один проход: columns - по одному целому на
+        переменную, бит j которого - значение переменной в строке j.
+        """
+        return self.packed((1 << width) - 1, *columns)
+
+    def evaluate_many(self, inputs):
+        """
+        Вычисляет выражение для последовательности строк (кортежей значений
+        в порядке self.variables, значения - bool или 0/1) и возвращает
+        список bool. Строки упаковываются в столбцы-целые и вычисляются
+        одной операцией на каждый вентиль.
+        """
+        rows = inputs if isinstance(inputs, (list, tuple)) else list(inputs)
+        width = len(rows)
+        if width == 0:
+            return []
+        columns = []
+        for i in range(len(self.variables)):
+            # Строка 0 должна оказаться в младшем бите, поэтому строки
+            # перебираются с конца; байты 0/1 переводятся в текст "01"
+            bits = bytes(map(itemgetter(i), reversed(rows))).translate(_TO_DIGITS)
+            columns.append(int(bits, 2))
+        result = self.evaluate_packed(columns, width)
+        bits = format(result, f"0{width}b").encode("ascii")[::-1]
+        return list(map(bool, bits.translate(_FROM_DIGITS)))
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r}, variables={list(self.variables)!r})"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_cached(text, variables):
+    return CompiledExpression(text, variables)
+
+
+def compile_expression(text, variables=None):
+    """Возвращает скомпилированное выражение, используя кэш по тексту"""
+    return _compile_cached(text, tuple(variables) if variables is not None else None)
+
+
+def evaluate_many(text, inputs, variables=None):
+    """Компилирует (или берет из кэша) выражение и вычисляет его для всех строк"""
+    return compile_expression(text, variables).evaluate_many(inputs)
+
+
+def cache_info():
+    """Статистика кэша скомпилированных выражений"""
+    return _compile_cached.cache_info()
@@ -0,0 +1,163 @@
+"""
+Разбор логических выражений.
+
+Поддерживаются операции not/and/xor/or (по убыванию приоритета), их
+символьные формы ~ ! & ^ |, скобки, константы 0/1/True/False и
+переменные - идентификаторы. Результат разбора - дерево из кортежей:
+('var', имя), ('const', bool), ('not', x), ('and', x, y), ('xor', x, y),
+('or', x, y).
+"""
+import re
+
+_TOKEN = re.compile(r"\s*(?:(?P<name>[A-Za-z_][A-Za-z0-9_]*)|(?P<const>[01])|(?P<op>[()~!&^|]))")
+
+_KEYWORDS = {
+    "not": "not", "and": "and", "xor": "xor", "or": "or",
+    "true": True, "false": False,
+}
+_SYMBOLS = {"~": "not", "!": "not", "&": "and", "^": "xor", "|": "or"}
+
+# Бинарные операции по возрастанию приоритета
+_BINARY_LEVELS = ["or", "xor", "and"]
+
+
+class ExpressionError(ValueError):
+    """Синтаксическая ошибка в логическом выражении"""
+
+
+def tokenize(text):
+    """Разбивает выражение на лексемы (вид, значение, позиция)"""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            pos += len(text[pos:]) - len(text[pos:].lstrip())
+            raise ExpressionError(f"Неожиданный символ '{text[pos]}' в позиции {pos}")
+        start = match.start(match.lastgroup)
+        if match.lastgroup == "name":
+            word = match.group("name")
+            keyword = _KEYWORDS.get(word.lower())
+            if keyword is None:
+                tokens.append(("var", word, start))
+            elif isinstance(keyword, bool):
+                tokens.append(("const", keyword, start))
+            else:
+                tokens.append(("op", keyword, start))
+        elif match.lastgroup == "const":
+            tokens.append(("const", match.group("const") == "1", start))
+        else:
+            symbol = match.group("op")
+            tokens.append(("op", _SYMBOLS.get(symbol, symbol), start))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index]
+        return ("end", None, len(self.text))
+
+    def take(self):
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Пустое выражение")
+        node = self.binary(0)
+        kind, value, pos = self.peek()
+        if kind != "end":
+            raise ExpressionError(f"Лишняя лексема '{value}' в позиции {pos}")
+        return node
+
+    def binary(self, level):
+        if level == len(_BINARY_LEVELS):
+            return self.unary()
+        operation = _BINARY_LEVELS[level]
+        node = self.binary(level + 1)
+        while self.peek()[:2] == ("op", operation):
+            self.take()
+            node = (operation, node, self.binary(level + 1))
+        return node
+
+    def unary(self):
+        kind, value, pos = self.take()
+        if kind == "op" and value == "not":
+            return ("not", self.unary())
+        if kind == "op" and value == "(":
+            node = self.binary(0)
+            closing = self.take()
+            if closing[:2] != ("op", ")"):
+                raise ExpressionError(f"Ожидалась ')' в позиции {closing[2]}")
+            return node
+        if kind == "var":
+            return ("var", value)
+        if kind == "const":
+            return ("const", value)
+        if kind == "end":
+            raise ExpressionError("Неожиданный конец выражения")
+        raise ExpressionError(f"Неожиданная лексема '{value}' в позиции {pos}")
+
+
+def parse(text):
+    """Разбирает выражение и возвращает дерево"""
+    return _Parser(text).parse()
+
+
+def variables(node):
+    """Возвращает переменные дерева в порядке первого появления"""
+    found = []
+    seen = set()
+    # Обход без рекурсии: длинные цепочки операций дают глубокие деревья
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node[0] == "var":
+            if node[1] not in seen:
+                seen.add(node[1])
+                found.append(node[1])
+        elif node[0] != "const":
+            stack.extend(reversed(node[1:]))
+    return found
+
+
+_PRECEDENCE = {"or": 1, "xor": 2, "and": 3, "not": 4, "var": 5, "const": 5}
+
+
+def to_string(node, parent=0):
+    """Печатает дерево обратно в текстовую форму с минимумом скобок"""
+    # Обход без рекурсии, как в variables(); results - тексты готовых поддеревьев
+    results = []
+    stack = [(node, parent, False)]
+    while stack:
+        node, parent, ready = stack.pop()
+        kind = node[0]
+        if kind == "var":
+            results.append(node[1])
+            continue
+        if kind == "const":
+            results.append("1" if node[1] else "0")
+            continue
+        level = _PRECEDENCE[kind]
+        if not ready:
+            stack.append((node, parent, True))
+            stack.extend((child, level, False) for child in reversed(node[1:]))
+            continue
+        count = len(node) - 1
+        parts = results[-count:]
+        del results[-count:]
+        if kind == "not":
+            text = "not " + parts[0]
+        else:
+            text = f" {kind} ".join(parts)
+        results.append(f"({text})" if level < parent else text)
+    return results[0]
\ No newline at end of file
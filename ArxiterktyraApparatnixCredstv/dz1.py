@@ -1,46 +1,56 @@
+import sys
+
+# Модули таблиц и минимизации (и argparse) импортируются в функциях,
+# которые их используют: импорт dz1 не должен тянуть парсер, BDD и
+# минимизатор
+
+
+# Таблица операций: выбор операции - один поиск в словаре
+_OPERATIONS = {
+    'and': lambda a, b: a and b,
+    'or': lambda a, b: a or b,
+    'not': lambda a, b: not a,
+}
+
+
 def bool_calculator(a, b, operation):
     """
     Выполняет логические операции над булевыми значениями.
+    Для составных выражений и многократного вычисления используйте
+    bool_compiler.compile_expression().
     """
-    if operation == 'and':
-        return a and b
-    elif operation == 'or':
-        return a or b
-    elif operation == 'not':
-        return not a
-    else:
+    function = _OPERATIONS.get(operation)
+    if function is None:
         return None
+    return function(a, b)
 
 
-def truth_table_generator():
+def truth_table_generator(expression="(A and not B) or (not A and B)"):
     """
-    Генерирует и выводит таблицу истинности для выражения F = (A and not B) or (not A and B)
+    Генерирует и выводит таблицу истинности для выражения (по умолчанию
+    F = (A and not B) or (not A and B)). Для потоковой обработки без
+    вывода используйте truth_table.evaluate_chunks() или iter_rows().
     """
-    print(" A | B | F")
-    print("-----------")
-    
-    for a in [False, True]:
-        for b in [False, True]:
-            f = (a and not b) or (not a and b)
-            a_display = 1 if a else 0
-            b_display = 1 if b else 0
-            f_display = 1 if f else 0
-            print(f" {a_display} | {b_display} | {f_display}")
+    from truth_table import print_table
 
+    print_table(expression)
 
-def print_circuit():
-    """
-    Визуализирует логическую схему для выражения F = (A and not B) or (not A and B)
+
+def print_circuit(expression="(A and not B) or (not A and B)"):
     """
-    circuit = """
-     A ---[NOT]--\\
-                  > [OR] --- F
-     B ---[NOT]--/
+    Визуализирует логическую схему для выражения (по умолчанию
+    F = (A and not B) or (not A and B)). Схема строится по
+    минимизированной ДНФ: инверторы, вентили AND и общий OR.
     """
-    print(circuit)
+    from minimize import draw_circuit, minimize, terms_to_string
+
+    _, terms = minimize(expression)
+    print(f"F = {terms_to_string(terms)}")
+    print()
+    print(draw_circuit(terms))
 
 
-def main():
+def demo():
     print("=== ПРАКТИЧЕСКОЕ ЗАДАНИЕ: ВАЛИДАТОР ЛОГИЧЕСКИХ ВЫРАЖЕНИЙ ===\n")
     
     print("1. Базовый калькулятор:")
@@ -57,4 +67,32 @@ def main():
     print("3. Визуализация логической схемы:")
     print_circuit()
 
-main()
\ No newline at end of file
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Валидатор логических выражений")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("demo", help="все задания по порядку (по умолчанию)")
+    calc = commands.add_parser("calc", help="базовый калькулятор")
+    calc.add_argument("a", choices=["true", "false"])
+    calc.add_argument("operation", choices=sorted(_OPERATIONS))
+    calc.add_argument("b", nargs="?", choices=["true", "false"], default="false")
+    table = commands.add_parser("truth-table", help="таблица истинности выражения")
+    table.add_argument("expression", nargs="?", default="(A and not B) or (not A and B)")
+    circuit = commands.add_parser("circuit", help="логическая схема по минимальной ДНФ")
+    circuit.add_argument("expression", nargs="?", default="(A and not B) or (not A and B)")
+    args = parser.parse_args(argv)
+
+    if args.command in (None, "demo"):
+        demo()
+    elif args.command == "calc":
+        print(bool_calculator(args.a == "true", args.b == "true", args.operation))
+    elif args.command == "truth-table":
+        truth_table_generator(args.expression)
+    else:
+        print_circuit(args.expression)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,243 @@
+"""
+Минимизация логических выражений в дизъюнктивную нормальную форму.
+
+Результат - список термов, терм - список литералов (переменная, инверсия).
+Для небольшого числа переменных используется метод Куайна - Мак-Класки
+по минтермам таблицы истинности. Для большего числа переменных минтермы
+не перечисляются: начальное покрытие строится по BDD, после чего
+по образцу Espresso каждый куб расширяется (убираются лишние литералы),
+а избыточные кубы удаляются. Обе проверки выполняются на BDD.
+"""
+from bdd import FALSE, TRUE, BDD
+from boolexpr import parse, variables as expression_variables
+from truth_table import true_rows
+
+# До этого числа переменных используется точный перебор минтермов
+QM_MAX_VARIABLES = 12
+
+
+def prime_implicants(minterms):
+    """
+    Находит простые импликанты методом Куайна - Мак-Класки.
+    Куб - пара (биты, маска): биты маски - безразличные позиции.
+    """
+    current = {(minterm, 0) for minterm in minterms}
+    primes = set()
+    while current:
+        groups = {}
+        for bits, mask in current:
+            groups.setdefault((mask, bits.bit_count()), []).append(bits)
+        merged = set()
+        used = set()
+        for (mask, ones), members in groups.items():
+            neighbours = groups.get((mask, ones + 1), [])
+            for low in members:
+                for high in neighbours:
+                    difference = low ^ high
+                    # Склеиваются кубы, отличающиеся ровно в одном бите
+                    if difference & (difference - 1) == 0:
+                        merged.add((low, mask | difference))
+                        used.add((low, mask))
+                        used.add((high, mask))
+        primes |= current - used
+        current = merged
+    return primes
+
+
+def _covers(cube, minterm):
+    bits, mask = cube
+    return (minterm & ~mask) == bits
+
+
+def select_cover(primes, minterms):
+    """
+    Выбирает покрытие минтермов: сначала существенные импликанты,
+    затем жадно импликанты, покрывающие больше всего оставшихся минтермов.
+    Для каждой импликанты хранится число еще не покрытых ею минтермов;
+    при покрытии минтерма уменьшаются только счетчики его импликант.
+    """
+    remaining = set(minterms)
+    # Минтерм -> покрывающие его импликанты и импликанта -> ее минтермы
+    covering = {minterm: [] for minterm in remaining}
+    covered = {}
+    for cube in primes:
+        if cube in covered:
+            continue
+        covered[cube] = [minterm for minterm in remaining if _covers(cube, minterm)]
+        for minterm in covered[cube]:
+            covering[minterm].append(cube)
+    counts = {cube: len(cube_minterms) for cube, cube_minterms in covered.items()}
+    cover = []
+
+    def take(cube):
+        cover.append(cube)
+        for minterm in covered[cube]:
+            if minterm in remaining:
+                remaining.remove(minterm)
+                for other in covering[minterm]:
+                    counts[other] -= 1
+
+    essential = []
+    for minterm, cubes in covering.items():
+        if len(cubes) == 1 and cubes[0] not in essential:
+            essential.append(cubes[0])
+    for cube in essential:
+        take(cube)
+    candidates = sorted(covered, key=lambda cube: (-cube[1].bit_count(), cube))
+    while remaining:
+        take(max(candidates, key=counts.__getitem__))
+    return cover
+
+
+def _cube_to_term(cube, variables):
+    bits, mask = cube
+    count = len(variables)
+    term = []
+    for i, name in enumerate(variables):
+        bit = 1 << (count - 1 - i)
+        if not mask & bit:
+            term.append((name, not bits & bit))
+    return term
+
+
+def _sorted_terms(terms):
+    # Прямой литерал раньше инверсного: (A and not B) перед (not A and B)
+    return sorted(terms)
+
+
+def quine_mccluskey(tree, variables):
+    """Минимизация по минтермам таблицы истинности"""
+    minterms = list(true_rows(tree, variables))
+    if not minterms:
+        return []
+    primes = prime_implicants(minterms)
+    cover = select_cover(primes, minterms)
+    return _sorted_terms(_cube_to_term(cube, variables) for cube in cover)
+
+
+def espresso(tree, variables):
+    """
+    Эвристическая минимизация без перечисления минтермов: начальное
+    неизбыточное покрытие строится по BDD, затем кубы расширяются и
+    избыточные удаляются (EXPAND и IRREDUNDANT).
+    """
+    manager = BDD(variables)
+    function = manager.from_tree(tree)
+    if function == FALSE:
+        return []
+    if function == TRUE:
+        return [[]]
+
+    cubes = []
+    for literals in manager.isop(function):
+        # EXPAND: убираем литералы, пока куб остается внутри функции
+        for name in sorted(literals, key=manager.level.__getitem__):
+            trial = {key: value for key, value in literals.items() if key != name}
+            if manager.implies(manager.cube(trial), function):
+                literals = trial
+        if literals not in cubes:
+            cubes.append(literals)
+
+    # IRREDUNDANT: удаляем кубы, покрытые остальными (сначала самые узкие)
+    cubes.sort(key=len, reverse=True)
+    kept = list(cubes)
+    for literals in cubes:
+        others = FALSE
+        for other in kept:
+            if other is not literals:
+                others = manager.disj(others, manager.cube(other))
+        if manager.implies(manager.cube(literals), others):
+            kept.remove(literals)
+
+    return _sorted_terms([(name, not literals[name]) for name in variables if name in literals]
+                         for literals in kept)
+
+
+def minimize(expression, variables=None, method="auto"):
+    """
+    Минимизирует выражение и возвращает (переменные, термы ДНФ).
+    method: "qm", "espresso" или "auto" (qm до QM_MAX_VARIABLES переменных).
+    Пустой список термов означает константу 0, терм без литералов - 1.
+    """
+    tree = parse(expression) if isinstance(expression, str) else expression
+    if variables is None:
+        variables = expression_variables(tree)
+    variables = list(variables)
+    if method == "auto":
+        method = "qm" if len(variables) <= QM_MAX_VARIABLES else "espresso"
+    if method == "qm":
+        return variables, quine_mccluskey(tree, variables)
+    if method == "espresso":
+        return variables, espresso(tree, variables)
+    raise ValueError(f"Неизвестный метод минимизации: {method}")
+
+
+def terms_to_string(terms):
+    """Записывает ДНФ в синтаксисе boolexpr"""
+    if not terms:
+        return "0"
+    if any(not term for term in terms):
+        return "1"
+    products = []
+    for term in terms:
+        literals = [f"not {name}" if negated else name for name, negated in term]
+        product = " and ".join(literals)
+        products.append(f"({product})" if len(terms) > 1 and len(literals) > 1 else product)
+    return " or ".join(products)
+
+
+def minimize_expression(expression, variables=None, method="auto"):
+    """Возвращает минимизированное выражение в виде строки"""
+    return terms_to_string(minimize(expression, variables, method)[1])
+
+
+def draw_circuit(terms, output="F"):
+    """
+    Рисует ASCII-схему ДНФ: инверторы на входах, вентиль AND на каждый
+    терм из нескольких литералов и общий вентиль OR.
+    """
+    if not terms:
+        return f" {output} = 0"
+    if any(not term for term in terms):
+        return f" {output} = 1"
+
+    name_width = max(len(name) for term in terms for name, _ in term)
+
+    def literal(name, negated):
+        return f" {name.ljust(name_width)} " + ("--[NOT]--" if negated else "---------")
+
+    literal_width = name_width + 11
+    gate = "|-[AND]--"
+    or_column = literal_width + len(gate)
+
+    # Строка: (текст до столбца OR, является ли строка выходом терма)
+    rows = []
+    block_ends = []
+    for term in terms:
+        if len(term) == 1:
+            rows.append((literal(*term[0]).ljust(or_column, "-"), True))
+        else:
+            middle = len(term) // 2
+            for i, (name, negated) in enumerate(term):
+                if i == middle:
+                    rows.append((" " * literal_width + gate, True))
+                rows.append((literal(name, negated).ljust(literal_width) + "+", False))
+        block_ends.append(len(rows))
+
+    if len(terms) == 1:
+        lines = [text + (f"- {output}" if is_output else "") for text, is_output in rows]
+        return "\n".join(line.rstrip() for line in lines)
+
+    outputs = [i for i, (_, is_output) in enumerate(rows) if is_output]
+    lines = []
+    for i, (text, is_output) in enumerate(rows):
+        if is_output:
+            connector = "+"
+        elif outputs[0] < i < outputs[-1]:
+            connector = "|"
+        else:
+            connector = ""
+        lines.append(text.ljust(or_column) + connector)
+    # Выход OR - отдельной строкой на границе термов посередине схемы
+    lines.insert(block_ends[(len(terms) - 1) // 2], " " * or_column + f"|-[OR]--- {output}")
+    return "\n".join(line.rstrip() for line in lines)
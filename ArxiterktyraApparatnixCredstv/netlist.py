@@ -0,0 +1,315 @@
+"""
+Побитово-параллельный симулятор логических схем на уровне вентилей.
+
+Формат описания схемы (по одной инструкции в строке, # - комментарий):
+
+    INPUT A B
+    OUTPUT F
+    nA = NOT A
+    nB = NOT B
+    t1 = AND A nB
+    t2 = AND nA B
+    F = OR t1 t2
+
+Провод может подаваться на входы любого числа вентилей (разветвление).
+Вентили: BUF, NOT, AND, OR, XOR, NAND, NOR, XNOR; кроме BUF и NOT все
+принимают два и более входа.
+
+Каждый провод хранит машинное слово: бит j - значение в j-м тестовом
+векторе, поэтому за один проход по схеме вычисляются сразу word_bits
+векторов (по умолчанию 64).
+"""
+import heapq
+import random
+import re
+import time
+from functools import reduce
+
+WORD_BITS = 64
+
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Вентиль -> (минимум входов, максимум входов или None)
+GATES = {
+    "BUF": (1, 1),
+    "NOT": (1, 1),
+    "AND": (2, None),
+    "OR": (2, None),
+    "XOR": (2, None),
+    "NAND": (2, None),
+    "NOR": (2, None),
+    "XNOR": (2, None),
+}
+
+_OPERATORS = {"AND": "&", "OR": "|", "XOR": "^", "NAND": "&", "NOR": "|", "XNOR": "^"}
+
+
+class NetlistError(ValueError):
+    """Ошибка в описании схемы"""
+
+
+def evaluate_gate(kind, values, mask):
+    """Вычисляет вентиль над словами values; mask - слово из единиц"""
+    if kind == "BUF":
+        return values[0]
+    if kind == "NOT":
+        return values[0] ^ mask
+    if kind in ("AND", "NAND"):
+        result = reduce(lambda a, b: a & b, values)
+    elif kind in ("OR", "NOR"):
+        result = reduce(lambda a, b: a | b, values)
+    else:
+        result = reduce(lambda a, b: a ^ b, values)
+    if kind in ("NAND", "NOR", "XNOR"):
+        result ^= mask
+    return result
+
+
+class Netlist:
+    """Разобранная схема: входы, выходы и вентили в топологическом порядке"""
+
+    def __init__(self, inputs, outputs, gates):
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        # провод -> (вентиль, входные провода)
+        self.gates = dict(gates)
+        self.order = self._topological_order()
+        self.fanout = {wire: [] for wire in self.inputs + self.order}
+        for wire in self.order:
+            for source in self.gates[wire][1]:
+                if wire not in self.fanout[source]:
+                    self.fanout[source].append(wire)
+        self.position = {wire: i for i, wire in enumerate(self.order)}
+
+    def _topological_order(self):
+        known = set(self.inputs)
+        for wire, (_, sources) in self.gates.items():
+            for source in sources:
+                if source not in known and source not in self.gates:
+                    raise NetlistError(f"Провод '{source}' (вход вентиля '{wire}') не определен")
+        for wire in self.outputs:
+            if wire not in known and wire not in self.gates:
+                raise NetlistError(f"Выход '{wire}' не определен")
+
+        # Алгоритм Кана
+        pending = {wire: sum(1 for source in sources if source in self.gates)
+                   for wire, (_, sources) in self.gates.items()}
+        users = {}
+        for wire, (_, sources) in self.gates.items():
+            for source in set(sources):
+                if source in self.gates:
+                    users.setdefault(source, []).append(wire)
+        ready = [wire for wire, count in pending.items() if count == 0]
+        order = []
+        while ready:
+            wire = ready.pop()
+            order.append(wire)
+            for user in users.get(wire, []):
+                pending[user] -= sum(1 for source in self.gates[user][1] if source == wire)
+                if pending[user] == 0:
+                    ready.append(user)
+        if len(order) != len(self.gates):
+            cycle = sorted(wire for wire, count in pending.items() if count > 0)
+            raise NetlistError(f"Схема содержит цикл через провода: {', '.join(cycle)}")
+        return order
+
+    @classmethod
+    def parse(cls, text):
+        """Разбирает текстовое описание схемы"""
+        inputs, outputs, gates = [], [], {}
+        for number, raw in enumerate(text.splitlines(), 1):
+            line = raw.split("#", 1)[0].strip()
+            if not line:
+                continue
+            words = line.split()
+            keyword = words[0].upper()
+            if keyword in ("INPUT", "OUTPUT"):
+                names = words[1:]
+                for name in names:
+                    if not _NAME.match(name):
+                        raise NetlistError(f"Строка {number}: недопустимое имя '{name}'")
+                (inputs if keyword == "INPUT" else outputs).extend(names)
+                continue
+            if len(words) < 4 or words[1] != "=":
+                raise NetlistError(f"Строка {number}: ожидалось '<провод> = <ВЕНТИЛЬ> <входы>'")
+            wire, kind, sources = words[0], words[2].upper(), words[3:]
+            if kind not in GATES:
+                raise NetlistError(f"Строка {number}: неизвестный вентиль '{words[2]}'")
+            low, high = GATES[kind]
+            if len(sources) < low or (high is not None and len(sources) > high):
+                raise NetlistError(f"Строка {number}: неверное число входов вентиля {kind}")
+            if wire in gates or wire in inputs:
+                raise NetlistError(f"Строка {number}: провод '{wire}' уже определен")
+            gates[wire] = (kind, sources)
+        if not outputs:
+            raise NetlistError("Не задан ни один выход (OUTPUT)")
+        return cls(inputs, outputs, gates)
+
+    def compile(self):
+        """
+        Генерирует функцию f(mask, *входы) -> кортеж выходов, вычисляющую
+        всю схему без интерпретации вентилей.
+        """
+        names = {wire: f"w{i}" for i, wire in enumerate(self.inputs + self.order)}
+        arguments = ", ".join(["_m"] + [names[wire] for wire in self.inputs])
+        lines = [f"def simulate({arguments}):"]
+        for wire in self.order:
+            kind, sources = self.gates[wire]
+            operands = [names[source] for source in sources]
+            if kind == "BUF":
+                expression = operands[0]
+            elif kind == "NOT":
+                expression = f"{operands[0]} ^ _m"
+            else:
+                expression = f" {_OPERATORS[kind]} ".join(operands)
+                if kind in ("NAND", "NOR", "XNOR"):
+                    expression = f"({expression}) ^ _m"
+            lines.append(f"    {names[wire]} = {expression}")
+        lines.append(f"    return ({', '.join(names[w] for w in self.outputs)},)")
+        namespace = {}
+        exec(compile("\n".join(lines), "<netlist>", "exec"), namespace)
+        return namespace["simulate"]
+
+
+class Simulator:
+    """Симуляция схемы словами по word_bits тестовых векторов"""
+
+    def __init__(self, netlist, word_bits=WORD_BITS):
+        if isinstance(netlist, str):
+            netlist = Netlist.parse(netlist)
+        self.netlist = netlist
+        self.word_bits = word_bits
+        self.mask = (1 << word_bits) - 1
+        self._compiled = netlist.compile()
+        self.values = {}
+        self.last_run = None
+
+    def evaluate_words(self, words):
+        """Вычисляет выходы для одного слова на каждый вход"""
+        return self._compiled(self.mask, *words)
+
+    def run(self, vectors):
+        """
+        Прогоняет тестовые векторы (кортежи значений входов в порядке
+        netlist.inputs) и возвращает список кортежей выходов 0/1.
+        Пропускная способность сохраняется в last_run.
+        """
+        inputs = len(self.netlist.inputs)
+        results = []
+        started = time.perf_counter()
+        batch = []
+        count = 0
+        for vector in vectors:
+            batch.append(vector)
+            if len(batch) == self.word_bits:
+                results.extend(self._run_batch(batch, inputs))
+                count += len(batch)
+                batch = []
+        if batch:
+            results.extend(self._run_batch(batch, inputs))
+            count += len(batch)
+        elapsed = time.perf_counter() - started
+        self.last_run = {
+            "vectors": count,
+            "seconds": elapsed,
+            "vectors_per_second": count / elapsed if elapsed > 0 else float("inf"),
+        }
+        return results
+
+    def _run_batch(self, batch, inputs):
+        words = [0] * inputs
+        for lane, vector in enumerate(batch):
+            for i in range(inputs):
+                if vector[i]:
+                    words[i] |= 1 << lane
+        outputs = self._compiled(self.mask, *words)
+        return [tuple((word >> lane) & 1 for word in outputs) for lane in range(len(batch))]
+
+    def benchmark(self, words=10000, seed=0):
+        """
+        Замеряет пропускную способность на случайных словах входов
+        (без упаковки векторов) и возвращает число векторов в секунду.
+        """
+        generator = random.Random(seed)
+        inputs = len(self.netlist.inputs)
+        stimulus = [[generator.getrandbits(self.word_bits) for _ in range(inputs)]
+                    for _ in range(words)]
+        compiled, mask = self._compiled, self.mask
+        started = time.perf_counter()
+        for words_in in stimulus:
+            compiled(mask, *words_in)
+        elapsed = time.perf_counter() - started
+        return words * self.word_bits / elapsed if elapsed > 0 else float("inf")
+
+    # Инкрементальное моделирование
+
+    def set_inputs(self, words):
+        """
+        Полностью вычисляет схему для слов входов (словарь или кортеж в
+        порядке netlist.inputs) и запоминает значения всех проводов.
+        """
+        if not isinstance(words, dict):
+            words = dict(zip(self.netlist.inputs, words))
+        self.values = {wire: words[wire] & self.mask for wire in self.netlist.inputs}
+        for wire in self.netlist.order:
+            kind, sources = self.netlist.gates[wire]
+            self.values[wire] = evaluate_gate(kind, [self.values[s] for s in sources], self.mask)
+        return self.outputs()
+
+    def change_input(self, name, word):
+        """
+        Меняет один вход и пересчитывает только вентили, до которых
+        дошло изменение. Возвращает (выходы, число пересчитанных вентилей).
+        """
+        if not self.values:
+            raise RuntimeError("Сначала задайте все входы через set_inputs()")
+        if name not in self.netlist.fanout or name in self.netlist.gates:
+            raise KeyError(f"'{name}' не является входом схемы")
+        word &= self.mask
+        if self.values[name] == word:
+            return self.outputs(), 0
+        self.values[name] = word
+        position = self.netlist.position
+        # Куча позиций в топологическом порядке; queued - уже поставленные вентили
+        pending = [(position[wire], wire) for wire in self.netlist.fanout[name]]
+        heapq.heapify(pending)
+        queued = set(self.netlist.fanout[name])
+        evaluated = 0
+        while pending:
+            _, wire = heapq.heappop(pending)
+            kind, sources = self.netlist.gates[wire]
+            value = evaluate_gate(kind, [self.values[s] for s in sources], self.mask)
+            evaluated += 1
+            if value != self.values[wire]:
+                self.values[wire] = value
+                for user in self.netlist.fanout[wire]:
+                    if user not in queued:
+                        queued.add(user)
+                        heapq.heappush(pending, (position[user], user))
+        return self.outputs(), evaluated
+
+    def outputs(self):
+        return tuple(self.values[wire] for wire in self.netlist.outputs)
+
+
+def from_terms(terms, output="F"):
+    """Строит описание схемы по ДНФ из minimize.minimize()"""
+    if not terms or any(not term for term in terms):
+        raise NetlistError("Постоянная функция не требует схемы")
+    names = sorted({name for term in terms for name, _ in term})
+    lines = [f"INPUT {' '.join(names)}", f"OUTPUT {output}"]
+    for name in sorted({name for term in terms for name, negated in term if negated}):
+        lines.append(f"n_{name} = NOT {name}")
+    products = []
+    for i, term in enumerate(terms, 1):
+        literals = [f"n_{name}" if negated else name for name, negated in term]
+        if len(literals) == 1:
+            products.append(literals[0])
+        else:
+            lines.append(f"t{i} = AND {' '.join(literals)}")
+            products.append(f"t{i}")
+    if len(products) == 1:
+        lines.append(f"{output} = BUF {products[0]}")
+    else:
+        lines.append(f"{output} = OR {' '.join(products)}")
+    return "\n".join(lines)
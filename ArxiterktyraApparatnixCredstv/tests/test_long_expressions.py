@@ -0,0 +1,23 @@
+from bool_compiler import CompiledExpression
+from boolexpr import parse, to_string
+import truth_table
+
+# Цепочка из нескольких тысяч операндов дает дерево глубиной в тысячи узлов
+CHAIN = " or ".join(f"x{i % 12}" for i in range(4000))
+
+
+def test_to_string_round_trip_of_long_chain():
+    tree = parse(CHAIN)
+    assert to_string(tree) == CHAIN
+
+
+def test_count_true_of_long_chain():
+    # Ложна только строка, в которой все 12 переменных ложны
+    assert truth_table.count_true(CHAIN) == 2 ** 12 - 1
+
+
+def test_compile_long_chain_from_tree():
+    compiled = CompiledExpression(parse(CHAIN))
+    assert compiled.text == CHAIN
+    assert not compiled(*[0] * 12)
+    assert compiled(*[0] * 11, 1)
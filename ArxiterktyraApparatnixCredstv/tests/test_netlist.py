@@ -0,0 +1,52 @@
+import random
+
+from netlist import Netlist, Simulator
+
+
+def _fanout_chain(gates):
+    """Вход A расходится на все вентили цепочки; B - на последний"""
+    lines = ["INPUT A B", "OUTPUT F"]
+    previous = "A"
+    for i in range(gates):
+        lines.append(f"g{i} = XOR {previous} A")
+        previous = f"g{i}"
+    lines.append(f"F = AND {previous} B")
+    return "\n".join(lines)
+
+
+def _random_netlist(generator, inputs=6, gates=60):
+    wires = [f"i{n}" for n in range(inputs)]
+    lines = [f"INPUT {' '.join(wires)}"]
+    for n in range(gates):
+        kind = generator.choice(["AND", "OR", "XOR", "NAND", "NOR", "NOT"])
+        count = 1 if kind == "NOT" else 2
+        lines.append(f"g{n} = {kind} {' '.join(generator.sample(wires, count))}")
+        wires.append(f"g{n}")
+    lines.insert(1, f"OUTPUT {' '.join(wires[-5:])}")
+    return "\n".join(lines)
+
+
+def test_change_input_matches_full_pass():
+    generator = random.Random(1)
+    for _ in range(20):
+        netlist = Netlist.parse(_random_netlist(generator))
+        incremental = Simulator(netlist)
+        full = Simulator(netlist)
+        words = [generator.getrandbits(64) for _ in netlist.inputs]
+        incremental.set_inputs(words)
+        for _ in range(10):
+            index = generator.randrange(len(words))
+            words[index] = generator.getrandbits(64)
+            outputs, evaluated = incremental.change_input(netlist.inputs[index], words[index])
+            assert outputs == full.set_inputs(words)
+            assert incremental.values == full.values
+            assert evaluated <= len(netlist.order)
+
+
+def test_change_input_evaluates_each_gate_once():
+    netlist = Netlist.parse(_fanout_chain(5000))
+    simulator = Simulator(netlist)
+    simulator.set_inputs({"A": 0, "B": simulator.mask})
+    outputs, evaluated = simulator.change_input("A", simulator.mask)
+    assert evaluated <= len(netlist.order)
+    assert outputs == Simulator(netlist).set_inputs({"A": simulator.mask, "B": simulator.mask})
@@ -0,0 +1,115 @@
+"""
+Побитово-параллельное построение таблиц истинности.
+
+Строки таблицы обрабатываются пачками: столбец каждой переменной для
+пачки из 2^k строк упаковывается в одно целое число Python (бит j -
+строка start + j), и все выражение вычисляется над этими числами
+скомпилированной функцией из bool_compiler. Так одна операция & или |
+обрабатывает сразу всю пачку, а не одну строку.
+
+Порядок строк совпадает с вложенными циклами: первая переменная
+меняется медленнее всех (старший бит номера строки).
+"""
+from functools import lru_cache
+
+from bool_compiler import CompiledExpression
+from boolexpr import parse, variables as expression_variables
+
+DEFAULT_CHUNK_BITS = 16
+
+
+@lru_cache(maxsize=None)
+def _column_pattern(bit, width_bits):
+    """
+    Маска для бита номера строки bit в пачке из 2^width_bits строк:
+    2^bit нулей, затем 2^bit единиц, и так по кругу.
+    """
+    period = 1 << bit
+    pattern = ((1 << period) - 1) << period
+    width = period * 2
+    size = 1 << width_bits
+    while width < size:
+        pattern |= pattern << width
+        width *= 2
+    return pattern
+
+
+def _prepare(expression, variables):
+    tree = parse(expression) if isinstance(expression, str) else expression
+    used = expression_variables(tree)
+    if variables is None:
+        variables = used
+    else:
+        variables = list(variables)
+        missing = [name for name in used if name not in variables]
+        if missing:
+            raise ValueError(f"Не заданы переменные: {', '.join(missing)}")
+    return tree, variables
+
+
+def evaluate_chunks(expression, variables=None, chunk_bits=DEFAULT_CHUNK_BITS):
+    """
+    Генератор пачек таблицы истинности: (номер первой строки, число строк,
+    упакованный результат). Бит j результата - значение выражения в строке
+    start + j. Память на пачку - O(2^chunk_bits бит) независимо от числа
+    переменных.
+    """
+    tree, variables = _prepare(expression, variables)
+    count = len(variables)
+    width_bits = min(chunk_bits, count)
+    size = 1 << width_bits
+    full = (1 << size) - 1
+    # Переменная с индексом i соответствует биту (count - 1 - i) номера строки
+    low = {}
+    for i, name in enumerate(variables):
+        bit = count - 1 - i
+        if bit < width_bits:
+            low[name] = _column_pattern(bit, width_bits)
+
+    packed = CompiledExpression(tree, variables).packed
+
+    for start in range(0, 1 << count, size):
+        columns = []
+        for i, name in enumerate(variables):
+            bit = count - 1 - i
+            if bit < width_bits:
+                columns.append(low[name])
+            else:
+                # Старшие биты внутри пачки постоянны
+                columns.append(full if (start >> bit) & 1 else 0)
+        yield start, size, packed(full, *columns)
+
+
+def iter_rows(expression, variables=None, chunk_bits=DEFAULT_CHUNK_BITS):
+    """Построчно выдает (значения переменных..., результат) как 0/1"""
+    tree, variables = _prepare(expression, variables)
+    count = len(variables)
+    for start, size, packed in evaluate_chunks(tree, variables, chunk_bits):
+        for offset in range(size):
+            row = start + offset
+            values = tuple((row >> (count - 1 - i)) & 1 for i in range(count))
+            yield values + ((packed >> offset) & 1,)
+
+
+def count_true(expression, variables=None, chunk_bits=DEFAULT_CHUNK_BITS):
+    """Считает строки, в которых выражение истинно"""
+    return sum(packed.bit_count()
+               for _, _, packed in evaluate_chunks(expression, variables, chunk_bits))
+
+
+def true_rows(expression, variables=None, chunk_bits=DEFAULT_CHUNK_BITS):
+    """Генератор номеров строк (минтермов), в которых выражение истинно"""
+    for start, _, packed in evaluate_chunks(expression, variables, chunk_bits):
+        while packed:
+            low_bit = packed & -packed
+            yield start + low_bit.bit_length() - 1
+            packed ^= low_bit
+
+
+def print_table(expression, variables=None, chunk_bits=DEFAULT_CHUNK_BITS):
+    """Выводит таблицу истинности в формате ' A | B | F'"""
+    tree, variables = _prepare(expression, variables)
+    print(" " + " | ".join(variables + ["F"]))
+    print("-" * (4 * (len(variables) + 1) - 1))
+    for row in iter_rows(tree, variables, chunk_bits):
+        print(" " + " | ".join(str(value) for value in row))
@@ -0,0 +1,287 @@
+"""
+Архивирование старых постов блога в отдельные базы по периодам.
+
+Пост переносится вместе со всеми комментариями, если он создан раньше
+границы и у него нет комментариев новее границы. Архив периода - файл
+blog_<период>.db (период - год 2023 или месяц 2023_04) в каталоге архива.
+
+Перенос идет пачками: строки копируются в архив отдельным соединением
+и фиксируются с synchronous=FULL, и только после этого удаляются из
+основной базы. Основная база на это время заблокирована для записи,
+поэтому в переносимые посты никто не добавит комментарий. Если процесс
+прервется между двумя фиксациями, строка окажется в обеих базах;
+основная база считается главной, и такие копии удаляются из архива при
+следующем запуске, а представления их не показывают.
+
+Для чтения архивы подключаются через ATTACH, а временные представления
+all_posts и all_comments объединяют основную базу со всеми архивами.
+"""
+import glob
+import os
+import re
+import sqlite3
+import sys
+
+from profiles import apply_profile
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_CHUNK_SIZE = 1000
+
+# Период -> формат strftime ключа периода
+PERIODS = {
+    "year": "%Y",
+    "month": "%Y_%m",
+}
+
+_ARCHIVE_FILE = re.compile(r"^blog_(\d{4}(?:_\d{2})?)\.db$")
+
+# Схема архива: те же столбцы, что в основной базе, но без внешних
+# ключей - пользователи и категории остаются в основной базе
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        created_at DATETIME
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS comments (
+        id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        post_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        created_at DATETIME
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_posts_category_created ON posts (category_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_post_created ON comments (post_id, created_at)",
+]
+
+_CANDIDATES = """
+    SELECT id, created_at FROM posts p
+    WHERE created_at >= :low AND created_at < :high AND created_at < :cutoff
+        AND (created_at, id) > (:after_created, :after_id)
+        AND NOT EXISTS (
+            SELECT 1 FROM comments c WHERE c.post_id = p.id AND c.created_at >= :cutoff
+        )
+    ORDER BY created_at, id
+    LIMIT :limit
+"""
+
+
+class ArchiveError(Exception):
+    """Ошибка архивирования или подключения архивов"""
+
+
+def period_bounds(key):
+    """Полуинтервал дат [начало, конец) периода по его ключу"""
+    if "_" not in key:
+        year = int(key)
+        return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    year, month = map(int, key.split("_"))
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
+def archive_path(directory, key):
+    return os.path.join(directory, f"blog_{key}.db")
+
+
+def list_archives(directory=ARCHIVE_DIR):
+    """Возвращает [(ключ периода, путь)] существующих архивов по порядку"""
+    archives = []
+    for path in sorted(glob.glob(os.path.join(directory, "blog_*.db"))):
+        match = _ARCHIVE_FILE.match(os.path.basename(path))
+        if match:
+            archives.append((match.group(1), path))
+    return archives
+
+
+def _alias(key):
+    return f"archive_{key}"
+
+
+def _open_archive(database, directory, key):
+    """Соединение с архивом периода, к которому подключена основная база как hot"""
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(archive_path(directory, key))
+    # Копия должна быть надежно записана до удаления строк из основной базы
+    apply_profile(conn, "durable")
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS hot", (database,))
+    return conn
+
+
+def _repair(archive, low, high):
+    """Удаляет из архива посты, которые остались в основной базе после сбоя"""
+    in_hot = "SELECT id FROM hot.posts WHERE created_at >= ? AND created_at < ?"
+    archive.execute(f"DELETE FROM comments WHERE post_id IN ({in_hot})", (low, high))
+    archive.execute(f"DELETE FROM posts WHERE id IN ({in_hot})", (low, high))
+    archive.commit()
+
+
+def archive_posts(database, cutoff, directory=ARCHIVE_DIR, period="year",
+                  chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Переносит посты старше cutoff (YYYY-MM-DD) вместе с комментариями в
+    архивы периодов. Возвращает {ключ периода: (постов, комментариев)}.
+    Посты с датой, которую не разбирает strftime, остаются в основной базе.
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер пачки должен быть не меньше 1")
+    fmt = PERIODS.get(period)
+    if fmt is None:
+        raise ArchiveError(f"Неизвестный период '{period}', доступны: {', '.join(PERIODS)}")
+
+    main = sqlite3.connect(database)
+    main.execute("PRAGMA foreign_keys = ON")
+    moved = {}
+    try:
+        keys = [row[0] for row in main.execute(
+            f"SELECT DISTINCT strftime('{fmt}', created_at) FROM posts "
+            f"WHERE created_at < ? AND strftime('{fmt}', created_at) IS NOT NULL",
+            (cutoff,)
+        )]
+        for key in keys:
+            low, high = period_bounds(key)
+            archive = _open_archive(database, directory, key)
+            posts = comments = 0
+            try:
+                _repair(archive, low, high)
+                after = ("", 0)
+                while True:
+                    # Блокировка записи держится, пока пачка не удалена из основной базы
+                    main.execute("BEGIN IMMEDIATE")
+                    rows = main.execute(_CANDIDATES, {
+                        "low": low, "high": high, "cutoff": cutoff,
+                        "after_created": after[0], "after_id": after[1], "limit": chunk_size,
+                    }).fetchall()
+                    if not rows:
+                        main.commit()
+                        break
+                    after = rows[-1][1], rows[-1][0]
+                    ids = [row[0] for row in rows]
+                    placeholders = ", ".join("?" * len(ids))
+
+                    archive.execute(f"""
+                        INSERT OR REPLACE INTO posts (id, title, content, user_id, category_id, created_at)
+                        SELECT id, title, content, user_id, category_id, created_at
+                        FROM hot.posts WHERE id IN ({placeholders})
+                    """, ids)
+                    cursor = archive.execute(f"""
+                        INSERT OR REPLACE INTO comments (id, text, post_id, user_id, created_at)
+                        SELECT id, text, post_id, user_id, created_at
+                        FROM hot.comments WHERE post_id IN ({placeholders})
+                    """, ids)
+                    comments += cursor.rowcount
+                    archive.commit()
+
+                    main.execute(f"DELETE FROM comments WHERE post_id IN ({placeholders})", ids)
+                    main.execute(f"DELETE FROM posts WHERE id IN ({placeholders})", ids)
+                    main.commit()
+                    posts += len(ids)
+            finally:
+                archive.close()
+            if posts:
+                moved[key] = (posts, comments)
+        return moved
+    except sqlite3.Error:
+        if main.in_transaction:
+            main.rollback()
+        raise
+    finally:
+        main.close()
+
+
+def attach_archives(conn, directory=ARCHIVE_DIR):
+    """
+    Подключает к соединению все архивы каталога (уже подключенные
+    пропускаются) и пересоздает временные представления all_posts и
+    all_comments, если набор архивов изменился. Возвращает псевдонимы.
+    ATTACH невозможен внутри транзакции, поэтому при открытой транзакции
+    соединения, когда нужно подключение, возбуждается ArchiveError.
+    """
+    archives = list_archives(directory)
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(archives) > limit:
+        raise ArchiveError(
+            f"Архивов {len(archives)}, а подключить можно не больше {limit}: "
+            "используйте более крупный период"
+        )
+    aliases = [_alias(key) for key, _ in archives]
+    missing = [(alias, path) for alias, (_, path) in zip(aliases, archives)
+               if alias not in attached]
+    views_exist = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_temp_master WHERE type = 'view' "
+        "AND name IN ('all_posts', 'all_comments')"
+    ).fetchone()[0] == 2
+    if not missing and views_exist:
+        return aliases
+    if conn.in_transaction:
+        raise ArchiveError("Архивы нельзя подключить внутри открытой транзакции")
+    for alias, path in missing:
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+    _create_views(conn, aliases)
+    return aliases
+
+
+def _create_views(conn, aliases):
+    # Строки архива, которые еще есть в основной базе (прерванный перенос),
+    # не показываются, чтобы не было дублей
+    posts = ["SELECT id, title, content, user_id, category_id, created_at FROM main.posts"]
+    comments = ["SELECT id, text, post_id, user_id, created_at FROM main.comments"]
+    for alias in aliases:
+        posts.append(
+            f"SELECT id, title, content, user_id, category_id, created_at FROM {alias}.posts a "
+            "WHERE NOT EXISTS (SELECT 1 FROM main.posts m WHERE m.id = a.id)"
+        )
+        comments.append(
+            f"SELECT id, text, post_id, user_id, created_at FROM {alias}.comments a "
+            "WHERE NOT EXISTS (SELECT 1 FROM main.comments m WHERE m.id = a.id)"
+        )
+    conn.execute("DROP VIEW IF EXISTS temp.all_posts")
+    conn.execute("DROP VIEW IF EXISTS temp.all_comments")
+    conn.execute("CREATE TEMP VIEW all_posts AS " + " UNION ALL ".join(posts))
+    conn.execute("CREATE TEMP VIEW all_comments AS " + " UNION ALL ".join(comments))
+
+
+def main(argv):
+    """
+    python archive.py move <дата YYYY-MM-DD> [year|month] [файл БД] [каталог]
+    python archive.py list [каталог]
+    """
+    if len(argv) >= 2 and argv[0] == "move":
+        period = argv[2] if len(argv) > 2 else "year"
+        database = argv[3] if len(argv) > 3 else "blog.db"
+        directory = argv[4] if len(argv) > 4 else ARCHIVE_DIR
+        moved = archive_posts(database, argv[1], directory, period)
+        for key, (posts, comments) in moved.items():
+            print(f"{key}: перенесено постов {posts}, комментариев {comments}")
+        if not moved:
+            print("Нет постов для архивирования")
+    elif argv and argv[0] == "list":
+        directory = argv[1] if len(argv) > 1 else ARCHIVE_DIR
+        for key, path in list_archives(directory):
+            conn = sqlite3.connect(path)
+            try:
+                posts = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+                comments = conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+            finally:
+                conn.close()
+            print(f"{key} | {path} | постов: {posts} | комментариев: {comments}")
+    else:
+        print(main.__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
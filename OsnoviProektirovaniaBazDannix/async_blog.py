@@ -0,0 +1,117 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+
+class AsyncBlog:
+    """
+    Асинхронный интерфейс к функциям db.py.
+
+    Запись выполняется в одном выделенном потоке, поэтому записи идут
+    строго по очереди и не спорят за блокировку blog.db. Чтение идет в
+    отдельном пуле потоков параллельно (WAL не блокирует читателей).
+    Число одновременно ожидающих запросов ограничено max_pending: при
+    переполнении вызывающая корутина ждет свободного места.
+
+    Потоки AsyncBlog берут соединения из собственного пула (db.use_pool),
+    поэтому общий пул db.py и его соединения в других потоках не
+    затрагиваются. Профиль и инструментирование собственного пула
+    фиксируются при создании AsyncBlog.
+    """
+
+    def __init__(self, readers=4, max_pending=100):
+        if readers < 1:
+            raise ValueError("Нужен хотя бы один поток чтения")
+        # По соединению на каждый поток
+        self._pool = db.create_pool(size=readers + 1)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blog-writer",
+                                          initializer=db.use_pool, initargs=(self._pool,))
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="blog-reader",
+                                           initializer=db.use_pool, initargs=(self._pool,))
+        self._pending = asyncio.Semaphore(max_pending)
+        self._closed = False
+
+    async def _run(self, executor, func, *args):
+        """
+        Выполняет func в executor. Если корутину отменили до начала
+        выполнения, задача снимается с очереди; начатая задача доводится
+        до конца, но ее результат отбрасывается.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncBlog уже закрыт")
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+    def _write(self, func, *args):
+        return self._run(self._writer, func, *args)
+
+    def _read(self, func, *args):
+        return self._run(self._readers, func, *args)
+
+    # Запись
+
+    async def add_user(self, username, email):
+        return await self._write(db.add_user, username, email)
+
+    async def add_category(self, name):
+        return await self._write(db.add_category, name)
+
+    async def create_post(self, title, content, user_id, category_id):
+        return await self._write(db.create_post, title, content, user_id, category_id)
+
+    async def add_comment(self, text, post_id, user_id):
+        return await self._write(db.add_comment, text, post_id, user_id)
+
+    async def add_users_bulk(self, users, chunk_size=db.BULK_CHUNK_SIZE):
+        return await self._write(db.add_users_bulk, users, chunk_size)
+
+    async def create_posts_bulk(self, posts, chunk_size=db.BULK_CHUNK_SIZE):
+        return await self._write(db.create_posts_bulk, posts, chunk_size)
+
+    async def add_comments_bulk(self, comments, chunk_size=db.BULK_CHUNK_SIZE):
+        return await self._write(db.add_comments_bulk, comments, chunk_size)
+
+    # Чтение
+
+    async def get_all_posts(self):
+        return await self._read(db.fetch_all_posts)
+
+    async def get_posts_by_category(self, category_name):
+        return await self._read(db.fetch_posts_by_category, category_name)
+
+    async def get_posts_page(self, limit=db.POSTS_PAGE_SIZE, cursor_token=None,
+                             category_name=None):
+        return await self._read(db.get_posts_page, limit, cursor_token, category_name)
+
+    async def iter_posts(self, category_name=None, batch_size=db.POSTS_BATCH_SIZE):
+        """
+        Асинхронный генератор постов. Каждая пачка читается отдельным
+        запросом с keyset-пагинацией, поэтому соединение не удерживается,
+        пока потребитель обрабатывает строки.
+        """
+        token = None
+        while True:
+            posts, token = await self.get_posts_page(batch_size, token, category_name)
+            for post in posts:
+                yield post
+            if token is None:
+                break
+
+    # Жизненный цикл
+
+    async def close(self):
+        """Дожидается начатых операций, останавливает потоки и закрывает пул"""
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.shutdown)
+        await loop.run_in_executor(None, self._readers.shutdown)
+        self._pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,506 @@
+"""
+Нагрузочные замеры блога (db.py) и библиотеки (db1.py) на синтетических данных.
+
+    python benchmark.py run --target all --scale 10k --output bench-10k.json
+    python benchmark.py compare bench-old.json bench-new.json
+
+Масштаб задает число строк самой большой таблицы (комментарии блога,
+выдачи библиотеки); остальные таблицы пропорционально меньше. Популярность
+авторов, категорий, книг и читателей распределена по закону Ципфа, даты
+смещены к недавнему времени. Сгенерированные базы сохраняются в --dir и
+переиспользуются при следующих запусках (--fresh создает их заново).
+Замеры идут на временной копии базы, поэтому операции записи не меняют
+данные следующих запусков и их результаты можно сравнивать.
+
+Для каждого запроса и операции записи сохраняются p50/p95/p99 задержки
+и пропускная способность в операциях в секунду.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import circulation
+import db
+import db1
+from library_stats import get_stats
+from migrations import apply_migrations
+from profiles import apply_profile
+
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Показатель распределения Ципфа: чем больше, тем сильнее перекос
+SKEW = 1.1
+GENERATE_CHUNK_SIZE = 10_000
+REPEAT = 50
+# Ограничение времени на один замер, чтобы тяжелые запросы на 10m не шли часами
+CASE_BUDGET_SECONDS = 10.0
+# Рост p95 больше этой доли и больше MIN_REGRESSION_MS считается регрессией;
+# абсолютный порог отсекает шум на запросах короче миллисекунды
+REGRESSION_THRESHOLD = 0.2
+MIN_REGRESSION_MS = 0.5
+
+HISTORY_DAYS = 3 * 365
+NOW = datetime(2025, 1, 1)
+
+WORDS = (
+    "python sql база данных индекс запрос таблица сервер кэш поток "
+    "транзакция журнал страница ключ соединение схема миграция отчет "
+    "книга автор читатель пост комментарий категория поиск скорость "
+    "память диск сеть ошибка тест версия функция модуль класс объект"
+).split()
+
+
+class Zipf:
+    """Случайные номера 1..n, где номер k выпадает с весом 1 / k**s"""
+
+    def __init__(self, n, s=SKEW, rnd=random):
+        self.cumulative = list(accumulate(1 / k ** s for k in range(1, n + 1)))
+        self.total = self.cumulative[-1]
+        self.rnd = rnd
+
+    def __call__(self):
+        return min(bisect(self.cumulative, self.rnd.random() * self.total), len(self.cumulative) - 1) + 1
+
+
+def _recent_timestamp(rnd):
+    # Квадрат равномерной величины: недавние даты встречаются чаще
+    moment = NOW - timedelta(days=HISTORY_DAYS * rnd.random() ** 2, seconds=rnd.randrange(86400))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _text(words, count):
+    return " ".join(WORDS[words() - 1] for _ in range(count))
+
+
+def _insert(conn, sql, rows):
+    """Вставляет строки пачками и возвращает число действительно вставленных"""
+    before = conn.total_changes
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= GENERATE_CHUNK_SIZE:
+            conn.executemany(sql, chunk)
+            conn.commit()
+            chunk = []
+    if chunk:
+        conn.executemany(sql, chunk)
+        conn.commit()
+    return conn.total_changes - before
+
+
+def blog_sizes(rows):
+    return {
+        "users": max(10, rows // 100),
+        "categories": 20,
+        "posts": max(10, rows // 5),
+        "comments": rows,
+    }
+
+
+def generate_blog(path, rows, seed=0):
+    """Создает синтетический блог: rows комментариев, посты и пользователи"""
+    rnd = random.Random(seed)
+    sizes = blog_sizes(rows)
+    with contextlib.redirect_stdout(io.StringIO()), _using_blog(path):
+        db.create_blog_database()
+
+    conn = sqlite3.connect(path)
+    apply_profile(conn, "bulk-load")
+    words = Zipf(len(WORDS), rnd=rnd)
+    users = Zipf(sizes["users"], rnd=rnd)
+    categories = Zipf(sizes["categories"], rnd=rnd)
+    posts = Zipf(sizes["posts"], rnd=rnd)
+    try:
+        _insert(conn, "INSERT INTO users (id, username, email) VALUES (?, ?, ?)",
+                ((i, f"user{i}", f"user{i}@example.org") for i in range(1, sizes["users"] + 1)))
+        _insert(conn, "INSERT INTO categories (id, name) VALUES (?, ?)",
+                ((i, f"Категория {i}") for i in range(1, sizes["categories"] + 1)))
+        _insert(conn, """INSERT INTO posts (id, title, content, user_id, category_id, created_at)
+                         VALUES (?, ?, ?, ?, ?, ?)""",
+                ((i, _text(words, 5), _text(words, 60), users(), categories(),
+                  _recent_timestamp(rnd)) for i in range(1, sizes["posts"] + 1)))
+        _insert(conn, """INSERT INTO comments (id, text, post_id, user_id, created_at)
+                         VALUES (?, ?, ?, ?, ?)""",
+                ((i, _text(words, 15), posts(), users(), _recent_timestamp(rnd))
+                 for i in range(1, sizes["comments"] + 1)))
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return sizes
+
+
+def library_sizes(rows):
+    return {
+        "genres": 20,
+        "authors": max(10, rows // 1000),
+        "books": max(20, rows // 50),
+        "readers": max(10, rows // 100),
+        "issues": rows,
+    }
+
+
+def _issues(rnd, rows, books, readers):
+    start = NOW - timedelta(days=HISTORY_DAYS)
+    for i in range(rows):
+        # Выдачи идут в хронологическом порядке, как в реальной базе
+        issued = start + timedelta(days=HISTORY_DAYS * i / rows)
+        returned = None
+        if (NOW - issued).days > 60 or rnd.random() < 0.5:
+            if rnd.random() < 0.97:
+                returned = (issued + timedelta(days=rnd.randint(1, 45))).strftime("%Y-%m-%d")
+        yield books(), readers(), issued.strftime("%Y-%m-%d"), returned
+
+
+def generate_library(path, rows, seed=0):
+    """Создает синтетическую библиотеку: rows выдач, книги, авторы и читатели"""
+    rnd = random.Random(seed)
+    sizes = library_sizes(rows)
+    conn = db1.connect(path, "bulk-load")
+    words = Zipf(len(WORDS), rnd=rnd)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Сначала таблицы и уникальные ключи; индексы, счетчики и сводки
+            # строятся одним проходом после загрузки
+            apply_migrations(conn, db1.MIGRATIONS[:2])
+        _insert(conn, "INSERT INTO Genres (genre_id, genre_name) VALUES (?, ?)",
+                ((i, f"Жанр {i}") for i in range(1, sizes["genres"] + 1)))
+        _insert(conn, "INSERT INTO Authors (author_id, first_name, last_name, birth_year) VALUES (?, ?, ?, ?)",
+                ((i, f"Имя{i}", f"Фамилия{i}", rnd.randint(1750, 1990))
+                 for i in range(1, sizes["authors"] + 1)))
+        authors = Zipf(sizes["authors"], rnd=rnd)
+        genres = Zipf(sizes["genres"], rnd=rnd)
+        _insert(conn, """INSERT INTO Books (book_id, title, author_id, genre_id, publication_year, isbn)
+                         VALUES (?, ?, ?, ?, ?, ?)""",
+                ((i, _text(words, 3), authors(), genres(), rnd.randint(1800, 2024), f"isbn-{i:09d}")
+                 for i in range(1, sizes["books"] + 1)))
+        _insert(conn, "INSERT INTO Readers (reader_id, first_name, last_name, email) VALUES (?, ?, ?, ?)",
+                ((i, f"Имя{i}", f"Фамилия{i}", f"reader{i}@example.org")
+                 for i in range(1, sizes["readers"] + 1)))
+        # Совпадения (книга, читатель, дата) отбрасываются уникальным ключом
+        sizes["issues"] = _insert(
+            conn,
+            "INSERT OR IGNORE INTO Book_Issues (book_id, reader_id, issue_date, return_date) VALUES (?, ?, ?, ?)",
+            _issues(rnd, rows, Zipf(sizes["books"], rnd=rnd), Zipf(sizes["readers"], rnd=rnd)),
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            db1.migrate(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return sizes
+
+
+def percentile(ordered, p):
+    """Перцентиль методом ближайшего ранга по отсортированному списку"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, operations=1):
+    """Сводка замеров в миллисекундах; operations - операций за один вызов"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "runs": len(ordered),
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "mean_ms": total / len(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "throughput_ops": len(ordered) * operations / total if total > 0 else None,
+    }
+
+
+def measure(function, repeat=REPEAT, operations=1, budget=CASE_BUDGET_SECONDS):
+    """
+    Вызывает function до repeat раз (но не дольше budget секунд) и
+    возвращает сводку задержек. Вывод функции подавляется.
+    """
+    latencies = []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()  # прогрев кэшей SQLite и пула
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - begin)
+            if begin - started > budget:
+                break
+    return summarize(latencies, operations)
+
+
+@contextlib.contextmanager
+def _using_blog(path):
+    """Направляет функции db.py текущего потока в отдельный пул базы path"""
+    pool = db.create_pool(database=path)
+    db.use_pool(pool)
+    db.configure_cache()
+    try:
+        yield
+    finally:
+        db.use_pool(None)
+        db.configure_cache()
+        pool.close()
+
+
+def blog_cases(sizes, seed=0):
+    """
+    Горячие запросы и операции записи блога: имя -> (функция, операций за
+    вызов). Функции db.py работают с пулом, назначенным через db.use_pool()
+    """
+    rnd = random.Random(seed)
+    users = Zipf(sizes["users"], rnd=rnd)
+    categories = Zipf(sizes["categories"], rnd=rnd)
+    posts = Zipf(sizes["posts"], rnd=rnd)
+    words = Zipf(len(WORDS), rnd=rnd)
+
+    def all_posts_page():
+        page, token = db.get_posts_page(limit=db.POSTS_PAGE_SIZE)
+        for _ in range(4):
+            page, token = db.get_posts_page(limit=db.POSTS_PAGE_SIZE, cursor_token=token)
+
+    def comments_bulk():
+        db.add_comments_bulk((_text(words, 15), posts(), users()) for _ in range(1000))
+
+    return {
+        "get_all_posts_with_authors": (lambda: db.fetch_all_posts(cached=False), 1),
+        "get_all_posts_with_authors_cached": (db.fetch_all_posts, 1),
+        "get_posts_by_category": (lambda: db.fetch_posts_by_category(f"Категория {categories()}",
+                                                                   cached=False), 1),
+        "get_posts_by_category_cached": (lambda: db.fetch_posts_by_category(f"Категория {categories()}"), 1),
+        "get_posts_page_x5": (all_posts_page, 5),
+        "search_posts": (lambda: db.search_posts(WORDS[words() - 1]), 1),
+        "create_post": (lambda: db.create_post(_text(words, 5), _text(words, 60),
+                                               users(), categories()), 1),
+        "add_comment": (lambda: db.add_comment(_text(words, 15), posts(), users()), 1),
+        "add_comments_bulk_1000": (comments_bulk, 1000),
+    }
+
+
+def library_cases(conn, sizes, seed=0):
+    """Запросы отчета и операции записи библиотеки: имя -> (функция, операций за вызов)"""
+    rnd = random.Random(seed)
+    books = Zipf(sizes["books"], rnd=rnd)
+    readers = Zipf(sizes["readers"], rnd=rnd)
+    # Новые выдачи идут после последней выдачи в базе
+    last = conn.execute("SELECT MAX(issue_date) FROM Book_Issues").fetchone()[0]
+    issued = [max(NOW, datetime.strptime(last, "%Y-%m-%d")) if last else NOW]
+
+    def query(sql, params=()):
+        return lambda: conn.execute(sql, params).fetchall()
+
+    def issue_book():
+        # Каждая новая выдача на следующий день, чтобы не упираться в уникальный ключ
+        issued[0] += timedelta(days=1)
+        conn.execute("INSERT INTO Book_Issues (book_id, reader_id, issue_date) VALUES (?, ?, ?)",
+                     (books(), readers(), issued[0].strftime("%Y-%m-%d")))
+        conn.commit()
+
+    def return_book():
+        conn.execute("""
+            UPDATE Book_Issues SET return_date = ?
+            WHERE issue_id = (SELECT issue_id FROM Book_Issues WHERE return_date IS NULL LIMIT 1)
+        """, (NOW.strftime("%Y-%m-%d"),))
+        conn.commit()
+
+    as_of = NOW.strftime("%Y-%m-%d")
+    return {
+        "books_with_authors": (query(db1.BOOKS_WITH_AUTHORS_QUERY), 1),
+        "readers_with_books": (query(db1.READERS_WITH_BOOKS_QUERY), 1),
+        "books_per_author": (query(db1.BOOKS_PER_AUTHOR_QUERY), 1),
+        "current_issues": (query(db1.CURRENT_ISSUES_QUERY), 1),
+        "stats": (lambda: get_stats(conn), 1),
+        "overdue_loans": (lambda: circulation.overdue_loans(conn, as_of), 1),
+        "loans_per_reader": (lambda: circulation.loans_per_reader(conn), 1),
+        "most_borrowed_books": (lambda: circulation.most_borrowed_books(conn), 1),
+        "average_loan_duration": (lambda: circulation.average_loan_duration(conn), 1),
+        "issue_book": (issue_book, 1),
+        "return_book": (return_book, 1),
+        "refresh_circulation": (lambda: circulation.refresh_circulation(conn), 1),
+    }
+
+
+def _prepare(target, directory, scale, fresh, seed):
+    rows = SCALES[scale]
+    path = os.path.join(directory, f"bench_{target}_{scale}.db")
+    sizes_path = path + ".json"
+    if fresh or not os.path.exists(sizes_path):
+        _remove_database(path)
+        if os.path.exists(sizes_path):
+            os.remove(sizes_path)
+        print(f"Генерация {target} ({scale})...")
+        started = time.perf_counter()
+        generate = generate_blog if target == "blog" else generate_library
+        sizes = generate(path, rows, seed)
+        elapsed = time.perf_counter() - started
+        generation = {"seconds": elapsed, "rows_per_second": sum(sizes.values()) / elapsed}
+        with open(sizes_path, "w", encoding="utf-8") as file:
+            json.dump({"sizes": sizes, "generation": generation}, file)
+    with open(sizes_path, encoding="utf-8") as file:
+        prepared = json.load(file)
+    return path, prepared
+
+
+def _working_copy(path):
+    """Копия базы для замеров (через backup, чтобы попало и содержимое WAL)"""
+    copy = path + ".run"
+    _remove_database(copy)
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(copy)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return copy
+
+
+def _remove_database(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def run(targets, scale, directory=".", repeat=REPEAT, budget=CASE_BUDGET_SECONDS,
+        fresh=False, seed=0, only=None):
+    """Готовит данные и выполняет замеры; возвращает словарь результатов"""
+    if scale not in SCALES:
+        raise ValueError(f"Неизвестный масштаб '{scale}', доступны: {', '.join(SCALES)}")
+    os.makedirs(directory, exist_ok=True)
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "scale": scale,
+            "rows": SCALES[scale],
+            "repeat": repeat,
+            "seed": seed,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "targets": {},
+    }
+    for target in targets:
+        path, prepared = _prepare(target, directory, scale, fresh, seed)
+        work = _working_copy(path)
+        conn = None
+        blog = contextlib.ExitStack()
+        if target == "blog":
+            blog.enter_context(_using_blog(work))
+            cases = blog_cases(prepared["sizes"], seed)
+        else:
+            conn = db1.connect(work)
+            cases = library_cases(conn, prepared["sizes"], seed)
+        results = {}
+        try:
+            for name, (function, operations) in cases.items():
+                if only and name not in only:
+                    continue
+                results[name] = measure(function, repeat, operations, budget)
+                print(f"{target}.{name}: p50 {results[name]['p50_ms']:.2f} мс, "
+                      f"p95 {results[name]['p95_ms']:.2f} мс, "
+                      f"p99 {results[name]['p99_ms']:.2f} мс, "
+                      f"{results[name]['throughput_ops']:.0f} оп/с")
+        finally:
+            if conn is not None:
+                conn.close()
+            blog.close()
+            _remove_database(work)
+        report["targets"][target] = {
+            "database": path,
+            "sizes": prepared["sizes"],
+            "generation": prepared["generation"],
+            "cases": results,
+        }
+    return report
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD, metric="p95_ms",
+            min_delta=MIN_REGRESSION_MS):
+    """
+    Сравнивает два отчета run(). Возвращает список
+    (цель, замер, старое значение, новое значение, изменение) для замеров,
+    у которых metric выросла больше чем на долю threshold и на min_delta.
+    """
+    regressions = []
+    for target, data in new["targets"].items():
+        previous = old["targets"].get(target, {}).get("cases", {})
+        for name, result in data["cases"].items():
+            if name not in previous:
+                continue
+            before, after = previous[name][metric], result[metric]
+            if before and after - before > min_delta and (after - before) / before > threshold:
+                regressions.append((target, name, before, after, (after - before) / before))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Замеры запросов блога и библиотеки")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="сгенерировать данные и выполнить замеры")
+    run_parser.add_argument("--target", choices=["blog", "library", "all"], default="all")
+    run_parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    run_parser.add_argument("--dir", default=".", help="каталог для баз с данными")
+    run_parser.add_argument("--repeat", type=int, default=REPEAT)
+    run_parser.add_argument("--budget", type=float, default=CASE_BUDGET_SECONDS,
+                            help="максимум секунд на один замер")
+    run_parser.add_argument("--case", action="append", help="выполнить только этот замер")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--fresh", action="store_true", help="сгенерировать данные заново")
+    run_parser.add_argument("--output", help="файл JSON для результатов")
+
+    compare_parser = commands.add_parser("compare", help="найти регрессии между двумя запусками")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    compare_parser.add_argument("--metric", default="p95_ms")
+    compare_parser.add_argument("--min-delta", type=float, default=MIN_REGRESSION_MS,
+                                help="минимальный рост в миллисекундах")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        targets = ["blog", "library"] if args.target == "all" else [args.target]
+        report = run(targets, args.scale, args.dir, args.repeat, args.budget,
+                     args.fresh, args.seed, args.case)
+        output = args.output or f"bench-{args.scale}-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {output}")
+        return 0
+
+    with open(args.old, encoding="utf-8") as file:
+        old = json.load(file)
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)
+    regressions = compare(old, new, args.threshold, args.metric, args.min_delta)
+    for target, name, before, after, change in regressions:
+        print(f"{target}.{name}: {args.metric} {before:.2f} -> {after:.2f} (+{change:.0%})")
+    if regressions:
+        return 1
+    print("Регрессий не найдено")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Кэш результатов запросов с вытеснением LRU и временем жизни записей.
+
+    Ключ записи - кортеж (имя запроса, параметры...). Каждой записи
+    назначаются теги, по которым записи сбрасываются при изменении данных.
+    Сброс тега увеличивает его поколение: результат загрузки, во время
+    которой тег сбросили, может быть устаревшим и в кэш не сохраняется.
+    """
+
+    def __init__(self, maxsize=256, ttl=30.0):
+        if maxsize < 1:
+            raise ValueError("Размер кэша должен быть не меньше 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Поколения тегов и всего кэша (растет при clear())
+        self._generations = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_loads = 0
+
+    def get(self, key):
+        """Возвращает (True, значение) для живой записи, иначе (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, tags=()):
+        """Сохраняет значение, вытесняя самые давно использованные записи"""
+        with self._lock:
+            self._store(key, value, tags)
+
+    def _store(self, key, value, tags):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at, frozenset(tags))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _snapshot(self, tags):
+        return self._generation, tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get_or_load(self, key, loader, tags=()):
+        """
+        Читает значение из кэша или вызывает loader() и сохраняет результат,
+        если за время загрузки ни один из тегов не сбрасывался
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        tags = tuple(tags)
+        with self._lock:
+            before = self._snapshot(tags)
+        value = loader()
+        with self._lock:
+            if self._snapshot(tags) == before:
+                self._store(key, value, tags)
+            else:
+                self.stale_loads += 1
+        return value
+
+    def invalidate(self, *tags):
+        """Удаляет записи, помеченные любым из тегов; возвращает их число"""
+        tags = set(tags)
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [key for key, (_, _, entry_tags) in self._entries.items()
+                     if entry_tags & tags]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        """Возвращает счетчики попаданий, промахов и размер кэша"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_loads": self.stale_loads,
+            }
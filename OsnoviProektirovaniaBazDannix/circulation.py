@@ -0,0 +1,331 @@
+import sqlite3
+import sys
+
+# Срок выдачи книги в днях, после которого выдача считается просроченной
+LOAN_PERIOD_DAYS = 14
+
+# Сводные таблицы обновляются инкрементально: обрабатываются выдачи с
+# issue_id больше последнего обработанного. Изменения уже учтенных выдач
+# (возврат книги, удаление) триггеры записывают в Circulation_Log как пары
+# "минус старая строка, плюс новая", а выдачи, вставленные с issue_id не
+# больше обработанного, - как "плюс новая строка". Следующее обновление
+# применяет их как поправки, не пересчитывая историю. Сводки актуальны
+# после refresh_circulation(); db1.seed() и db1.load() вызывают его сами.
+CIRCULATION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS Circulation_State (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    INSERT OR IGNORE INTO Circulation_State (name, value) VALUES ('last_issue_id', 0)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Circulation_Log (
+        change_id INTEGER PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        reader_id INTEGER NOT NULL,
+        issue_date DATE NOT NULL,
+        return_date DATE,
+        sign INTEGER NOT NULL
+    )
+    """,
+    # Выдачи, возвраты и суммарная длительность возвращенных выдач по книгам
+    """
+    CREATE TABLE IF NOT EXISTS Book_Circulation (
+        book_id INTEGER PRIMARY KEY,
+        loans INTEGER NOT NULL DEFAULT 0,
+        returned INTEGER NOT NULL DEFAULT 0,
+        loan_days REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_book_circulation_loans
+    ON Book_Circulation (loans)
+    """,
+    # Выдачи по читателям помесячно (месяц в формате YYYY-MM)
+    """
+    CREATE TABLE IF NOT EXISTS Reader_Monthly_Loans (
+        reader_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        loans INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (reader_id, month)
+    ) WITHOUT ROWID
+    """,
+    # Триггеры пересоздаются при каждой установке, чтобы базы с ранними
+    # версиями триггеров получили текущие
+    "DROP TRIGGER IF EXISTS circulation_issues_ai",
+    "DROP TRIGGER IF EXISTS circulation_issues_au",
+    "DROP TRIGGER IF EXISTS circulation_issues_ad",
+    # Выдача с явным issue_id не больше обработанного не попадет в
+    # диапазон новых выдач, поэтому учитывается через журнал
+    """
+    CREATE TRIGGER circulation_issues_ai AFTER INSERT ON Book_Issues
+    WHEN new.issue_id <= (SELECT value FROM Circulation_State WHERE name = 'last_issue_id')
+    BEGIN
+        INSERT INTO Circulation_Log (book_id, reader_id, issue_date, return_date, sign)
+        VALUES (new.book_id, new.reader_id, new.issue_date, new.return_date, 1);
+    END
+    """,
+    # Обновление без изменения значений (например, повторный seed) журнал не пишет
+    """
+    CREATE TRIGGER circulation_issues_au AFTER UPDATE ON Book_Issues
+    WHEN old.issue_id <= (SELECT value FROM Circulation_State WHERE name = 'last_issue_id')
+        AND (old.issue_id IS NOT new.issue_id
+            OR old.book_id IS NOT new.book_id
+            OR old.reader_id IS NOT new.reader_id
+            OR old.issue_date IS NOT new.issue_date
+            OR old.return_date IS NOT new.return_date)
+    BEGIN
+        INSERT INTO Circulation_Log (book_id, reader_id, issue_date, return_date, sign)
+        VALUES (old.book_id, old.reader_id, old.issue_date, old.return_date, -1);
+        INSERT INTO Circulation_Log (book_id, reader_id, issue_date, return_date, sign)
+        SELECT new.book_id, new.reader_id, new.issue_date, new.return_date, 1
+        WHERE new.issue_id <= (SELECT value FROM Circulation_State WHERE name = 'last_issue_id');
+    END
+    """,
+    """
+    CREATE TRIGGER circulation_issues_ad AFTER DELETE ON Book_Issues
+    WHEN old.issue_id <= (SELECT value FROM Circulation_State WHERE name = 'last_issue_id')
+    BEGIN
+        INSERT INTO Circulation_Log (book_id, reader_id, issue_date, return_date, sign)
+        VALUES (old.book_id, old.reader_id, old.issue_date, old.return_date, -1);
+    END
+    """,
+]
+
+# Новые выдачи и накопленные поправки в одном наборе строк со знаком
+_DELTA = """
+    WITH delta AS (
+        SELECT book_id, reader_id, issue_date, return_date, 1 AS sign
+        FROM Book_Issues
+        WHERE issue_id > :last AND issue_id <= :top
+        UNION ALL
+        SELECT book_id, reader_id, issue_date, return_date, sign
+        FROM Circulation_Log
+        WHERE change_id <= :change
+    )
+"""
+
+_APPLY_BOOKS = _DELTA + """
+    INSERT INTO Book_Circulation (book_id, loans, returned, loan_days)
+    SELECT
+        book_id,
+        SUM(sign),
+        SUM(sign * (return_date IS NOT NULL)),
+        SUM(sign * COALESCE(julianday(return_date) - julianday(issue_date), 0))
+    FROM delta
+    WHERE true
+    GROUP BY book_id
+    ON CONFLICT (book_id) DO UPDATE SET
+        loans = loans + excluded.loans,
+        returned = returned + excluded.returned,
+        loan_days = loan_days + excluded.loan_days
+"""
+
+_APPLY_READERS = _DELTA + """
+    INSERT INTO Reader_Monthly_Loans (reader_id, month, loans)
+    SELECT reader_id, strftime('%Y-%m', issue_date), SUM(sign)
+    FROM delta
+    WHERE true
+    GROUP BY reader_id, strftime('%Y-%m', issue_date)
+    ON CONFLICT (reader_id, month) DO UPDATE SET
+        loans = loans + excluded.loans
+"""
+
+OVERDUE_QUERY = """
+    SELECT
+        bi.issue_id,
+        r.first_name || ' ' || r.last_name AS Читатель,
+        b.title AS Книга,
+        bi.issue_date AS Дата_выдачи,
+        CAST(julianday(:as_of) - julianday(bi.issue_date) AS INTEGER) - :loan_days AS Дней_просрочки,
+        COUNT(*) OVER (PARTITION BY bi.reader_id) AS Просрочек_у_читателя
+    FROM Book_Issues bi
+    JOIN Readers r ON bi.reader_id = r.reader_id
+    JOIN Books b ON bi.book_id = b.book_id
+    WHERE bi.return_date IS NULL
+        AND bi.issue_date < date(:as_of, '-' || :loan_days || ' days')
+    ORDER BY Дней_просрочки DESC, bi.issue_id
+"""
+
+# Скользящая сумма выдач за months месяцев (:window = months - 1). Окно
+# берется по диапазону номеров месяцев year*12+month, поэтому месяцы
+# без выдач не сдвигают его
+LOANS_PER_READER_QUERY = """
+    SELECT
+        r.first_name || ' ' || r.last_name AS Читатель,
+        rml.month AS Месяц,
+        rml.loans AS Выдач,
+        SUM(rml.loans) OVER (
+            PARTITION BY rml.reader_id
+            ORDER BY CAST(substr(rml.month, 1, 4) AS INTEGER) * 12
+                + CAST(substr(rml.month, 6, 2) AS INTEGER)
+            RANGE BETWEEN :window PRECEDING AND CURRENT ROW
+        ) AS Выдач_за_период
+    FROM Reader_Monthly_Loans rml
+    JOIN Readers r ON r.reader_id = rml.reader_id
+    WHERE rml.loans > 0
+    ORDER BY r.last_name, rml.reader_id, rml.month
+"""
+
+MOST_BORROWED_QUERY = """
+    SELECT * FROM (
+        SELECT
+            b.title AS Книга,
+            a.first_name || ' ' || a.last_name AS Автор,
+            bc.loans AS Выдач,
+            RANK() OVER (ORDER BY bc.loans DESC) AS Место
+        FROM Book_Circulation bc
+        JOIN Books b ON b.book_id = bc.book_id
+        JOIN Authors a ON a.author_id = b.author_id
+        WHERE bc.loans > 0
+    )
+    WHERE Место <= :limit
+    ORDER BY Место, Книга
+"""
+
+LOAN_DURATION_QUERY = """
+    SELECT
+        b.title AS Книга,
+        bc.returned AS Возвратов,
+        ROUND(bc.loan_days / bc.returned, 1) AS Средний_срок,
+        ROUND(SUM(bc.loan_days) OVER () / SUM(bc.returned) OVER (), 1) AS Средний_срок_всего
+    FROM Book_Circulation bc
+    JOIN Books b ON b.book_id = bc.book_id
+    WHERE bc.returned > 0
+    ORDER BY Средний_срок DESC, b.title
+"""
+
+
+def install_circulation(conn):
+    """Создает сводные таблицы и триггеры; при первой установке строит сводки"""
+    try:
+        for statement in CIRCULATION_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return refresh_circulation(conn)
+
+
+def refresh_circulation(conn):
+    """
+    Дописывает в сводки выдачи после последней обработанной и поправки из
+    Circulation_Log. Возвращает (новых выдач, поправок).
+    """
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        last = conn.execute(
+            "SELECT value FROM Circulation_State WHERE name = 'last_issue_id'"
+        ).fetchone()[0]
+        top = conn.execute("SELECT COALESCE(MAX(issue_id), 0) FROM Book_Issues").fetchone()[0]
+        change, changes = conn.execute(
+            "SELECT COALESCE(MAX(change_id), 0), COUNT(*) FROM Circulation_Log"
+        ).fetchone()
+        issues = conn.execute(
+            "SELECT COUNT(*) FROM Book_Issues WHERE issue_id > ? AND issue_id <= ?", (last, top)
+        ).fetchone()[0]
+        params = {"last": last, "top": max(top, last), "change": change}
+        conn.execute(_APPLY_BOOKS, params)
+        conn.execute(_APPLY_READERS, params)
+        conn.execute("DELETE FROM Circulation_Log WHERE change_id <= ?", (change,))
+        conn.execute(
+            "UPDATE Circulation_State SET value = ? WHERE name = 'last_issue_id'",
+            (max(top, last),)
+        )
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return issues, changes
+
+
+def rebuild_circulation(conn):
+    """Очищает сводки и строит их заново по всей истории выдач"""
+    try:
+        conn.execute("DELETE FROM Book_Circulation")
+        conn.execute("DELETE FROM Reader_Monthly_Loans")
+        conn.execute("DELETE FROM Circulation_Log")
+        conn.execute("UPDATE Circulation_State SET value = 0 WHERE name = 'last_issue_id'")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return refresh_circulation(conn)
+
+
+def overdue_loans(conn, as_of=None, loan_days=LOAN_PERIOD_DAYS):
+    """Книги на руках дольше loan_days дней на дату as_of (по умолчанию сегодня)"""
+    params = {"as_of": as_of or "now", "loan_days": loan_days}
+    return conn.execute(OVERDUE_QUERY, params).fetchall()
+
+
+def loans_per_reader(conn, months=3):
+    """Выдачи читателей по месяцам и их сумма за последние months месяцев"""
+    return conn.execute(LOANS_PER_READER_QUERY, {"window": months - 1}).fetchall()
+
+
+def most_borrowed_books(conn, limit=10):
+    """Самые востребованные книги с местом в рейтинге (одинаковые делят место)"""
+    return conn.execute(MOST_BORROWED_QUERY, {"limit": limit}).fetchall()
+
+
+def average_loan_duration(conn):
+    """Средний срок возвращенных выдач по книгам и по всей библиотеке"""
+    return conn.execute(LOAN_DURATION_QUERY).fetchall()
+
+
+def print_report(conn, as_of=None):
+    issues, changes = refresh_circulation(conn)
+    print(f"Сводки обновлены: новых выдач {issues}, поправок {changes}")
+
+    print("\nПросроченные выдачи:")
+    for issue in overdue_loans(conn, as_of):
+        print(f"{issue[1]} | {issue[2]} | Выдана: {issue[3]} | Просрочка: {issue[4]} дн.")
+
+    print("\nВыдачи по читателям (сумма за 3 месяца):")
+    for reader in loans_per_reader(conn):
+        print(f"{reader[0]} | {reader[1]} | {reader[2]} | За период: {reader[3]}")
+
+    print("\nСамые популярные книги:")
+    for book in most_borrowed_books(conn):
+        print(f"{book[3]}. {book[0]} | {book[1]} | Выдач: {book[2]}")
+
+    print("\nСредний срок выдачи:")
+    durations = average_loan_duration(conn)
+    for book in durations:
+        print(f"{book[0]}: {book[2]} дн. (возвратов: {book[1]})")
+    if durations:
+        print(f"По библиотеке: {durations[0][3]} дн.")
+
+
+def main(argv):
+    """python circulation.py [файл БД] [дата YYYY-MM-DD] | python circulation.py rebuild [файл БД]"""
+    if argv and argv[0] == "rebuild":
+        database = argv[1] if len(argv) > 1 else "library.db"
+        conn = sqlite3.connect(database)
+        try:
+            install_circulation(conn)
+            issues, _ = rebuild_circulation(conn)
+            print(f"Сводки {database} перестроены ({issues} выдач)")
+        finally:
+            conn.close()
+        return 0
+    database = argv[0] if argv else "library.db"
+    as_of = argv[1] if len(argv) > 1 else None
+    conn = sqlite3.connect(database)
+    try:
+        install_circulation(conn)
+        print_report(conn, as_of)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,202 @@
+"""
+Очередь отложенной записи комментариев.
+
+Вместо отдельной транзакции на каждый комментарий вызывающий код ставит
+комментарий в очередь и сразу получает Future. Фоновый поток собирает
+комментарии в пачку и записывает ее одной транзакцией, когда набралось
+max_batch строк или самый старый комментарий ждет max_delay секунд.
+Future получает id строки только после COMMIT, поэтому max_delay - это
+граница задержки надежной записи: комментарий, для которого Future уже
+завершен, записан в базу. Если комментарии поступают быстрее, чем
+записываются, задержку ограничивает max_pending: submit() ждет, пока
+в очереди не освободится место.
+
+Ошибка отдельной строки (например, нарушение внешнего ключа) отменяет
+только ее INSERT: остальные строки пачки фиксируются, а Future этой
+строки завершается исключением. Если не удался COMMIT, исключение
+получают все Future пачки.
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+
+COMMENT_BATCH_SIZE = 500
+COMMENT_MAX_DELAY = 0.05
+COMMENT_MAX_PENDING = 10000
+
+_INSERT_COMMENT = "INSERT INTO comments (text, post_id, user_id) VALUES (?, ?, ?)"
+
+
+class QueueClosedError(Exception):
+    """Очередь закрыта и больше не принимает комментарии"""
+
+
+class CommentQueue:
+    """
+    Очередь комментариев с групповой записью.
+
+    acquire/release - функции, которые выдают и возвращают соединение
+    (например, из пула). on_commit вызывается после каждой пачки со
+    списком id постов, получивших комментарии. max_pending ограничивает
+    число ожидающих записи комментариев: при переполнении submit() ждет.
+    """
+
+    def __init__(self, acquire, release, max_batch=COMMENT_BATCH_SIZE,
+                 max_delay=COMMENT_MAX_DELAY, max_pending=COMMENT_MAX_PENDING,
+                 on_commit=None):
+        if max_batch < 1 or max_pending < max_batch:
+            raise ValueError("Нужно 1 <= max_batch <= max_pending")
+        if max_delay < 0:
+            raise ValueError("max_delay не может быть отрицательным")
+        self.acquire = acquire
+        self.release = release
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.on_commit = on_commit
+        # concurrent.futures импортируется при создании очереди, а не при запуске
+        from concurrent.futures import Future
+        self._future = Future
+        # Элементы: (время постановки, (text, post_id, user_id), Future)
+        self._pending = deque()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {"submitted": 0, "written": 0, "failed": 0, "batches": 0,
+                       "max_lag": 0.0}
+        self._thread = threading.Thread(target=self._run, name="comment-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, post_id, user_id, timeout=None):
+        """Ставит комментарий в очередь; Future завершится id строки"""
+        future = self._future()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._closed and len(self._pending) >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Очередь комментариев переполнена")
+                self._condition.wait(remaining)
+            if self._closed:
+                raise QueueClosedError("Очередь комментариев закрыта")
+            self._pending.append((time.monotonic(), (text, post_id, user_id), future))
+            self._stats["submitted"] += 1
+            # Первый комментарий запускает отсчет max_delay у спящего потока записи
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Записывает все комментарии, поставленные до вызова, не дожидаясь
+        max_delay. Возвращает True, если запись завершилась за timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Перестает принимать комментарии, записывает оставшиеся и останавливает поток"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        """Счетчики очереди и число ожидающих записи комментариев"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending) + self._in_flight
+        return stats
+
+    def _take_batch(self):
+        """Ждет условия записи и забирает пачку; None - поток пора завершать"""
+        with self._condition:
+            while True:
+                if self._pending:
+                    age = time.monotonic() - self._pending[0][0]
+                    if (len(self._pending) >= self.max_batch or age >= self.max_delay
+                            or self._flush_requested or self._closed):
+                        break
+                    self._condition.wait(self.max_delay - age)
+                elif self._closed:
+                    return None
+                else:
+                    self._flush_requested = False
+                    self._condition.wait()
+            count = min(self.max_batch, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            self._in_flight = count
+            # Освободилось место для ожидающих submit()
+            self._condition.notify_all()
+            return batch
+
+    def _write(self, batch):
+        """Записывает пачку одной транзакцией; возвращает результаты строк"""
+        results = []
+        conn = self.acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for _, row, _ in batch:
+                try:
+                    results.append(conn.execute(_INSERT_COMMENT, row).lastrowid)
+                except sqlite3.IntegrityError as e:
+                    results.append(e)
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            results = [e] * len(batch)
+        finally:
+            self.release(conn)
+        return results
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                results = self._write(batch)
+            except Exception as e:
+                # Например, не удалось получить соединение из пула
+                results = [e] * len(batch)
+            committed_at = time.monotonic()
+            posts = sorted({row[1] for (_, row, _), result in zip(batch, results)
+                            if not isinstance(result, Exception)})
+            # Обработчик (например, сброс кэша) вызывается до завершения
+            # Future, чтобы вызывающий код сразу видел новые комментарии
+            if posts and self.on_commit is not None:
+                # Строки уже записаны: ошибка обработчика не должна останавливать поток
+                try:
+                    self.on_commit(posts)
+                except Exception:
+                    pass
+            written = 0
+            for (_, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+                    written += 1
+            with self._condition:
+                self._stats["batches"] += 1
+                self._stats["written"] += written
+                self._stats["failed"] += len(batch) - written
+                self._stats["max_lag"] = max(self._stats["max_lag"], committed_at - batch[0][0])
+                self._in_flight = 0
+                self._condition.notify_all()
@@ -1,8 +1,58 @@
+import atexit
+import base64
+import functools
+import json
 import sqlite3
+import sys
+import threading
+from collections import namedtuple
 from datetime import datetime
 
+# archive, comment_queue, feed, instrumentation и search импортируются в
+# функциях, которые их используют, чтобы не замедлять запуск
+from cache import QueryCache
+from indexes import BLOG_INDEXES, check_query_plans, ensure_indexes
+from pool import ConnectionPool
+from profiles import DEFAULT_PROFILE, get_profile, profile_statements
+
+DB_PATH = 'blog.db'
+POOL_SIZE = 5
+BULK_CHUNK_SIZE = 500
+CACHE_SIZE = 256
+CACHE_TTL = 30.0
+# Каталог баз архива старых постов (см. archive.py)
+ARCHIVE_DIR = 'archive'
+
+_pool = None
+_profile = DEFAULT_PROFILE
+# Пул, назначенный текущему потоку через use_pool()
+_local = threading.local()
+# Выданное соединение -> пул, который его выдал
+_issued = {}
+# Кэш горячих запросов. Теги записей: "posts:all" - общая лента,
+# "category:<имя>" - лента категории. Комментарии в кэшируемые запросы
+# не входят, поэтому их запись кэш не сбрасывает
+_cache = QueryCache(CACHE_SIZE, CACHE_TTL)
+# Метрики запросов и функций API; создаются при первом обращении и
+# включаются configure_instrumentation()
+_instrumentation = None
+# Очередь групповой записи комментариев; создается при первом обращении
+_comment_queue = None
+
+def _instrumented(function):
+    """Учитывает вызовы функции API в метриках инструментирования"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _instrumentation is None or not _instrumentation.enabled:
+            return function(*args, **kwargs)
+        with _instrumentation.function(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+@_instrumented
 def create_blog_database():
-    conn = sqlite3.connect('blog.db')
+    conn = get_connection()
     cursor = conn.cursor()
 
     try:
@@ -46,6 +96,11 @@ def create_blog_database():
             )
         """)
         
+        import feed
+        import search
+        ensure_indexes(conn, BLOG_INDEXES)
+        search.ensure_search_schema(conn)
+        feed.ensure_feed_schema(conn)
         conn.commit()
         print("База данных блога успешно создана!")
         
@@ -53,15 +108,122 @@ def create_blog_database():
         conn.rollback()
         print(f"Ошибка при создании БД: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
+
+def configure_pool(size=POOL_SIZE, timeout=5.0, health_check=True, profile=None):
+    """
+    Пересоздает пул соединений с заданными параметрами.
+    profile - имя профиля из profiles.PROFILES (по умолчанию текущий)
+    """
+    global _pool, _profile
+    if profile is not None:
+        get_profile(profile)
+        _profile = profile
+    if _pool is not None:
+        _pool.close()
+    _pool = create_pool(size, timeout, health_check)
+    return _pool
+
+def create_pool(size=POOL_SIZE, timeout=5.0, health_check=True, database=None):
+    """
+    Создает отдельный пул соединений с текущим профилем; database - файл
+    базы блога (по умолчанию DB_PATH)
+    """
+    if _instrumentation is not None and _instrumentation.enabled:
+        from instrumentation import InstrumentedConnection
+        factory, on_connect = InstrumentedConnection, _instrumentation.attach
+    else:
+        factory, on_connect = sqlite3.Connection, None
+    return ConnectionPool(
+        database or DB_PATH,
+        size=size,
+        timeout=timeout,
+        # Включаем поддержку внешних ключей
+        init_statements=["PRAGMA foreign_keys = ON"] + profile_statements(_profile),
+        health_check=health_check,
+        factory=factory,
+        on_connect=on_connect,
+    )
+
+def use_pool(pool):
+    """
+    Назначает текущему потоку собственный пул: функции модуля берут
+    соединения из него, а не из общего. None возвращает общий пул.
+    """
+    _local.pool = pool
+
+def set_profile(name):
+    """Переключает профиль производительности, пересоздавая пул"""
+    pool = get_pool()
+    configure_pool(size=pool.size, timeout=pool.timeout,
+                   health_check=pool.health_check, profile=name)
+    print(f"Активный профиль БД: {name}")
+
+def get_active_profile():
+    """Возвращает имя и настройки активного профиля"""
+    return _profile, dict(get_profile(_profile))
+
+def get_pool():
+    """Возвращает пул соединений блога, создавая его при первом обращении"""
+    pool = getattr(_local, "pool", None)
+    if pool is not None:
+        return pool
+    if _pool is None:
+        configure_pool()
+    return _pool
 
 def get_connection():
-    """Создает и возвращает соединение с базой данных"""
-    conn = sqlite3.connect('blog.db')
-    # Включаем поддержку внешних ключей
-    conn.execute("PRAGMA foreign_keys = ON")
+    """Берет соединение из пула; вернуть его нужно через release_connection()"""
+    pool = get_pool()
+    conn = pool.acquire()
+    _issued[conn] = pool
     return conn
 
+def release_connection(conn):
+    """
+    Возвращает соединение в пул, который его выдал: если пул с тех пор
+    пересоздан, старый пул закрыт и соединение закрывается
+    """
+    pool = _issued.pop(conn, None)
+    (pool or get_pool()).release(conn)
+
+def configure_cache(maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+    """Пересоздает кэш запросов; ttl=0 отключает истечение записей"""
+    global _cache
+    _cache = QueryCache(maxsize, ttl)
+    return _cache
+
+def get_cache_stats():
+    """Возвращает счетчики кэша запросов"""
+    return _cache.stats()
+
+def configure_instrumentation(slow_query_ms=100.0, slow_log_size=100, explain=True,
+                              statement_timeout=None, enabled=True):
+    """
+    Включает (или выключает) сбор метрик запросов и журнал медленных
+    запросов. Пул пересоздается, чтобы подключить новые соединения.
+    """
+    instrumentation = get_instrumentation()
+    instrumentation.configure(slow_query_ms, slow_log_size, explain, statement_timeout)
+    instrumentation.enabled = enabled
+    if _pool is not None:
+        configure_pool(size=_pool.size, timeout=_pool.timeout,
+                       health_check=_pool.health_check)
+    return instrumentation
+
+def get_instrumentation():
+    """Возвращает сборщик метрик (для слушателей и сервера метрик)"""
+    global _instrumentation
+    if _instrumentation is None:
+        from instrumentation import Instrumentation
+        _instrumentation = Instrumentation(enabled=False)
+    return _instrumentation
+
+def get_metrics():
+    """Возвращает метрики запросов, функций API и журнал медленных запросов"""
+    return get_instrumentation().snapshot()
+
+@_instrumented
 def add_user(username, email):
     """
     Добавляет нового пользователя в базу данных
@@ -85,8 +247,9 @@ def add_user(username, email):
         print(f"Ошибка при добавлении пользователя: {e}")
         return None
     finally:
-        conn.close()
+        release_connection(conn)
 
+@_instrumented
 def create_post(title, content, user_id, category_id):
     """
     Создает новый пост в блоге
@@ -100,8 +263,9 @@ def create_post(title, content, user_id, category_id):
             print("Ошибка: пользователь не существует")
             return None
         
-        cursor.execute("SELECT id FROM categories WHERE id = ?", (category_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT name FROM categories WHERE id = ?", (category_id,))
+        category = cursor.fetchone()
+        if not category:
             print("Ошибка: категория не существует")
             return None
         
@@ -111,6 +275,7 @@ def create_post(title, content, user_id, category_id):
             (title, content, user_id, category_id)
         )
         conn.commit()
+        _cache.invalidate("posts:all", f"category:{category[0]}")
         print(f"Пост '{title}' успешно создан!")
         return cursor.lastrowid
     except sqlite3.Error as e:
@@ -118,12 +283,9 @@ def create_post(title, content, user_id, category_id):
         print(f"Ошибка при создании поста: {e}")
         return None
     finally:
-        conn.close()
+        release_connection(conn)
 
-def get_all_posts_with_authors():
-    """
-    Возвращает все посты с информацией об авторах и категориях
-    """
+def _load_all_posts():
     conn = get_connection()
     cursor = conn.cursor()
     
@@ -139,33 +301,36 @@ def get_all_posts_with_authors():
             FROM posts p
             JOIN users u ON p.user_id = u.id
             JOIN categories c ON p.category_id = c.id
-            ORDER BY p.created_at DESC
+            ORDER BY p.created_at DESC, p.id DESC
         """)
-        
-        posts = cursor.fetchall()
-        
-        if not posts:
-            print("В блоге пока нет постов")
-            return []
-        
-        print("\n=== ВСЕ ПОСТЫ В БЛОГЕ ===\n")
-        for post in posts:
-            post_id, title, content, created_at, author, category = post
-            print(f"ID: {post_id}")
-            print(f"Заголовок: {title}")
-            print(f"Автор: {author}")
-            print(f"Категория: {category}")
-            print(f"Дата: {created_at}")
-            print(f"Содержание: {content[:100]}..." if len(content) > 100 else f"Содержание: {content}")
-            print("-" * 50)
-        
+        return cursor.fetchall()
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def fetch_all_posts(cached=True):
+    """
+    Возвращает все посты с авторами и категориями через кэш, без вывода;
+    cached=False - прямо из базы
+    """
+    if not cached:
+        return list(_load_all_posts())
+    return list(_cache.get_or_load(("all_posts",), _load_all_posts, tags=("posts:all",)))
+
+@_instrumented
+def get_all_posts_with_authors():
+    """
+    Возвращает все посты с информацией об авторах и категориях
+    """
+    try:
+        posts = fetch_all_posts()
+        print_posts(posts)
         return posts
     except sqlite3.Error as e:
         print(f"Ошибка при получении постов: {e}")
         return []
-    finally:
-        conn.close()
 
+@_instrumented
 def add_category(name):
     """Добавляет новую категорию"""
     conn = get_connection()
@@ -174,6 +339,7 @@ def add_category(name):
     try:
         cursor.execute("INSERT INTO categories (name) VALUES (?)", (name,))
         conn.commit()
+        _cache.invalidate(f"category:{name}")
         print(f"Категория '{name}' успешно добавлена!")
         return cursor.lastrowid
     except sqlite3.IntegrityError:
@@ -184,8 +350,9 @@ def add_category(name):
         print(f"Ошибка при добавлении категории: {e}")
         return None
     finally:
-        conn.close()
+        release_connection(conn)
 
+@_instrumented
 def add_comment(text, post_id, user_id):
     """Добавляет комментарий к посту"""
     conn = get_connection()
@@ -205,8 +372,245 @@ def add_comment(text, post_id, user_id):
         print(f"Ошибка при добавлении комментария: {e}")
         return None
     finally:
-        conn.close()
+        release_connection(conn)
 
+def configure_comment_queue(max_batch=None, max_delay=None, max_pending=None):
+    """
+    Пересоздает очередь комментариев. max_delay - граница задержки записи
+    в секундах, max_batch - размер пачки, max_pending - предел ожидающих
+    (None - значения по умолчанию из comment_queue.py).
+    Комментарии старой очереди записываются до ее закрытия.
+    """
+    from comment_queue import (COMMENT_BATCH_SIZE, COMMENT_MAX_DELAY, COMMENT_MAX_PENDING,
+                               CommentQueue)
+    global _comment_queue
+    if _comment_queue is not None:
+        _comment_queue.close()
+    _comment_queue = CommentQueue(
+        get_connection, release_connection,
+        max_batch=COMMENT_BATCH_SIZE if max_batch is None else max_batch,
+        max_delay=COMMENT_MAX_DELAY if max_delay is None else max_delay,
+        max_pending=COMMENT_MAX_PENDING if max_pending is None else max_pending,
+    )
+    return _comment_queue
+
+def get_comment_queue():
+    """Возвращает очередь комментариев, создавая ее при первом обращении"""
+    if _comment_queue is None or _comment_queue.closed:
+        configure_comment_queue()
+    return _comment_queue
+
+@_instrumented
+def add_comment_async(text, post_id, user_id):
+    """
+    Ставит комментарий в очередь групповой записи и возвращает Future,
+    который завершится id комментария после COMMIT пачки (или исключением)
+    """
+    return get_comment_queue().submit(text, post_id, user_id)
+
+def flush_comments(timeout=None):
+    """Записывает все комментарии из очереди; True, если успели за timeout"""
+    if _comment_queue is None:
+        return True
+    return _comment_queue.flush(timeout)
+
+@atexit.register
+def _close_comment_queue():
+    # Ожидающие комментарии записываются при завершении программы
+    if _comment_queue is not None:
+        _comment_queue.close()
+
+# Результат пакетной вставки для одной строки: row_id задан при успехе,
+# error содержит описание ошибки, если строка была отклонена
+BulkResult = namedtuple('BulkResult', ['index', 'row_id', 'error'])
+
+def _chunks(rows, size):
+    """Разбивает итерируемый источник строк на списки длиной не больше size"""
+    chunk = []
+    for row in rows:
+        chunk.append(tuple(row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _existing(cursor, table, column, values):
+    """Возвращает множество значений column, которые уже есть в таблице"""
+    values = set(values)
+    if not values:
+        return set()
+    placeholders = ", ".join("?" * len(values))
+    cursor.execute(
+        f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})",
+        tuple(values)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+def _check_shape(chunk, width):
+    """Проверяет количество полей и отсутствие NULL в обязательных полях"""
+    errors = []
+    for row in chunk:
+        if len(row) != width:
+            errors.append(f"ожидалось полей: {width}, получено: {len(row)}")
+        elif any(value is None for value in row):
+            errors.append("пустое обязательное поле")
+        else:
+            errors.append(None)
+    return errors
+
+def _check_unique(cursor, chunk, errors, table, columns):
+    """Отклоняет строки, нарушающие UNIQUE по любому из столбцов"""
+    for position, column in columns:
+        taken = _existing(cursor, table, column,
+                          (row[position] for row, error in zip(chunk, errors) if error is None))
+        for i, row in enumerate(chunk):
+            if errors[i] is not None:
+                continue
+            if row[position] in taken:
+                errors[i] = f"{column} '{row[position]}' уже существует"
+            else:
+                taken.add(row[position])
+    return errors
+
+def _check_references(cursor, chunk, errors, references):
+    """Отклоняет строки со ссылками на несуществующие записи"""
+    for position, table, message in references:
+        found = _existing(cursor, table, "id",
+                          (row[position] for row, error in zip(chunk, errors) if error is None))
+        for i, row in enumerate(chunk):
+            if errors[i] is None and row[position] not in found:
+                errors[i] = message
+    return errors
+
+def _bulk_insert(sql, rows, chunk_size, validate, label):
+    """
+    Вставляет строки пачками через executemany в одной транзакции.
+
+    validate(cursor, chunk) возвращает для каждой строки None или текст
+    ошибки; отклоненные строки пропускаются, остальные вставляются.
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер пачки должен быть не меньше 1")
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    results = []
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for chunk in _chunks(rows, chunk_size):
+            errors = validate(cursor, chunk)
+            valid = [row for row, error in zip(chunk, errors) if error is None]
+            next_id = None
+            if valid:
+                cursor.executemany(sql, valid)
+                # Транзакция держит блокировку записи, а AUTOINCREMENT выдает
+                # идентификаторы подряд, поэтому id пачки восстанавливаются
+                # по последнему вставленному
+                cursor.execute("SELECT last_insert_rowid()")
+                next_id = cursor.fetchone()[0] - len(valid) + 1
+            for row, error in zip(chunk, errors):
+                if error is None:
+                    results.append(BulkResult(len(results), next_id, None))
+                    next_id += 1
+                else:
+                    results.append(BulkResult(len(results), None, error))
+        conn.commit()
+        failed = sum(1 for result in results if result.error is not None)
+        print(f"Пакетно добавлено {label}: {len(results) - failed}, отклонено: {failed}")
+        return results
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при пакетном добавлении {label}: {e}")
+        return None
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def add_users_bulk(users, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Пакетно добавляет пользователей из итерируемого источника (username, email).
+    Возвращает список BulkResult в порядке входных строк.
+    """
+    def validate(cursor, chunk):
+        errors = _check_shape(chunk, 2)
+        return _check_unique(cursor, chunk, errors, "users",
+                             [(0, "username"), (1, "email")])
+
+    return _bulk_insert(
+        "INSERT INTO users (username, email) VALUES (?, ?)",
+        users, chunk_size, validate, "пользователей"
+    )
+
+@_instrumented
+def add_categories_bulk(names, chunk_size=BULK_CHUNK_SIZE):
+    """Пакетно добавляет категории по названиям"""
+    added = set()
+
+    def validate(cursor, chunk):
+        errors = _check_shape(chunk, 1)
+        errors = _check_unique(cursor, chunk, errors, "categories", [(0, "name")])
+        added.update(row[0] for row, error in zip(chunk, errors) if error is None)
+        return errors
+
+    results = _bulk_insert(
+        "INSERT INTO categories (name) VALUES (?)",
+        ((name,) for name in names), chunk_size, validate, "категорий"
+    )
+    _cache.invalidate(*(f"category:{name}" for name in added))
+    return results
+
+@_instrumented
+def create_posts_bulk(posts, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Пакетно создает посты из итерируемого источника
+    (title, content, user_id, category_id).
+    """
+    touched = set()
+
+    def validate(cursor, chunk):
+        errors = _check_shape(chunk, 4)
+        errors = _check_references(cursor, chunk, errors, [
+            (2, "users", "пользователь не существует"),
+            (3, "categories", "категория не существует"),
+        ])
+        category_ids = {row[3] for row, error in zip(chunk, errors) if error is None}
+        if category_ids:
+            placeholders = ", ".join("?" * len(category_ids))
+            cursor.execute(
+                f"SELECT name FROM categories WHERE id IN ({placeholders})",
+                tuple(category_ids)
+            )
+            touched.update(f"category:{row[0]}" for row in cursor.fetchall())
+        return errors
+
+    results = _bulk_insert(
+        """INSERT INTO posts (title, content, user_id, category_id) 
+           VALUES (?, ?, ?, ?)""",
+        posts, chunk_size, validate, "постов"
+    )
+    _cache.invalidate("posts:all", *touched)
+    return results
+
+@_instrumented
+def add_comments_bulk(comments, chunk_size=BULK_CHUNK_SIZE):
+    """Пакетно добавляет комментарии из источника (text, post_id, user_id)"""
+    def validate(cursor, chunk):
+        errors = _check_shape(chunk, 3)
+        errors = _check_references(cursor, chunk, errors, [
+            (1, "posts", "пост не существует"),
+            (2, "users", "пользователь не существует"),
+        ])
+        return errors
+
+    return _bulk_insert(
+        """INSERT INTO comments (text, post_id, user_id) 
+           VALUES (?, ?, ?)""",
+        comments, chunk_size, validate, "комментариев"
+    )
+
+@_instrumented
 def populate_test_data():
     """Заполняет базу данных тестовыми данными"""
     print("Заполняем базу тестовыми данными...")
@@ -217,18 +621,10 @@ def populate_test_data():
         ('alex_reader', 'alex@example.org')
     ]
     
-    user_ids = []
-    for username, email in users:
-        user_id = add_user(username, email)
-        if user_id:
-            user_ids.append(user_id)
+    user_ids = [r.row_id for r in add_users_bulk(users) or [] if r.row_id]
     
     categories = ['Python', 'Базы данных', 'Веб-разработка']
-    category_ids = []
-    for category in categories:
-        cat_id = add_category(category)
-        if cat_id:
-            category_ids.append(cat_id)
+    category_ids = [r.row_id for r in add_categories_bulk(categories) or [] if r.row_id]
     
     posts = [
         ('Мой первый пост на Python', 'Сегодня я изучил основы Python. Это удивительный язык с простым синтаксисом и большими возможностями. Особенно понравились списки и словари!', user_ids[0], category_ids[0]),
@@ -236,13 +632,11 @@ def populate_test_data():
         ('Django vs Flask', 'Сравниваем два популярных фреймворка для веб-разработки на Python. Django - это полноценный фреймворк, а Flask - микрофреймворк с большей гибкостью.', user_ids[0], category_ids[2])
     ]
     
-    for title, content, user_id, cat_id in posts:
-        create_post(title, content, user_id, cat_id)
+    create_posts_bulk(posts)
     
     print("Тестовые данные успешно добавлены!")
 
-def get_posts_by_category(category_name):
-    """Возвращает посты определенной категории"""
+def _load_posts_by_category(category_name):
     conn = get_connection()
     cursor = conn.cursor()
     
@@ -253,36 +647,346 @@ def get_posts_by_category(category_name):
             JOIN users u ON p.user_id = u.id
             JOIN categories c ON p.category_id = c.id
             WHERE c.name = ?
-            ORDER BY p.created_at DESC
+            ORDER BY p.created_at DESC, p.id DESC
         """, (category_name,))
-        
-        posts = cursor.fetchall()
-        
-        if not posts:
-            print(f"В категории '{category_name}' пока нет постов")
-            return []
-        
-        print(f"\n=== ПОСТЫ В КАТЕГОРИИ '{category_name.upper()}' ===\n")
-        for post in posts:
-            post_id, title, content, created_at, author = post
-            print(f"Заголовок: {title}")
-            print(f"Автор: {author}")
-            print(f"Дата: {created_at}")
-            print(f"Содержание: {content[:80]}..." if len(content) > 80 else f"Содержание: {content}")
-            print("-" * 40)
-        
+        return cursor.fetchall()
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def fetch_posts_by_category(category_name, cached=True):
+    """Возвращает посты категории через кэш (cached=False - прямо из базы), без вывода"""
+    if not cached:
+        return list(_load_posts_by_category(category_name))
+    return list(_cache.get_or_load(
+        ("posts_by_category", category_name),
+        lambda: _load_posts_by_category(category_name),
+        tags=(f"category:{category_name}",)
+    ))
+
+@_instrumented
+def get_posts_by_category(category_name):
+    """Возвращает посты определенной категории"""
+    try:
+        posts = fetch_posts_by_category(category_name)
+        print_category_posts(category_name, posts)
         return posts
     except sqlite3.Error as e:
         print(f"Ошибка при получении постов: {e}")
         return []
+
+def print_posts(posts):
+    """Выводит посты (id, title, content, created_at, author, category)"""
+    printed = False
+    for post in posts:
+        if not printed:
+            print("\n=== ВСЕ ПОСТЫ В БЛОГЕ ===\n")
+            printed = True
+        post_id, title, content, created_at, author, category = post
+        print(f"ID: {post_id}")
+        print(f"Заголовок: {title}")
+        print(f"Автор: {author}")
+        print(f"Категория: {category}")
+        print(f"Дата: {created_at}")
+        print(f"Содержание: {content[:100]}..." if len(content) > 100 else f"Содержание: {content}")
+        print("-" * 50)
+    
+    if not printed:
+        print("В блоге пока нет постов")
+
+def print_category_posts(category_name, posts):
+    """Выводит посты категории (первые пять полей строки поста)"""
+    printed = False
+    for post in posts:
+        if not printed:
+            print(f"\n=== ПОСТЫ В КАТЕГОРИИ '{category_name.upper()}' ===\n")
+            printed = True
+        post_id, title, content, created_at, author = post[:5]
+        print(f"Заголовок: {title}")
+        print(f"Автор: {author}")
+        print(f"Дата: {created_at}")
+        print(f"Содержание: {content[:80]}..." if len(content) > 80 else f"Содержание: {content}")
+        print("-" * 40)
+    
+    if not printed:
+        print(f"В категории '{category_name}' пока нет постов")
+
+POSTS_PAGE_SIZE = 20
+POSTS_BATCH_SIZE = 100
+
+# Общая часть запросов постраничной выборки; строки упорядочены по
+# (created_at, id) по убыванию, id разрешает совпадения дат
+_POSTS_SELECT = """
+    SELECT 
+        p.id, 
+        p.title, 
+        p.content, 
+        p.created_at,
+        u.username as author,
+        c.name as category
+    FROM {source} p
+    JOIN users u ON p.user_id = u.id
+    JOIN categories c ON p.category_id = c.id
+"""
+
+def encode_cursor(created_at, post_id):
+    """Кодирует позицию последнего поста страницы в строковый токен"""
+    raw = json.dumps([created_at, post_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(token):
+    """Разбирает токен страницы; при некорректном токене - ValueError"""
+    try:
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Некорректный токен страницы: {token!r}") from e
+    return created_at, post_id
+
+def _posts_query(category_name=None, after=None, source="posts"):
+    """
+    Собирает запрос постов с фильтром по категории и позиции keyset.
+    source="all_posts" - посты вместе с архивом (см. archive.attach_archives)
+    """
+    conditions = []
+    params = []
+    if category_name is not None:
+        conditions.append("c.name = ?")
+        params.append(category_name)
+    if after is not None:
+        conditions.append("(p.created_at, p.id) < (?, ?)")
+        params.extend(after)
+    sql = _POSTS_SELECT.format(source=source)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY p.created_at DESC, p.id DESC"
+    return sql, params
+
+@_instrumented
+def get_posts_page(limit=POSTS_PAGE_SIZE, cursor_token=None, category_name=None,
+                   include_archive=False):
+    """
+    Возвращает страницу постов и токен следующей страницы.
+    Следующая страница начинается строго после последнего поста текущей
+    (keyset-пагинация), поэтому OFFSET не используется. Токен равен None,
+    если постов больше нет. include_archive=True - с архивными постами.
+    """
+    if limit < 1:
+        raise ValueError("Размер страницы должен быть не меньше 1")
+    after = decode_cursor(cursor_token) if cursor_token else None
+    sql, params = _posts_query(category_name, after,
+                               "all_posts" if include_archive else "posts")
+    
+    errors = (sqlite3.Error,)
+    if include_archive:
+        import archive
+        errors += (archive.ArchiveError,)
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if include_archive:
+            archive.attach_archives(conn, ARCHIVE_DIR)
+        # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+        cursor.execute(sql + " LIMIT ?", params + [limit + 1])
+        posts = cursor.fetchall()
+        next_token = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            last = posts[-1]
+            next_token = encode_cursor(last[3], last[0])
+        return posts, next_token
+    except errors as e:
+        print(f"Ошибка при получении постов: {e}")
+        return [], None
+    finally:
+        release_connection(conn)
+
+def iter_posts(category_name=None, batch_size=POSTS_BATCH_SIZE, include_archive=False):
+    """
+    Генератор постов: строки читаются из курсора пачками через fetchmany.
+    Соединение возвращается в пул, когда генератор исчерпан или закрыт.
+    """
+    sql, params = _posts_query(category_name, None,
+                               "all_posts" if include_archive else "posts")
+    errors = (sqlite3.Error,)
+    if include_archive:
+        import archive
+        errors += (archive.ArchiveError,)
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if include_archive:
+            archive.attach_archives(conn, ARCHIVE_DIR)
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+    except errors as e:
+        print(f"Ошибка при получении постов: {e}")
+    finally:
+        cursor.close()
+        release_connection(conn)
+
+@_instrumented
+def get_feed_page(limit=None, cursor_token=None, category_name=None):
+    """
+    Страница ленты из денормализованной таблицы post_feed: строки
+    (id, title, created_at, author, category, comment_count) и токен
+    следующей страницы, как в get_posts_page(). limit по умолчанию -
+    feed.FEED_PAGE_SIZE
+    """
+    import feed
+    if limit is None:
+        limit = feed.FEED_PAGE_SIZE
+    if limit < 1:
+        raise ValueError("Размер страницы должен быть не меньше 1")
+    after = decode_cursor(cursor_token) if cursor_token else None
+    sql, params = feed.feed_query(category_name, after)
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(sql + " LIMIT ?", params + [limit + 1])
+        rows = cursor.fetchall()
+        next_token = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_token = encode_cursor(last[2], last[0])
+        return rows, next_token
+    except sqlite3.Error as e:
+        print(f"Ошибка при получении ленты: {e}")
+        return [], None
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def check_post_feed(repair=False):
+    """
+    Сверяет ленту post_feed с исходными таблицами. Возвращает id постов
+    с расхождениями; при repair=True их строки пересобираются.
+    """
+    import feed
+    conn = get_connection()
+    
+    try:
+        post_ids = feed.check_feed(conn, repair)
+        if post_ids:
+            action = "исправлено" if repair else "найдено"
+            print(f"Расхождений в ленте {action}: {len(post_ids)}")
+        else:
+            print("Лента согласована с исходными таблицами")
+        return post_ids
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при проверке ленты: {e}")
+        return None
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def rebuild_post_feed():
+    """Полностью пересобирает ленту post_feed"""
+    import feed
+    conn = get_connection()
+    
+    try:
+        feed.rebuild_feed(conn)
+        print("Лента постов пересобрана")
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при пересборке ленты: {e}")
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def search_posts(query, limit=20, offset=0):
+    """
+    Полнотекстовый поиск постов по заголовку, тексту и комментариям.
+    Возвращает строки (id, title, author, category, created_at, snippet, score)
+    """
+    import search
+    conn = get_connection()
+    
+    try:
+        return search.search_posts(conn, query, limit, offset)
+    except sqlite3.Error as e:
+        print(f"Ошибка при поиске постов: {e}")
+        return []
     finally:
-        conn.close()
+        release_connection(conn)
 
-def main():
-    """Основная функция для демонстрации работы блога"""
+@_instrumented
+def rebuild_search_index():
+    """Перестраивает поисковый индекс по текущим постам и комментариям"""
+    import search
+    conn = get_connection()
+    
+    try:
+        search.rebuild_search_index(conn)
+        print("Поисковый индекс перестроен")
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при перестроении поискового индекса: {e}")
+    finally:
+        release_connection(conn)
+
+@_instrumented
+def archive_old_posts(cutoff, period="year"):
+    """
+    Переносит посты старше cutoff (YYYY-MM-DD) без свежих комментариев
+    в архивные базы по периодам (year или month)
+    """
+    import archive
+    try:
+        moved = archive.archive_posts(DB_PATH, cutoff, ARCHIVE_DIR, period)
+    except (sqlite3.Error, archive.ArchiveError) as e:
+        print(f"Ошибка при архивировании постов: {e}")
+        return None
+    # Ленты и категории изменились целиком
+    _cache.clear()
+    posts = sum(count for count, _ in moved.values())
+    comments = sum(count for _, count in moved.values())
+    print(f"В архив перенесено постов: {posts}, комментариев: {comments}")
+    return moved
+
+def blog_hot_queries():
+    """Горячие запросы блога: (имя, sql, параметры, запрещенные для скана таблицы)"""
+    import feed
+    return [
+        ("all_posts", *_posts_query(), {"p"}),
+        ("all_posts_page", *_posts_query(None, ("", 0)), {"p"}),
+        ("posts_by_category", *_posts_query("Python"), {"p", "c"}),
+        ("posts_by_category_page", *_posts_query("Python", ("", 0)), {"p", "c"}),
+        ("feed_page", *feed.feed_query(None, ("", 0)), {"f"}),
+        ("feed_by_category_page", *feed.feed_query("Python", ("", 0)), {"f"}),
+        ("posts_by_user", "SELECT id FROM posts WHERE user_id = ?", [1], {"posts"}),
+        ("comments_by_post",
+         "SELECT id, text FROM comments WHERE post_id = ? ORDER BY created_at",
+         [1], {"comments"}),
+        ("comments_by_user", "SELECT id FROM comments WHERE user_id = ?", [1], {"comments"}),
+    ]
+
+def verify_query_plans():
+    """
+    Проверяет EXPLAIN QUERY PLAN горячих запросов блога.
+    Выбрасывает indexes.QueryPlanError, если какой-то из них сканирует таблицу.
+    """
+    with get_pool().connection() as conn:
+        return check_query_plans(conn, blog_hot_queries())
+
+def demo():
+    """Демонстрация работы блога"""
     
     create_blog_database()
     
+    verify_query_plans()
+    print("Планы горячих запросов используют индексы")
+    
     populate_test_data()
     
     get_all_posts_with_authors()
@@ -301,5 +1005,30 @@ def main():
     print("\n=== ПОСТЫ В КАТЕГОРИИ 'PYTHON' ===\n")
     get_posts_by_category('Python')
 
+def main(argv):
+    """
+    python db.py [demo] - демонстрация: схема, тестовые данные, выборки
+    python db.py schema - создание схемы блога
+    python db.py seed - схема и тестовые данные
+    python db.py report [категория] - список постов (всех или категории)
+    """
+    command = argv[0] if argv else "demo"
+    if command == "demo" and len(argv) <= 1:
+        demo()
+    elif command == "schema" and len(argv) == 1:
+        create_blog_database()
+    elif command == "seed" and len(argv) == 1:
+        create_blog_database()
+        populate_test_data()
+    elif command == "report" and len(argv) <= 2:
+        if len(argv) == 2:
+            get_posts_by_category(argv[1])
+        else:
+            get_all_posts_with_authors()
+    else:
+        print(main.__doc__)
+        return 1
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main(sys.argv[1:]))
\ No newline at end of file
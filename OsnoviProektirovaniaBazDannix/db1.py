@@ -1,148 +1,216 @@
 import sqlite3
+import sys
 
-# Подключение к базе данных (файл создается автоматически)
-conn = sqlite3.connect('library.db')
-cursor = conn.cursor()
-
-print("=== СОЗДАНИЕ БАЗЫ ДАННЫХ БИБЛИОТЕКИ ===")
-
-# 1. Создание таблиц с PRIMARY KEY и FOREIGN KEY
-print("\n1. Создание таблиц...")
-
-# Таблица авторов
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Authors (
-    author_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    first_name TEXT NOT NULL,
-    last_name TEXT NOT NULL,
-    birth_year INTEGER
-)
-""")
-
-# Таблица жанров
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Genres (
-    genre_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    genre_name TEXT NOT NULL UNIQUE
-)
-""")
-
-# Таблица читателей
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Readers (
-    reader_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    first_name TEXT NOT NULL,
-    last_name TEXT NOT NULL,
-    email TEXT UNIQUE,
-    registration_date DATE DEFAULT CURRENT_DATE
-)
-""")
-
-# Таблица книг
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Books (
-    book_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    author_id INTEGER NOT NULL,
-    genre_id INTEGER NOT NULL,
-    publication_year INTEGER,
-    isbn TEXT UNIQUE,
-    FOREIGN KEY (author_id) REFERENCES Authors(author_id) ON DELETE CASCADE,
-    FOREIGN KEY (genre_id) REFERENCES Genres(genre_id) ON DELETE CASCADE
-)
-""")
-
-# Таблица выдачи книг
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Book_Issues (
-    issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    book_id INTEGER NOT NULL,
-    reader_id INTEGER NOT NULL,
-    issue_date DATE NOT NULL DEFAULT CURRENT_DATE,
-    return_date DATE,
-    FOREIGN KEY (book_id) REFERENCES Books(book_id) ON DELETE CASCADE,
-    FOREIGN KEY (reader_id) REFERENCES Readers(reader_id) ON DELETE CASCADE
-)
-""")
-
-print("Таблицы успешно созданы!")
-
-# 2. Наполнение таблиц тестовыми данными
-print("\n2. Наполнение таблиц тестовыми данными...")
-
-# Добавление авторов
-authors_data = [
-    ('Лев', 'Толстой', 1828),
-    ('Фёдор', 'Достоевский', 1821),
-    ('Антон', 'Чехов', 1860),
-    ('Александр', 'Пушкин', 1799)
+from circulation import (LOAN_PERIOD_DAYS, OVERDUE_QUERY, install_circulation, overdue_loans,
+                         refresh_circulation)
+from indexes import LIBRARY_INDEXES, check_query_plans, ensure_indexes
+from library_stats import BOOKS_PER_AUTHOR_QUERY, get_stats, install_stats
+from loader import CHECKPOINT_SCHEMA, file_source, load_file, reset_checkpoint, upsert_sql
+from migrations import apply_migrations, get_version
+from profiles import DEFAULT_PROFILE, apply_profile
+
+DB_PATH = 'library.db'
+
+# Профиль производительности: durable, balanced или bulk-load
+PROFILE = DEFAULT_PROFILE
+
+# Таблица -> столбцы, первичный ключ и естественный ключ для upsert
+LIBRARY_TABLES = {
+    "Authors": {
+        "columns": ["author_id", "first_name", "last_name", "birth_year"],
+        "key": ["author_id"],
+        "natural": ["first_name", "last_name", "birth_year"],
+        # Год рождения может быть неизвестен: NULL в уникальном индексе не
+        # совпадает с другим NULL, поэтому индекс построен по COALESCE
+        "natural_index": "first_name, last_name, COALESCE(birth_year, '')",
+    },
+    "Genres": {
+        "columns": ["genre_id", "genre_name"],
+        "key": ["genre_id"],
+        "natural": ["genre_name"],
+    },
+    "Readers": {
+        "columns": ["reader_id", "first_name", "last_name", "email", "registration_date"],
+        "key": ["reader_id"],
+        "natural": ["email"],
+    },
+    "Books": {
+        "columns": ["book_id", "title", "author_id", "genre_id", "publication_year", "isbn"],
+        "key": ["book_id"],
+        "natural": ["isbn"],
+    },
+    "Book_Issues": {
+        "columns": ["issue_id", "book_id", "reader_id", "issue_date", "return_date"],
+        "key": ["issue_id"],
+        "natural": ["book_id", "reader_id", "issue_date"],
+    },
+}
+
+# 1. Таблицы с PRIMARY KEY и FOREIGN KEY
+SCHEMA = [
+    # Таблица авторов
+    """
+    CREATE TABLE IF NOT EXISTS Authors (
+        author_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        birth_year INTEGER
+    )
+    """,
+    # Таблица жанров
+    """
+    CREATE TABLE IF NOT EXISTS Genres (
+        genre_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        genre_name TEXT NOT NULL UNIQUE
+    )
+    """,
+    # Таблица читателей
+    """
+    CREATE TABLE IF NOT EXISTS Readers (
+        reader_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE,
+        registration_date DATE DEFAULT CURRENT_DATE
+    )
+    """,
+    # Таблица книг
+    """
+    CREATE TABLE IF NOT EXISTS Books (
+        book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author_id INTEGER NOT NULL,
+        genre_id INTEGER NOT NULL,
+        publication_year INTEGER,
+        isbn TEXT UNIQUE,
+        FOREIGN KEY (author_id) REFERENCES Authors(author_id) ON DELETE CASCADE,
+        FOREIGN KEY (genre_id) REFERENCES Genres(genre_id) ON DELETE CASCADE
+    )
+    """,
+    # Таблица выдачи книг
+    """
+    CREATE TABLE IF NOT EXISTS Book_Issues (
+        issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL,
+        reader_id INTEGER NOT NULL,
+        issue_date DATE NOT NULL DEFAULT CURRENT_DATE,
+        return_date DATE,
+        FOREIGN KEY (book_id) REFERENCES Books(book_id) ON DELETE CASCADE,
+        FOREIGN KEY (reader_id) REFERENCES Readers(reader_id) ON DELETE CASCADE
+    )
+    """,
 ]
-cursor.executemany(
-    "INSERT INTO Authors (first_name, last_name, birth_year) VALUES (?, ?, ?)",
-    authors_data
-)
-
-# Добавление жанров
-genres_data = [
-    ('Роман',),
-    ('Рассказ',),
-    ('Поэма',),
-    ('Драма',)
+
+# 2. Естественные ключи. Старые версии скрипта заново вставляли тестовые
+# данные при каждом запуске, поэтому сначала убираются дубликаты
+# (книги переносятся на самого раннего из одинаковых авторов).
+AUTHOR_DUPLICATES = [
+    """
+    UPDATE Books SET author_id = (
+        SELECT MIN(a2.author_id) FROM Authors a1
+        JOIN Authors a2 ON a2.first_name = a1.first_name
+            AND a2.last_name = a1.last_name
+            AND a2.birth_year IS a1.birth_year
+        WHERE a1.author_id = Books.author_id
+    )
+    """,
+    """
+    DELETE FROM Authors WHERE author_id NOT IN (
+        SELECT MIN(author_id) FROM Authors GROUP BY first_name, last_name, birth_year
+    )
+    """,
 ]
-cursor.executemany(
-    "INSERT INTO Genres (genre_name) VALUES (?)",
-    genres_data
-)
-
-# Добавление читателей
-readers_data = [
-    ('Иван', 'Иванов', 'ivanov@mail.ru'),
-    ('Петр', 'Петров', 'petrov@ya.ru'),
-    ('Мария', 'Сидорова', 'sidorova@gmail.com'),
-    ('Анна', 'Кузнецова', 'kuznetsova@mail.ru')
+
+NATURAL_KEYS = AUTHOR_DUPLICATES + [
+    """
+    DELETE FROM Book_Issues WHERE issue_id NOT IN (
+        SELECT MIN(issue_id) FROM Book_Issues GROUP BY book_id, reader_id, issue_date
+    )
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_authors_natural
+    ON Authors (first_name, last_name, birth_year)
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_book_issues_natural
+    ON Book_Issues (book_id, reader_id, issue_date)
+    """,
 ]
-cursor.executemany(
-    "INSERT INTO Readers (first_name, last_name, email) VALUES (?, ?, ?)",
-    readers_data
-)
-
-# Добавление книг
-books_data = [
-    ('Война и мир', 1, 1, 1869, '978-5-389-07464-0'),
-    ('Анна Каренина', 1, 1, 1877, '978-5-389-05327-0'),
-    ('Преступление и наказание', 2, 1, 1866, '978-5-389-06227-2'),
-    ('Братья Карамазовы', 2, 1, 1880, '978-5-389-07465-7'),
-    ('Вишневый сад', 3, 4, 1904, '978-5-389-05328-7'),
-    ('Евгений Онегин', 4, 3, 1833, '978-5-389-06228-9')
+
+# Авторы без года рождения, добавленные повторно, сливаются в одного
+AUTHORS_NATURAL_KEY = AUTHOR_DUPLICATES + [
+    "DROP INDEX IF EXISTS idx_authors_natural",
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_authors_natural_key
+    ON Authors (first_name, last_name, COALESCE(birth_year, ''))
+    """,
 ]
-cursor.executemany(
-    """INSERT INTO Books (title, author_id, genre_id, publication_year, isbn) 
-       VALUES (?, ?, ?, ?, ?)""",
-    books_data
-)
-
-book_issues_data = [
-    (1, 1, '2024-01-15', None),
-    (3, 2, '2024-01-20', '2024-02-10'),
-    (5, 3, '2024-02-01', None),
-    (2, 1, '2024-02-05', None),
-    (6, 4, '2024-01-10', '2024-01-25'),
-    (4, 2, '2024-02-15', None)
+
+# (версия, описание, шаг); новые миграции добавляются только в конец
+MIGRATIONS = [
+    (1, "таблицы библиотеки", SCHEMA),
+    (2, "уникальные естественные ключи", NATURAL_KEYS),
+    (3, "индексы горячих запросов", lambda conn: ensure_indexes(conn, LIBRARY_INDEXES)),
+    # Счетчики статистики, которые триггеры обновляют при каждом изменении
+    (4, "счетчики статистики", install_stats),
+    (5, "контрольные точки загрузки", [CHECKPOINT_SCHEMA]),
+    (6, "сводки выдач", install_circulation),
+    # Журнал вставок с явным issue_id и пропуск обновлений без изменений
+    (7, "триггеры сводок выдач", install_circulation),
+    (8, "естественный ключ авторов без года рождения", AUTHORS_NATURAL_KEY),
 ]
-cursor.executemany(
-    """INSERT INTO Book_Issues (book_id, reader_id, issue_date, return_date) 
-       VALUES (?, ?, ?, ?)""",
-    book_issues_data
-)
 
-conn.commit()
-print("Тестовые данные успешно добавлены!")
+# Таблицы, строки которых повторный seed не обновляет: отметки о
+# возврате, сделанные после первой загрузки, не затираются
+SEED_INSERT_ONLY = {"Book_Issues"}
 
-print("\n3. Выполнение запросов на выборку:")
+# Тестовые данные с явными ключами: повторная загрузка ничего не дублирует
+SEED_DATA = {
+    "Authors": [
+        {"author_id": 1, "first_name": 'Лев', "last_name": 'Толстой', "birth_year": 1828},
+        {"author_id": 2, "first_name": 'Фёдор', "last_name": 'Достоевский', "birth_year": 1821},
+        {"author_id": 3, "first_name": 'Антон', "last_name": 'Чехов', "birth_year": 1860},
+        {"author_id": 4, "first_name": 'Александр', "last_name": 'Пушкин', "birth_year": 1799},
+    ],
+    "Genres": [
+        {"genre_id": 1, "genre_name": 'Роман'},
+        {"genre_id": 2, "genre_name": 'Рассказ'},
+        {"genre_id": 3, "genre_name": 'Поэма'},
+        {"genre_id": 4, "genre_name": 'Драма'},
+    ],
+    "Readers": [
+        {"reader_id": 1, "first_name": 'Иван', "last_name": 'Иванов', "email": 'ivanov@mail.ru'},
+        {"reader_id": 2, "first_name": 'Петр', "last_name": 'Петров', "email": 'petrov@ya.ru'},
+        {"reader_id": 3, "first_name": 'Мария', "last_name": 'Сидорова', "email": 'sidorova@gmail.com'},
+        {"reader_id": 4, "first_name": 'Анна', "last_name": 'Кузнецова', "email": 'kuznetsova@mail.ru'},
+    ],
+    "Books": [
+        {"book_id": 1, "title": 'Война и мир', "author_id": 1, "genre_id": 1,
+         "publication_year": 1869, "isbn": '978-5-389-07464-0'},
+        {"book_id": 2, "title": 'Анна Каренина', "author_id": 1, "genre_id": 1,
+         "publication_year": 1877, "isbn": '978-5-389-05327-0'},
+        {"book_id": 3, "title": 'Преступление и наказание', "author_id": 2, "genre_id": 1,
+         "publication_year": 1866, "isbn": '978-5-389-06227-2'},
+        {"book_id": 4, "title": 'Братья Карамазовы', "author_id": 2, "genre_id": 1,
+         "publication_year": 1880, "isbn": '978-5-389-07465-7'},
+        {"book_id": 5, "title": 'Вишневый сад', "author_id": 3, "genre_id": 4,
+         "publication_year": 1904, "isbn": '978-5-389-05328-7'},
+        {"book_id": 6, "title": 'Евгений Онегин', "author_id": 4, "genre_id": 3,
+         "publication_year": 1833, "isbn": '978-5-389-06228-9'},
+    ],
+    "Book_Issues": [
+        {"issue_id": 1, "book_id": 1, "reader_id": 1, "issue_date": '2024-01-15', "return_date": None},
+        {"issue_id": 2, "book_id": 3, "reader_id": 2, "issue_date": '2024-01-20', "return_date": '2024-02-10'},
+        {"issue_id": 3, "book_id": 5, "reader_id": 3, "issue_date": '2024-02-01', "return_date": None},
+        {"issue_id": 4, "book_id": 2, "reader_id": 1, "issue_date": '2024-02-05', "return_date": None},
+        {"issue_id": 5, "book_id": 6, "reader_id": 4, "issue_date": '2024-01-10', "return_date": '2024-01-25'},
+        {"issue_id": 6, "book_id": 4, "reader_id": 2, "issue_date": '2024-02-15', "return_date": None},
+    ],
+}
 
-print("\nа) Список всех книг с авторами и жанрами:")
-cursor.execute("""
-    SELECT 
+# Горячие запросы отчета
+BOOKS_WITH_AUTHORS_QUERY = """
+    SELECT
         b.title AS Название_книги,
         a.first_name || ' ' || a.last_name AS Автор,
         g.genre_name AS Жанр,
@@ -151,14 +219,9 @@ cursor.execute("""
     JOIN Authors a ON b.author_id = a.author_id
     JOIN Genres g ON b.genre_id = g.genre_id
     ORDER BY a.last_name, b.title
-""")
-
-books = cursor.fetchall()
-for book in books:
-    print(f"{book[0]} | {book[1]} | {book[2]} | {book[3]}")
+"""
 
-print("\nб) Читатели с книгами на руках:")
-cursor.execute("""
+READERS_WITH_BOOKS_QUERY = """
     SELECT DISTINCT
         r.reader_id,
         r.first_name || ' ' || r.last_name AS Читатель,
@@ -167,30 +230,10 @@ cursor.execute("""
     JOIN Book_Issues bi ON r.reader_id = bi.reader_id
     WHERE bi.return_date IS NULL
     ORDER BY r.last_name
-""")
+"""
 
-readers_with_books = cursor.fetchall()
-for reader in readers_with_books:
-    print(f"ID: {reader[0]} | {reader[1]} | Email: {reader[2]}")
-
-print("\nв) Количество книг по авторам:")
-cursor.execute("""
-    SELECT 
-        a.first_name || ' ' || a.last_name AS Автор,
-        COUNT(b.book_id) AS Количество_книг
-    FROM Authors a
-    LEFT JOIN Books b ON a.author_id = b.author_id
-    GROUP BY a.author_id
-    ORDER BY Количество_книг DESC
-""")
-
-authors_stats = cursor.fetchall()
-for author in authors_stats:
-    print(f"{author[0]}: {author[1]} книг(и)")
-
-print("\nг) Детальная информация о книгах на руках:")
-cursor.execute("""
-    SELECT 
+CURRENT_ISSUES_QUERY = """
+    SELECT
         r.first_name || ' ' || r.last_name AS Читатель,
         b.title AS Книга,
         a.first_name || ' ' || a.last_name AS Автор,
@@ -201,25 +244,160 @@ cursor.execute("""
     JOIN Authors a ON b.author_id = a.author_id
     WHERE bi.return_date IS NULL
     ORDER BY r.last_name, bi.issue_date
-""")
+"""
+
+# (имя, sql, параметры, таблицы, полный проход по которым недопустим)
+LIBRARY_HOT_QUERIES = [
+    ("readers_with_books", READERS_WITH_BOOKS_QUERY, (), {"bi"}),
+    ("books_per_author", BOOKS_PER_AUTHOR_QUERY, (), {"abc"}),
+    ("current_issues", CURRENT_ISSUES_QUERY, (), {"bi", "r", "b", "a"}),
+    ("overdue_loans", OVERDUE_QUERY, {"as_of": "now", "loan_days": LOAN_PERIOD_DAYS}, {"bi", "r", "b"}),
+]
+
+
+def connect(path=DB_PATH, profile=PROFILE):
+    """Открывает базу библиотеки с профилем и проверкой внешних ключей"""
+    conn = sqlite3.connect(path)
+    apply_profile(conn, profile)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def migrate(conn):
+    """Приводит схему к последней версии; возвращает примененные версии"""
+    applied = apply_migrations(conn, MIGRATIONS)
+    print(f"Версия схемы: {get_version(conn)}")
+    return applied
+
+
+def seed(conn):
+    """
+    Загружает тестовые данные; повторный вызов обновляет те же строки,
+    кроме таблиц из SEED_INSERT_ONLY
+    """
+    try:
+        for table, rows in SEED_DATA.items():
+            spec = LIBRARY_TABLES[table]
+            sql = upsert_sql(table, spec, spec["columns"], update=table not in SEED_INSERT_ONLY)
+            conn.executemany(
+                sql, [tuple(row.get(column) for column in spec["columns"]) for row in rows]
+            )
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    refresh_circulation(conn)
+
+
+def load(conn, table, path, source=None, reset=False):
+    """Загружает CSV/JSON файл в таблицу с продолжением после сбоя"""
+    if table not in LIBRARY_TABLES:
+        raise KeyError(f"Неизвестная таблица '{table}'")
+    if reset:
+        reset_checkpoint(conn, source or file_source(table, path))
+    loaded = load_file(conn, table, LIBRARY_TABLES[table], path, source)
+    refresh_circulation(conn)
+    return loaded
+
+
+def report(conn):
+    """Печатает отчеты (а)-(г) и статистику базы"""
+    cursor = conn.cursor()
+
+    # Проверка планов: при полном сканировании будет выброшено QueryPlanError
+    check_query_plans(conn, LIBRARY_HOT_QUERIES)
+    print("\nПланы горячих запросов используют индексы")
+
+    print("\n3. Выполнение запросов на выборку:")
+
+    print("\nа) Список всех книг с авторами и жанрами:")
+    cursor.execute(BOOKS_WITH_AUTHORS_QUERY)
+
+    books = cursor.fetchall()
+    for book in books:
+        print(f"{book[0]} | {book[1]} | {book[2]} | {book[3]}")
+
+    print("\nб) Читатели с книгами на руках:")
+    cursor.execute(READERS_WITH_BOOKS_QUERY)
+
+    readers_with_books = cursor.fetchall()
+    for reader in readers_with_books:
+        print(f"ID: {reader[0]} | {reader[1]} | Email: {reader[2]}")
+
+    print("\nв) Количество книг по авторам:")
+    cursor.execute(BOOKS_PER_AUTHOR_QUERY)
+
+    authors_stats = cursor.fetchall()
+    for author in authors_stats:
+        print(f"{author[0]}: {author[1]} книг(и)")
+
+    print("\nг) Детальная информация о книгах на руках:")
+    cursor.execute(CURRENT_ISSUES_QUERY)
+
+    current_issues = cursor.fetchall()
+    for issue in current_issues:
+        print(f"{issue[0]} | {issue[1]} | {issue[2]} | Выдана: {issue[3]}")
+
+    print(f"\nд) Просроченные выдачи (срок {LOAN_PERIOD_DAYS} дней):")
+    for issue in overdue_loans(conn):
+        print(f"{issue[1]} | {issue[2]} | Выдана: {issue[3]} | Просрочка: {issue[4]} дн.")
+
+    # Статистика по базе данных
+    print("\n=== СТАТИСТИКА БАЗЫ ДАННЫХ ===")
+    # Счетчики читаются из Library_Stats вместо COUNT(*) по таблицам
+    stats = get_stats(conn)
+    print(f"Авторов: {stats['authors']}")
+    print(f"Книг: {stats['books']}")
+    print(f"Читателей: {stats['readers']}")
+    print(f"Книг на руках: {stats['open_issues']}")
 
-current_issues = cursor.fetchall()
-for issue in current_issues:
-    print(f"{issue[0]} | {issue[1]} | {issue[2]} | Выдана: {issue[3]}")
 
-# Статистика по базе данных
-print("\n=== СТАТИСТИКА БАЗЫ ДАННЫХ ===")
-cursor.execute("SELECT COUNT(*) FROM Authors")
-print(f"Авторов: {cursor.fetchone()[0]}")
+def main(argv):
+    """
+    python db1.py [файл БД] - миграции, тестовые данные и отчет
+    python db1.py schema [файл БД] - только миграции схемы
+    python db1.py seed [файл БД] - миграции и тестовые данные
+    python db1.py report [файл БД] - отчет по существующей базе
+    python db1.py load <таблица> <файл.csv|.json|.jsonl> [--reset] - загрузка данных
+    """
+    command = argv[0] if argv and argv[0] in ("schema", "seed", "report", "load") else None
+    args = argv[1:] if command else argv
+    if command == "load":
+        if len(args) < 2:
+            print(main.__doc__)
+            return 1
+        path = DB_PATH
+    elif len(args) > 1 or (args and args[0].startswith("-")):
+        print(main.__doc__)
+        return 1
+    else:
+        path = args[0] if args else DB_PATH
 
-cursor.execute("SELECT COUNT(*) FROM Books")
-print(f"Книг: {cursor.fetchone()[0]}")
+    # Подключение к базе данных (файл создается автоматически)
+    conn = connect(path)
+    print(f"Профиль БД: {PROFILE}")
+    try:
+        if command == "report" and get_version(conn) < MIGRATIONS[-1][0]:
+            print("Схема базы не обновлена: выполните python db1.py schema")
+            return 1
+        if command != "report":
+            print("=== СОЗДАНИЕ БАЗЫ ДАННЫХ БИБЛИОТЕКИ ===")
+            print("\n1. Применение миграций...")
+            migrate(conn)
 
-cursor.execute("SELECT COUNT(*) FROM Readers")
-print(f"Читателей: {cursor.fetchone()[0]}")
+        if command == "load":
+            load(conn, args[0], args[1], reset="--reset" in args[2:])
+        if command in (None, "seed"):
+            print("\n2. Наполнение таблиц тестовыми данными...")
+            seed(conn)
+            print("Тестовые данные успешно добавлены!")
+        if command in (None, "report"):
+            report(conn)
+    finally:
+        conn.close()
+    print("\n=== РАБОТА ЗАВЕРШЕНА ===")
+    return 0
 
-cursor.execute("SELECT COUNT(*) FROM Book_Issues WHERE return_date IS NULL")
-print(f"Книг на руках: {cursor.fetchone()[0]}")
 
-conn.close()
-print("\n=== РАБОТА ЗАВЕРШЕНА ===")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,367 @@
+"""
+Потоковая выгрузка таблиц в столбцовый формат и загрузка через mmap.
+
+Каждая таблица выгружается в каталог <каталог>/<таблица>/, где у каждого
+столбца свои файлы в формате NumPy .npy (версия 1.0), поэтому их можно
+открыть и через numpy.load(..., mmap_mode="r"). Кодирование столбцов:
+
+  int       - <i8
+  float     - <f8
+  datetime  - <i8, секунды Unix (strftime('%s'))
+  dict      - коды <i4 (-1 для NULL) + словарь значений <столбец>.dict.json
+  text      - смещения <i8 (строк + 1) + байты UTF-8 |u1 в <столбец>.data.npy
+
+Для столбцов, допускающих NULL, пишется маска <столбец>.valid.npy (|b1).
+Строки читаются пачками через fetchmany и сразу дописываются в файлы,
+поэтому память ограничена размером пачки и словарями. Строковый столбец
+кодируется словарем, только если различных значений немного. Все
+таблицы читаются в одной транзакции - это согласованный снимок базы.
+Файл meta.json пишется последним и означает, что выгрузка завершена.
+"""
+import array
+import ast
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from datetime import datetime
+
+EXPORT_DIR = "export"
+EXPORT_CHUNK_SIZE = 10000
+# Словарное кодирование строк: не больше DICT_LIMIT различных значений
+# и не больше DICT_RATIO от числа непустых строк
+DICT_LIMIT = 65536
+DICT_RATIO = 0.5
+
+# Таблицы, выгружаемые по умолчанию, если они есть в базе
+DEFAULT_TABLES = ["posts", "comments", "Book_Issues"]
+
+_MAGIC = b"\x93NUMPY\x01\x00"
+# Заголовок фиксированной длины: число строк становится известно только
+# в конце выгрузки, и заголовок перезаписывается на месте
+_HEADER_SIZE = 128
+# Тип .npy -> код типа модуля array
+_ARRAY_CODES = {"<i8": "q", "<i4": "i", "<f8": "d", "|u1": "B", "|b1": "B"}
+
+
+class ExportError(Exception):
+    """Ошибка выгрузки или некорректные файлы выгрузки"""
+
+
+def _npy_header(descr, length):
+    header = repr({"descr": descr, "fortran_order": False, "shape": (length,)})
+    header = header.encode("latin1")
+    padding = _HEADER_SIZE - len(_MAGIC) - 2 - len(header) - 1
+    return _MAGIC + struct.pack("<H", _HEADER_SIZE - len(_MAGIC) - 2) + header + b" " * padding + b"\n"
+
+
+class NpyWriter:
+    """Дописывает значения в одномерный .npy файл"""
+
+    def __init__(self, path, descr):
+        self.path = path
+        self.descr = descr
+        self.length = 0
+        self._file = open(path, "wb")
+        self._file.write(_npy_header(descr, 0))
+
+    def write(self, values):
+        data = array.array(_ARRAY_CODES[self.descr], values)
+        if sys.byteorder == "big" and data.itemsize > 1:
+            data.byteswap()
+        data.tofile(self._file)
+        self.length += len(data)
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.descr, self.length))
+        self._file.close()
+
+
+def open_npy(path):
+    """
+    Открывает .npy файл через mmap и возвращает memoryview значений.
+    Файл остается отображенным, пока на memoryview есть ссылки.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:6] != _MAGIC[:6]:
+        raise ExportError(f"{path}: не .npy файл")
+    if mapped[6] == 1:
+        header_len = struct.unpack("<H", mapped[8:10])[0]
+        offset = 10 + header_len
+    else:
+        header_len = struct.unpack("<I", mapped[8:12])[0]
+        offset = 12 + header_len
+    header = ast.literal_eval(mapped[offset - header_len:offset].decode("latin1"))
+    code = _ARRAY_CODES.get(header["descr"])
+    if code is None or header["fortran_order"] or len(header["shape"]) != 1:
+        raise ExportError(f"{path}: неподдерживаемый тип {header['descr']}")
+    if sys.byteorder == "big" and array.array(code).itemsize > 1:
+        raise ExportError("Загрузка через mmap поддерживается только на little-endian")
+    view = memoryview(mapped)[offset:].cast(code)
+    return view[:header["shape"][0]]
+
+
+def _column_encoding(conn, table, name, declared):
+    """Выбирает кодирование столбца по объявленному типу и данным"""
+    declared = declared.upper()
+    if "INT" in declared:
+        return "int"
+    if any(word in declared for word in ("REAL", "FLOA", "DOUB")):
+        return "float"
+    quoted = f'"{name}"'
+    if "DATE" in declared or "TIME" in declared:
+        # Даты, которые SQLite не разбирает, выгружаются строками
+        bad = conn.execute(
+            f'SELECT 1 FROM "{table}" WHERE {quoted} IS NOT NULL '
+            f"AND strftime('%s', {quoted}) IS NULL LIMIT 1"
+        ).fetchone()
+        if bad is None:
+            return "datetime"
+    distinct, filled = conn.execute(
+        f'SELECT COUNT(DISTINCT {quoted}), COUNT({quoted}) FROM "{table}"'
+    ).fetchone()
+    if distinct <= DICT_LIMIT and distinct <= max(1, filled * DICT_RATIO):
+        return "dict"
+    return "text"
+
+
+class _ColumnWriter:
+    """Файлы одного столбца и кодирование его значений"""
+
+    def __init__(self, directory, name, encoding, nullable):
+        self.name = name
+        self.encoding = encoding
+        self.nullable = nullable
+        path = os.path.join(directory, name)
+        self.writers = []
+        if encoding == "dict":
+            self.values = self._add(path + ".npy", "<i4")
+            self.dictionary = {}
+        elif encoding == "text":
+            self.values = self._add(path + ".npy", "<i8")
+            self.data = self._add(path + ".data.npy", "|u1")
+            self.offset = 0
+            self.values.write([0])
+        else:
+            self.values = self._add(path + ".npy", "<f8" if encoding == "float" else "<i8")
+        self.valid = self._add(path + ".valid.npy", "|b1") if nullable else None
+
+    def _add(self, path, descr):
+        writer = NpyWriter(path, descr)
+        self.writers.append(writer)
+        return writer
+
+    def write(self, values):
+        if self.valid is not None:
+            self.valid.write([value is not None for value in values])
+        if self.encoding == "dict":
+            codes = []
+            for value in values:
+                if value is None:
+                    codes.append(-1)
+                    continue
+                code = self.dictionary.get(value)
+                if code is None:
+                    code = self.dictionary[value] = len(self.dictionary)
+                codes.append(code)
+            self.values.write(codes)
+        elif self.encoding == "text":
+            offsets = []
+            chunk = bytearray()
+            for value in values:
+                if value is not None:
+                    chunk += str(value).encode("utf-8")
+                offsets.append(self.offset + len(chunk))
+            self.offset += len(chunk)
+            self.data.write(chunk)
+            self.values.write(offsets)
+        else:
+            default = 0.0 if self.encoding == "float" else 0
+            self.values.write([default if value is None else value for value in values])
+
+    def close(self, directory):
+        for writer in self.writers:
+            writer.close()
+        if self.encoding == "dict":
+            with open(os.path.join(directory, self.name + ".dict.json"), "w", encoding="utf-8") as f:
+                json.dump(list(self.dictionary), f, ensure_ascii=False)
+
+
+def _table_columns(conn, table):
+    """Столбцы таблицы: [(имя, объявленный тип, допускает NULL)]"""
+    columns = [
+        (row[1], row[2] or "", not row[3] and not row[5])
+        for row in conn.execute(f'PRAGMA table_info("{table}")')
+    ]
+    if not columns:
+        raise ExportError(f"Таблица '{table}' не найдена")
+    return columns
+
+
+def export_table(conn, table, directory=EXPORT_DIR, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Выгружает таблицу в <directory>/<table>/ пачками по chunk_size строк.
+    Вызывать внутри транзакции, если нужен согласованный снимок нескольких
+    таблиц. Возвращает описание выгрузки (содержимое meta.json).
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер пачки должен быть не меньше 1")
+    target = os.path.join(directory, table)
+    os.makedirs(target, exist_ok=True)
+    meta_path = os.path.join(target, "meta.json")
+    # Старая выгрузка перестает считаться завершенной
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    columns = []
+    selects = []
+    for name, declared, nullable in _table_columns(conn, table):
+        encoding = _column_encoding(conn, table, name, declared)
+        columns.append(_ColumnWriter(target, name, encoding, nullable))
+        if encoding == "datetime":
+            selects.append(f"""CAST(strftime('%s', "{name}") AS INTEGER)""")
+        else:
+            selects.append(f'"{name}"')
+
+    rows = 0
+    cursor = conn.execute(f'SELECT {", ".join(selects)} FROM "{table}" ORDER BY rowid')
+    try:
+        while True:
+            batch = cursor.fetchmany(chunk_size)
+            if not batch:
+                break
+            for index, column in enumerate(columns):
+                column.write([row[index] for row in batch])
+            rows += len(batch)
+    except (TypeError, OverflowError) as e:
+        raise ExportError(f"{table}: значение не подходит к типу столбца: {e}") from e
+    finally:
+        cursor.close()
+        for column in columns:
+            column.close(target)
+
+    meta = {
+        "table": table,
+        "rows": rows,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "columns": [
+            {"name": column.name, "encoding": column.encoding, "nullable": column.nullable}
+            for column in columns
+        ],
+    }
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    return meta
+
+
+def export_database(database, tables=None, directory=EXPORT_DIR, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Выгружает таблицы базы (по умолчанию имеющиеся из DEFAULT_TABLES)
+    из одного снимка. Возвращает {таблица: описание}.
+    """
+    # Имя файла экранируется: '#' или '?' в нем иначе обрезали бы ?mode=ro
+    from urllib.request import pathname2url
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(database))}?mode=ro", uri=True)
+    try:
+        if tables is None:
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            tables = [table for table in DEFAULT_TABLES if table in existing]
+        # Чтение в одной транзакции: все таблицы из одного снимка
+        conn.execute("BEGIN")
+        exported = {}
+        for table in tables:
+            exported[table] = export_table(conn, table, directory, chunk_size)
+        conn.rollback()
+        return exported
+    finally:
+        conn.close()
+
+
+class ColumnView:
+    """
+    Столбец выгрузки, отображенный в память. values - memoryview кодов
+    или значений (для text - смещений), valid - маска NULL или None.
+    Индексация возвращает значение Python: datetime-столбцы - секунды Unix.
+    """
+
+    def __init__(self, directory, name, encoding, nullable):
+        self.name = name
+        self.encoding = encoding
+        path = os.path.join(directory, name)
+        self.values = open_npy(path + ".npy")
+        self.valid = open_npy(path + ".valid.npy") if nullable else None
+        self.dictionary = None
+        self.data = None
+        if encoding == "dict":
+            with open(path + ".dict.json", encoding="utf-8") as f:
+                self.dictionary = json.load(f)
+        elif encoding == "text":
+            self.data = open_npy(path + ".data.npy")
+
+    def __len__(self):
+        return len(self.values) - 1 if self.encoding == "text" else len(self.values)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if self.valid is not None and not self.valid[index]:
+            return None
+        if self.encoding == "dict":
+            return self.dictionary[self.values[index]]
+        if self.encoding == "text":
+            return bytes(self.data[self.values[index]:self.values[index + 1]]).decode("utf-8")
+        return self.values[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def load_table(directory, table):
+    """Открывает завершенную выгрузку таблицы: {имя столбца: ColumnView}"""
+    target = os.path.join(directory, table)
+    try:
+        with open(os.path.join(target, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise ExportError(f"Выгрузка '{table}' в {directory} не найдена или не завершена") from None
+    columns = {}
+    for column in meta["columns"]:
+        view = ColumnView(target, column["name"], column["encoding"], column["nullable"])
+        if len(view) != meta["rows"]:
+            raise ExportError(f"{table}.{column['name']}: {len(view)} строк вместо {meta['rows']}")
+        columns[column["name"]] = view
+    return columns
+
+
+def main(argv):
+    """
+    python export.py dump <файл БД> [каталог] [таблица ...]
+    python export.py info <каталог> <таблица>
+    """
+    if len(argv) >= 2 and argv[0] == "dump":
+        directory = argv[2] if len(argv) > 2 else EXPORT_DIR
+        exported = export_database(argv[1], argv[3:] or None, directory)
+        for table, meta in exported.items():
+            encodings = ", ".join(f"{c['name']}:{c['encoding']}" for c in meta["columns"])
+            print(f"{table}: строк {meta['rows']} ({encodings})")
+    elif len(argv) == 3 and argv[0] == "info":
+        columns = load_table(argv[1], argv[2])
+        for name, view in columns.items():
+            sample = view[0] if len(view) else None
+            print(f"{name} | {view.encoding} | строк: {len(view)} | первое значение: {sample!r}")
+    else:
+        print(main.__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,217 @@
+import sqlite3
+import sys
+
+# Денормализованная лента постов: имя автора, название категории и число
+# комментариев хранятся рядом с постом, поэтому страница ленты читается
+# одним проходом по индексу без JOIN и агрегации по comments. Таблицу
+# поддерживают триггеры на posts, comments, users и categories.
+FEED_COLUMNS = (
+    "post_id, title, created_at, user_id, author, category_id, category, comment_count"
+)
+
+# Ожидаемое содержимое ленты, вычисленное по исходным таблицам
+FEED_SOURCE = """
+    SELECT
+        p.id AS post_id, p.title, p.created_at, p.user_id, u.username AS author,
+        p.category_id, c.name AS category,
+        (SELECT COUNT(*) FROM comments m WHERE m.post_id = p.id) AS comment_count
+    FROM posts p
+    JOIN users u ON u.id = p.user_id
+    JOIN categories c ON c.id = p.category_id
+"""
+
+FEED_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS post_feed (
+        post_id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        created_at DATETIME,
+        user_id INTEGER NOT NULL,
+        author TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        comment_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    # Общая лента и лента категории: ORDER BY created_at DESC, post_id DESC
+    "CREATE INDEX IF NOT EXISTS idx_post_feed_created ON post_feed (created_at, post_id)",
+    "CREATE INDEX IF NOT EXISTS idx_post_feed_category ON post_feed (category_id, created_at, post_id)",
+    # Переименование автора
+    "CREATE INDEX IF NOT EXISTS idx_post_feed_user ON post_feed (user_id)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_feed_posts_ai AFTER INSERT ON posts BEGIN
+        INSERT OR REPLACE INTO post_feed ({FEED_COLUMNS})
+        SELECT new.id, new.title, new.created_at, new.user_id, u.username,
+               new.category_id, c.name,
+               (SELECT COUNT(*) FROM comments m WHERE m.post_id = new.id)
+        FROM users u, categories c
+        WHERE u.id = new.user_id AND c.id = new.category_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_feed_posts_au
+    AFTER UPDATE OF id, title, created_at, user_id, category_id ON posts BEGIN
+        DELETE FROM post_feed WHERE post_id = old.id;
+        INSERT OR REPLACE INTO post_feed ({FEED_COLUMNS})
+        SELECT new.id, new.title, new.created_at, new.user_id, u.username,
+               new.category_id, c.name,
+               (SELECT COUNT(*) FROM comments m WHERE m.post_id = new.id)
+        FROM users u, categories c
+        WHERE u.id = new.user_id AND c.id = new.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_feed_posts_ad AFTER DELETE ON posts BEGIN
+        DELETE FROM post_feed WHERE post_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_feed_comments_ai AFTER INSERT ON comments BEGIN
+        UPDATE post_feed SET comment_count = comment_count + 1
+        WHERE post_id = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_feed_comments_ad AFTER DELETE ON comments BEGIN
+        UPDATE post_feed SET comment_count = comment_count - 1
+        WHERE post_id = old.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_feed_comments_au
+    AFTER UPDATE OF post_id ON comments WHEN new.post_id IS NOT old.post_id BEGIN
+        UPDATE post_feed SET comment_count = comment_count - 1
+        WHERE post_id = old.post_id;
+        UPDATE post_feed SET comment_count = comment_count + 1
+        WHERE post_id = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_feed_users_au AFTER UPDATE OF id, username ON users BEGIN
+        UPDATE post_feed SET user_id = new.id, author = new.username
+        WHERE user_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_feed_categories_au AFTER UPDATE OF id, name ON categories BEGIN
+        UPDATE post_feed SET category_id = new.id, category = new.name
+        WHERE category_id = old.id;
+    END
+    """,
+]
+
+# Посты, строка ленты которых отсутствует, лишняя или расходится с исходными таблицами
+_MISMATCHED = f"""
+    SELECT post_id FROM (
+        SELECT * FROM ({FEED_SOURCE})
+        EXCEPT
+        SELECT {FEED_COLUMNS} FROM post_feed
+    )
+    UNION
+    SELECT post_id FROM (
+        SELECT {FEED_COLUMNS} FROM post_feed
+        EXCEPT
+        SELECT * FROM ({FEED_SOURCE})
+    )
+"""
+
+FEED_PAGE_SIZE = 20
+
+_FEED_SELECT = """
+    SELECT post_id, title, created_at, author, category, comment_count
+    FROM post_feed f
+"""
+
+
+def ensure_feed_schema(conn):
+    """
+    Создает таблицу ленты, индексы и триггеры. Если таблица появилась
+    впервые в уже заполненной базе, сразу заполняет ее. Возвращает True
+    при создании.
+    """
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'post_feed'"
+    ).fetchone() is None
+    for statement in FEED_SCHEMA:
+        conn.execute(statement)
+    if created:
+        rebuild_feed(conn)
+    conn.commit()
+    return created
+
+
+def rebuild_feed(conn):
+    """Полностью пересобирает ленту по posts, users, categories и comments"""
+    conn.execute("DELETE FROM post_feed")
+    conn.execute(f"INSERT INTO post_feed ({FEED_COLUMNS}) {FEED_SOURCE}")
+    conn.commit()
+
+
+def check_feed(conn, repair=False):
+    """
+    Сверяет ленту с исходными таблицами и возвращает id постов, строки
+    которых расходятся. При repair=True эти строки пересобираются.
+    """
+    post_ids = [row[0] for row in conn.execute(_MISMATCHED)]
+    if repair and post_ids:
+        placeholders = ", ".join("?" * len(post_ids))
+        conn.execute(f"DELETE FROM post_feed WHERE post_id IN ({placeholders})", post_ids)
+        conn.execute(
+            f"INSERT INTO post_feed ({FEED_COLUMNS}) {FEED_SOURCE} WHERE p.id IN ({placeholders})",
+            post_ids
+        )
+        conn.commit()
+    return post_ids
+
+
+def feed_query(category_name=None, after=None):
+    """
+    Запрос страницы ленты, новые посты первыми. after - позиция
+    (created_at, post_id) последней строки предыдущей страницы.
+    """
+    conditions = []
+    params = []
+    if category_name is not None:
+        conditions.append("f.category_id = (SELECT id FROM categories WHERE name = ?)")
+        params.append(category_name)
+    if after is not None:
+        conditions.append("(f.created_at, f.post_id) < (?, ?)")
+        params.extend(after)
+    sql = _FEED_SELECT
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY f.created_at DESC, f.post_id DESC"
+    return sql, params
+
+
+def main(argv):
+    """python feed.py check [файл БД] | python feed.py repair [файл БД] | python feed.py rebuild [файл БД]"""
+    if argv and argv[0] in ("check", "repair", "rebuild"):
+        database = argv[1] if len(argv) > 1 else "blog.db"
+        conn = sqlite3.connect(database)
+        try:
+            if ensure_feed_schema(conn):
+                print(f"Лента {database} создана и заполнена")
+            elif argv[0] == "rebuild":
+                rebuild_feed(conn)
+                print(f"Лента {database} пересобрана")
+            else:
+                post_ids = check_feed(conn, repair=argv[0] == "repair")
+                if not post_ids:
+                    print("Лента согласована с исходными таблицами")
+                    return 0
+                print(f"Расхождений в ленте: {len(post_ids)} (посты: "
+                      f"{', '.join(map(str, post_ids[:20]))}{'...' if len(post_ids) > 20 else ''})")
+                if argv[0] == "check":
+                    return 2
+                print("Строки ленты исправлены")
+        finally:
+            conn.close()
+    else:
+        print(main.__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+import re
+
+# Управляемые наборы индексов: (имя, определение после ON)
+BLOG_INDEXES = [
+    # Общая лента: ORDER BY created_at DESC, id DESC и keyset-пагинация
+    ("idx_posts_created", "posts (created_at, id)"),
+    # Лента категории: WHERE category_id = ? ORDER BY created_at DESC
+    ("idx_posts_category_created", "posts (category_id, created_at, id)"),
+    # Посты автора и каскадное удаление пользователя
+    ("idx_posts_user", "posts (user_id)"),
+    # Комментарии поста по времени и каскадное удаление поста
+    ("idx_comments_post_created", "comments (post_id, created_at)"),
+    ("idx_comments_user", "comments (user_id)"),
+]
+
+LIBRARY_INDEXES = [
+    # Частичный индекс только по книгам на руках
+    ("idx_book_issues_open", "Book_Issues (reader_id, issue_date) WHERE return_date IS NULL"),
+    ("idx_book_issues_book", "Book_Issues (book_id)"),
+    ("idx_books_author", "Books (author_id)"),
+    ("idx_books_genre", "Books (genre_id)"),
+]
+
+# Строка плана вида "SCAN p" без индекса означает полный проход по таблице.
+# SQLite до 3.36 пишет "SCAN TABLE posts AS p" (или "SCAN TABLE posts").
+# Строка целиком должна совпасть с шаблоном: "SCAN ... USING INDEX ..."
+# (в любой версии) - проход по индексу, а не по таблице
+_TABLE_SCAN = re.compile(r"^SCAN (?:TABLE (\w+)(?: AS (\w+))?|(\w+))$")
+
+
+class QueryPlanError(Exception):
+    """Горячий запрос выполняется полным сканированием таблицы"""
+
+
+def ensure_indexes(conn, indexes):
+    """
+    Создает недостающие индексы набора и возвращает их имена. Фиксирует
+    только транзакцию, которую открыл сам: транзакция вызывающего кода
+    (например, миграции) остается открытой.
+    """
+    owned = not conn.in_transaction
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    }
+    created = []
+    for name, definition in indexes:
+        if name not in existing:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+            created.append(name)
+    if owned:
+        conn.commit()
+    return created
+
+
+def explain(conn, sql, params=()):
+    """Возвращает строки EXPLAIN QUERY PLAN для запроса"""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def find_table_scans(plan, tables):
+    """Находит в плане полные проходы по таблицам (или псевдонимам) из tables"""
+    scans = []
+    for detail in plan:
+        match = _TABLE_SCAN.match(detail)
+        if match and (match.group(2) or match.group(1) or match.group(3)) in tables:
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans(conn, hot_queries):
+    """
+    Проверяет планы горячих запросов.
+
+    hot_queries - список (имя, sql, параметры, таблицы), где таблицы -
+    псевдонимы, полный проход по которым недопустим. Возвращает словарь
+    имя -> план; если хотя бы один запрос сканирует запрещенную таблицу,
+    выбрасывает QueryPlanError со списком нарушений.
+    """
+    plans = {}
+    failures = []
+    for name, sql, params, tables in hot_queries:
+        plan = explain(conn, sql, params)
+        plans[name] = plan
+        for detail in find_table_scans(plan, tables):
+            failures.append(f"{name}: {detail}")
+    if failures:
+        raise QueryPlanError(
+            "Горячие запросы выполняются полным сканированием:\n  "
+            + "\n  ".join(failures)
+        )
+    return plans
@@ -0,0 +1,561 @@
+"""
+Инструментирование соединений SQLite: время и число строк каждого
+запроса, ожидание блокировок, журнал медленных запросов с планом
+выполнения и метрики по функциям API.
+
+Соединение создается с factory=InstrumentedConnection и подключается
+через Instrumentation.attach(). Текст запроса с подставленными
+параметрами берется из set_trace_callback, объем работы виртуальной
+машины SQLite (и прерывание слишком долгих запросов) - из
+set_progress_handler.
+
+Для измерения ожидания блокировок встроенный busy_timeout соединения
+обнуляется, а повтор при SQLITE_BUSY с тем же общим таймаутом
+выполняет сам курсор, поэтому время ожидания известно точно. Пока
+сбор метрик выключен, соединение выдает обычные курсоры sqlite3 и
+ждет блокировки с исходным busy_timeout.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+SLOW_QUERY_MS = 100.0
+SLOW_LOG_SIZE = 100
+# Через сколько инструкций виртуальной машины вызывается progress handler
+PROGRESS_STEPS = 1000
+# Ограничение длины текста запроса в метках метрик
+LABEL_LENGTH = 200
+
+_SPACES = re.compile(r"\s+")
+# Списки параметров IN (?, ?, ?) разной длины считаются одним запросом
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def normalize_sql(sql):
+    """Ключ агрегации: запрос без лишних пробелов и со свернутыми списками ?"""
+    return _PLACEHOLDERS.sub("?, ...", _SPACES.sub(" ", sql).strip())
+
+
+def _is_busy(error):
+    return getattr(error, "sqlite_errorcode", None) == sqlite3.SQLITE_BUSY
+
+
+class _Run:
+    """Одно выполнение запроса: от execute до исчерпания курсора"""
+
+    __slots__ = ("sql", "params", "started", "seconds", "rows", "lock_wait",
+                 "steps", "error", "expanded")
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.started = time.time()
+        self.seconds = 0.0
+        self.rows = 0
+        self.lock_wait = 0.0
+        self.steps = 0
+        self.error = None
+        self.expanded = None
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Курсор, который сообщает о каждом запросе в Instrumentation. Запрос
+    учитывается, когда курсор дочитан до конца, закрыт, выполняет
+    следующий запрос или завершилась функция API, в которой он открыт.
+    """
+
+    _run = None
+    _steps_at_start = 0
+
+    def _instrumentation(self):
+        conn = self.connection
+        if isinstance(conn, InstrumentedConnection) and conn._enabled():
+            return conn.instrumentation
+        return None
+
+    def execute(self, sql, parameters=()):
+        instrumentation = self._instrumentation()
+        if instrumentation is None:
+            return super().execute(sql, parameters)
+        return self._execute(instrumentation, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        instrumentation = self._instrumentation()
+        if instrumentation is None:
+            return super().executemany(sql, seq_of_parameters)
+        # Итератор нельзя перечитать при повторе после SQLITE_BUSY,
+        # поэтому параметры читаются один раз до первой попытки
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        return self._execute(instrumentation, super().executemany, sql,
+                             seq_of_parameters, many=True)
+
+    def _execute(self, instrumentation, call, sql, parameters, many=False):
+        self._finish()
+        conn = self.connection
+        run = _Run(sql, None if many else parameters)
+        conn._traced = []
+        self._steps_at_start = conn._steps
+        conn._deadline = (time.perf_counter() + instrumentation.statement_timeout
+                          if instrumentation.statement_timeout else None)
+        started = time.perf_counter()
+        try:
+            run.lock_wait = _with_busy_retry(conn, lambda: call(sql, parameters))
+        except sqlite3.Error as e:
+            run.seconds = time.perf_counter() - started
+            run.error = e
+            self._run = run
+            self._finish()
+            raise
+        run.seconds = time.perf_counter() - started
+        self._run = run
+        if self.description is None:
+            run.rows = max(self.rowcount, 0)
+            self._finish()
+        else:
+            instrumentation.track(self)
+        return self
+
+    def _fetched(self, count, started, done):
+        run = self._run
+        if run is not None:
+            run.seconds += time.perf_counter() - started
+            run.rows += count
+            if done:
+                self._finish()
+
+    def _finish(self):
+        run = self._run
+        if run is None:
+            return
+        self._run = None
+        conn = self.connection
+        run.steps = (conn._steps - self._steps_at_start) * PROGRESS_STEPS
+        run.expanded = next((sql for sql in conn._traced if not sql.startswith("BEGIN")), None)
+        instrumentation = getattr(conn, "instrumentation", None)
+        if instrumentation is not None:
+            instrumentation.record(conn, run)
+
+    # Без незавершенного учтенного запроса строки читаются напрямую
+
+    def fetchone(self):
+        if self._run is None:
+            return super().fetchone()
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(0 if row is None else 1, started, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        if self._run is None:
+            return super().fetchmany(size)
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(len(rows), started, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        if self._run is None:
+            return super().fetchall()
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), started, True)
+        return rows
+
+    def __next__(self):
+        if self._run is None:
+            return super().__next__()
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, started, True)
+            raise
+        self._fetched(1, started, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+def _with_busy_retry(conn, call):
+    """
+    Выполняет call, повторяя его при SQLITE_BUSY до истечения busy_timeout
+    соединения. Возвращает время ожидания блокировки в секундах.
+    """
+    started = None
+    delay = 0.001
+    while True:
+        try:
+            call()
+            return 0.0 if started is None else time.perf_counter() - started
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            now = time.perf_counter()
+            if started is None:
+                started = now
+            remaining = conn._busy_timeout - (now - started)
+            if remaining <= 0:
+                raise
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Соединение, курсоры которого инструментированы, пока включен сбор метрик"""
+
+    instrumentation = None
+    _steps = 0
+    _deadline = None
+    _busy_timeout = 0.0
+    # busy_timeout обнулен и блокировки ждет _with_busy_retry
+    _busy_zeroed = False
+    _traced = ()
+
+    def _enabled(self):
+        instrumentation = self.instrumentation
+        enabled = instrumentation is not None and instrumentation.enabled
+        if enabled != self._busy_zeroed:
+            self._sync_busy_timeout(enabled)
+        return enabled
+
+    def _sync_busy_timeout(self, enabled):
+        """
+        Обнуляет busy_timeout при включении сбора метрик и возвращает
+        исходный, если сбор выключили, а соединение осталось в работе
+        """
+        # Мимо инструментированного курсора
+        execute = sqlite3.Connection.execute
+        if enabled:
+            self._busy_timeout = execute(self, "PRAGMA busy_timeout").fetchone()[0] / 1000
+            execute(self, "PRAGMA busy_timeout = 0")
+        else:
+            execute(self, f"PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}")
+            self._deadline = None
+        self._busy_zeroed = enabled
+
+    def cursor(self, factory=None):
+        enabled = self._enabled()
+        if factory is None:
+            factory = InstrumentedCursor if enabled else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        self._timed("COMMIT", super().commit)
+
+    def rollback(self):
+        self._timed("ROLLBACK", super().rollback)
+
+    def _timed(self, sql, call):
+        if not self._enabled() or not self.in_transaction:
+            return call()
+        instrumentation = self.instrumentation
+        run = _Run(sql, None)
+        started = time.perf_counter()
+        try:
+            run.lock_wait = _with_busy_retry(self, call)
+        except sqlite3.Error as e:
+            run.error = e
+            raise
+        finally:
+            run.seconds = time.perf_counter() - started
+            instrumentation.record(self, run)
+
+
+def _new_statement():
+    return {"calls": 0, "errors": 0, "rows": 0, "total_seconds": 0.0,
+            "max_seconds": 0.0, "lock_wait_seconds": 0.0, "vm_steps": 0}
+
+
+def _new_function():
+    return {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+            "statements": 0, "db_seconds": 0.0}
+
+
+class Instrumentation:
+    """
+    Сборщик метрик для соединений SQLite.
+
+    slow_query_ms - порог журнала медленных запросов (None - без журнала);
+    explain - прикладывать к медленному запросу EXPLAIN QUERY PLAN;
+    statement_timeout - прерывать запросы дольше этого числа секунд.
+    Слушатели add_listener(callback) получают словарь с данными каждого
+    выполненного запроса.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_log_size=SLOW_LOG_SIZE,
+                 explain=True, statement_timeout=None, enabled=True):
+        self.enabled = enabled
+        self.configure(slow_query_ms, slow_log_size, explain, statement_timeout)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._listeners = []
+        self.reset()
+
+    def configure(self, slow_query_ms=SLOW_QUERY_MS, slow_log_size=SLOW_LOG_SIZE,
+                  explain=True, statement_timeout=None):
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+        self.statement_timeout = statement_timeout
+        previous = getattr(self, "_slow", ())
+        self._slow = deque(previous, maxlen=slow_log_size)
+
+    def reset(self):
+        """Обнуляет все накопленные метрики и журнал медленных запросов"""
+        with self._lock:
+            self._statements = {}
+            self._functions = {}
+            self._slow.clear()
+            self.slow_total = 0
+
+    # Подключение к соединениям
+
+    def attach(self, conn):
+        """
+        Подключает соединение (созданное с factory=InstrumentedConnection).
+        Вызывается после PRAGMA профиля, чтобы перенять его busy_timeout.
+        """
+        conn.instrumentation = self
+        if not self.enabled:
+            return conn
+        conn._sync_busy_timeout(True)
+        conn._traced = []
+
+        def trace(sql):
+            if len(conn._traced) < 20:
+                conn._traced.append(sql)
+
+        def progress():
+            conn._steps += 1
+            # Ненулевой результат прерывает запрос (sqlite3.OperationalError)
+            return conn._deadline is not None and time.perf_counter() > conn._deadline
+
+        conn.set_trace_callback(trace)
+        conn.set_progress_handler(progress, PROGRESS_STEPS)
+        return conn
+
+    def connect(self, database, **kwargs):
+        """Открывает инструментированное соединение"""
+        conn = sqlite3.connect(database, factory=InstrumentedConnection, **kwargs)
+        return self.attach(conn)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    # Метрики функций API
+
+    @contextmanager
+    def function(self, name):
+        """Учитывает вызов функции API: время, запросы и ошибки внутри нее"""
+        if not self.enabled:
+            yield
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        cursors = self._local.__dict__.setdefault("cursors", [])
+        opened = len(cursors)
+        call = _new_function()
+        call["name"] = name
+        stack.append(call)
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # Недочитанные курсоры функции учитываются в ее же метриках
+            while len(cursors) > opened:
+                cursors.pop()._finish()
+            stack.pop()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._functions.setdefault(name, _new_function())
+                stats["calls"] += 1
+                stats["total_seconds"] += elapsed
+                stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+                stats["statements"] += call["statements"]
+                stats["db_seconds"] += call["db_seconds"]
+                # Функции db.py перехватывают ошибки SQLite, поэтому вызов
+                # считается ошибочным и при неудачном запросе внутри него
+                if failed or call["errors"]:
+                    stats["errors"] += 1
+
+    # Учет запросов
+
+    def track(self, cursor):
+        """Запоминает курсор с результатом, открытый внутри функции API"""
+        if getattr(self._local, "stack", None):
+            self._local.cursors.append(cursor)
+
+    def record(self, conn, run):
+        key = normalize_sql(run.sql)
+        stack = getattr(self._local, "stack", None) or []
+        with self._lock:
+            stats = self._statements.setdefault(key, _new_statement())
+            stats["calls"] += 1
+            stats["rows"] += run.rows
+            stats["total_seconds"] += run.seconds
+            stats["max_seconds"] = max(stats["max_seconds"], run.seconds)
+            stats["lock_wait_seconds"] += run.lock_wait
+            stats["vm_steps"] += run.steps
+            if run.error is not None:
+                stats["errors"] += 1
+        # Запрос учитывается во всех вложенных вызовах функций API
+        for call in stack:
+            call["statements"] += 1
+            call["db_seconds"] += run.seconds
+            if run.error is not None:
+                call["errors"] += 1
+
+        event = {
+            "sql": key,
+            "expanded_sql": run.expanded,
+            "at": datetime.fromtimestamp(run.started).isoformat(timespec="milliseconds"),
+            "seconds": run.seconds,
+            "rows": run.rows,
+            "lock_wait_seconds": run.lock_wait,
+            "vm_steps": run.steps,
+            "error": None if run.error is None else str(run.error),
+            "function": stack[-1]["name"] if stack else None,
+        }
+        if self.slow_query_ms is not None and run.seconds * 1000 >= self.slow_query_ms:
+            event["plan"] = self._plan(conn, run) if self.explain else None
+            with self._lock:
+                self._slow.append(event)
+                self.slow_total += 1
+        for listener in list(self._listeners):
+            listener(event)
+
+    def _plan(self, conn, run):
+        if run.sql.lstrip().upper().startswith(("COMMIT", "ROLLBACK", "BEGIN")):
+            return None
+        # Обычный курсор, чтобы EXPLAIN не попал в метрики
+        cursor = sqlite3.Cursor(conn)
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + run.sql, run.params or ())
+            return [row[3] for row in cursor.fetchall()]
+        except sqlite3.Error:
+            return None
+        finally:
+            cursor.close()
+
+    # Чтение метрик
+
+    def statements(self):
+        """Метрики по запросам: нормализованный текст -> счетчики"""
+        with self._lock:
+            return {key: dict(value) for key, value in self._statements.items()}
+
+    def functions(self):
+        """Метрики по функциям API: имя -> счетчики"""
+        with self._lock:
+            return {key: dict(value) for key, value in self._functions.items()}
+
+    def slow_queries(self):
+        """Журнал медленных запросов, от старых к новым"""
+        with self._lock:
+            return list(self._slow)
+
+    def snapshot(self):
+        return {
+            "statements": self.statements(),
+            "functions": self.functions(),
+            "slow_queries": self.slow_queries(),
+            "slow_total": self.slow_total,
+        }
+
+    def metrics_text(self):
+        """Метрики в текстовом формате Prometheus"""
+        lines = []
+
+        def family(name, kind, help_text, label, values):
+            name = "sqlite_" + name
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in values:
+                lines.append(f'{name}{{{label}="{_label(key)}"}} {value}')
+
+        statements = self.statements()
+        for field, name, kind, help_text in (
+            ("calls", "statement_calls_total", "counter", "Выполнено запросов"),
+            ("errors", "statement_errors_total", "counter", "Запросов с ошибкой"),
+            ("rows", "statement_rows_total", "counter", "Строк прочитано или изменено"),
+            ("total_seconds", "statement_seconds_total", "counter", "Суммарное время запросов"),
+            ("max_seconds", "statement_max_seconds", "gauge", "Самый долгий запрос"),
+            ("lock_wait_seconds", "statement_lock_wait_seconds_total", "counter",
+             "Ожидание блокировок"),
+            ("vm_steps", "statement_vm_steps_total", "counter",
+             "Инструкций виртуальной машины SQLite (приблизительно)"),
+        ):
+            family(name, kind, help_text, "statement",
+                   ((key, stats[field]) for key, stats in statements.items()))
+
+        functions = self.functions()
+        for field, name, kind, help_text in (
+            ("calls", "function_calls_total", "counter", "Вызовов функции"),
+            ("errors", "function_errors_total", "counter", "Вызовов с ошибкой"),
+            ("total_seconds", "function_seconds_total", "counter", "Суммарное время вызовов"),
+            ("max_seconds", "function_max_seconds", "gauge", "Самый долгий вызов"),
+            ("statements", "function_statements_total", "counter", "Запросов внутри функции"),
+            ("db_seconds", "function_db_seconds_total", "counter",
+             "Время запросов внутри функции"),
+        ):
+            family(name, kind, help_text, "function",
+                   ((key, stats[field]) for key, stats in functions.items()))
+
+        lines.append("# HELP sqlite_slow_queries_total Медленных запросов")
+        lines.append("# TYPE sqlite_slow_queries_total counter")
+        lines.append(f"sqlite_slow_queries_total {self.slow_total}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    value = value[:LABEL_LENGTH]
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def start_metrics_server(instrumentation, port=9108, host="127.0.0.1"):
+    """
+    Запускает в фоновом потоке HTTP-сервер с метриками по адресу /metrics.
+    Возвращает сервер; остановка - server.shutdown().
+    """
+    # http.server нужен только здесь, а его импорт заметно замедляет запуск
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = instrumentation.metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,194 @@
+import sqlite3
+
+# Счетчики хранятся в отдельных таблицах и поддерживаются триггерами,
+# поэтому отчету не нужно выполнять COUNT(*) по всей базе.
+STATS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS Library_Stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Author_Book_Counts (
+        author_id INTEGER PRIMARY KEY,
+        book_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_author_book_counts_count
+    ON Author_Book_Counts (book_count)
+    """,
+    # Авторы
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_authors_ai AFTER INSERT ON Authors BEGIN
+        UPDATE Library_Stats SET value = value + 1 WHERE name = 'authors';
+        INSERT INTO Author_Book_Counts (author_id, book_count) VALUES (new.author_id, 0);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_authors_ad AFTER DELETE ON Authors BEGIN
+        UPDATE Library_Stats SET value = value - 1 WHERE name = 'authors';
+        DELETE FROM Author_Book_Counts WHERE author_id = old.author_id;
+    END
+    """,
+    # Жанры
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_genres_ai AFTER INSERT ON Genres BEGIN
+        UPDATE Library_Stats SET value = value + 1 WHERE name = 'genres';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_genres_ad AFTER DELETE ON Genres BEGIN
+        UPDATE Library_Stats SET value = value - 1 WHERE name = 'genres';
+    END
+    """,
+    # Книги
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_books_ai AFTER INSERT ON Books BEGIN
+        UPDATE Library_Stats SET value = value + 1 WHERE name = 'books';
+        UPDATE Author_Book_Counts SET book_count = book_count + 1
+        WHERE author_id = new.author_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_books_ad AFTER DELETE ON Books BEGIN
+        UPDATE Library_Stats SET value = value - 1 WHERE name = 'books';
+        UPDATE Author_Book_Counts SET book_count = book_count - 1
+        WHERE author_id = old.author_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_books_au AFTER UPDATE OF author_id ON Books
+    WHEN old.author_id IS NOT new.author_id BEGIN
+        UPDATE Author_Book_Counts SET book_count = book_count - 1
+        WHERE author_id = old.author_id;
+        UPDATE Author_Book_Counts SET book_count = book_count + 1
+        WHERE author_id = new.author_id;
+    END
+    """,
+    # Читатели
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_readers_ai AFTER INSERT ON Readers BEGIN
+        UPDATE Library_Stats SET value = value + 1 WHERE name = 'readers';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_readers_ad AFTER DELETE ON Readers BEGIN
+        UPDATE Library_Stats SET value = value - 1 WHERE name = 'readers';
+    END
+    """,
+    # Выдачи: книга на руках, пока return_date IS NULL
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_issues_ai AFTER INSERT ON Book_Issues BEGIN
+        UPDATE Library_Stats SET value = value + 1 WHERE name = 'issues';
+        UPDATE Library_Stats SET value = value + (new.return_date IS NULL)
+        WHERE name = 'open_issues';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_issues_ad AFTER DELETE ON Book_Issues BEGIN
+        UPDATE Library_Stats SET value = value - 1 WHERE name = 'issues';
+        UPDATE Library_Stats SET value = value - (old.return_date IS NULL)
+        WHERE name = 'open_issues';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_issues_au AFTER UPDATE OF return_date ON Book_Issues
+    WHEN (old.return_date IS NULL) != (new.return_date IS NULL) BEGIN
+        UPDATE Library_Stats
+        SET value = value + (new.return_date IS NULL) - (old.return_date IS NULL)
+        WHERE name = 'open_issues';
+    END
+    """,
+]
+
+# Счетчик -> запрос для полного пересчета
+COUNTERS = {
+    "authors": "SELECT COUNT(*) FROM Authors",
+    "genres": "SELECT COUNT(*) FROM Genres",
+    "books": "SELECT COUNT(*) FROM Books",
+    "readers": "SELECT COUNT(*) FROM Readers",
+    "issues": "SELECT COUNT(*) FROM Book_Issues",
+    "open_issues": "SELECT COUNT(*) FROM Book_Issues WHERE return_date IS NULL",
+}
+
+BOOKS_PER_AUTHOR_QUERY = """
+    SELECT
+        a.first_name || ' ' || a.last_name AS Автор,
+        abc.book_count AS Количество_книг
+    FROM Author_Book_Counts abc
+    JOIN Authors a ON a.author_id = abc.author_id
+    ORDER BY abc.book_count DESC
+"""
+
+
+def install_stats(conn):
+    """
+    Создает таблицы счетчиков и триггеры. При первой установке счетчики
+    заполняются пересчетом по текущим данным. Возвращает True при установке.
+    """
+    installed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Library_Stats'"
+    ).fetchone() is None
+    try:
+        for statement in STATS_SCHEMA:
+            conn.execute(statement)
+        if installed:
+            _recount(conn)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return installed
+
+
+def _recount(conn):
+    for name, query in COUNTERS.items():
+        value = conn.execute(query).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO Library_Stats (name, value) VALUES (?, ?)",
+            (name, value)
+        )
+    conn.execute("DELETE FROM Author_Book_Counts")
+    conn.execute("""
+        INSERT INTO Author_Book_Counts (author_id, book_count)
+        SELECT a.author_id, COUNT(b.book_id)
+        FROM Authors a
+        LEFT JOIN Books b ON a.author_id = b.author_id
+        GROUP BY a.author_id
+    """)
+
+
+def refresh_stats(conn):
+    """Полностью пересчитывает счетчики (например, после ручной правки данных)"""
+    try:
+        _recount(conn)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+def get_stats(conn):
+    """Возвращает все счетчики словарем одним чтением маленькой таблицы"""
+    return dict(conn.execute("SELECT name, value FROM Library_Stats"))
+
+
+def get_stat(conn, name):
+    """Возвращает один счетчик поиском по первичному ключу"""
+    row = conn.execute("SELECT value FROM Library_Stats WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise KeyError(f"Неизвестный счетчик '{name}'")
+    return row[0]
+
+
+def check_stats(conn):
+    """Сравнивает счетчики с COUNT(*) и возвращает расхождения {имя: (счетчик, факт)}"""
+    stats = get_stats(conn)
+    mismatches = {}
+    for name, query in COUNTERS.items():
+        actual = conn.execute(query).fetchone()[0]
+        if stats.get(name) != actual:
+            mismatches[name] = (stats.get(name), actual)
+    return mismatches
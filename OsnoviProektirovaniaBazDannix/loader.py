@@ -0,0 +1,176 @@
+import csv
+import json
+import os
+import sqlite3
+
+LOAD_CHUNK_SIZE = 1000
+
+CHECKPOINT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Load_Checkpoints (
+        source TEXT PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        position INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class LoadError(Exception):
+    """Ошибка при загрузке данных"""
+
+
+def ensure_checkpoint_table(conn):
+    conn.execute(CHECKPOINT_SCHEMA)
+
+
+def get_checkpoint(conn, source):
+    """Возвращает (число уже загруженных строк, загрузка завершена)"""
+    ensure_checkpoint_table(conn)
+    row = conn.execute(
+        "SELECT position, completed FROM Load_Checkpoints WHERE source = ?", (source,)
+    ).fetchone()
+    return (row[0], bool(row[1])) if row else (0, False)
+
+
+def reset_checkpoint(conn, source):
+    """Забывает прогресс источника, чтобы загрузить его заново"""
+    ensure_checkpoint_table(conn)
+    conn.execute("DELETE FROM Load_Checkpoints WHERE source = ?", (source,))
+    conn.commit()
+
+
+def _save_checkpoint(conn, source, table, position, completed):
+    conn.execute("""
+        INSERT INTO Load_Checkpoints (source, table_name, position, completed, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE SET
+            position = excluded.position,
+            completed = excluded.completed,
+            updated_at = excluded.updated_at
+    """, (source, table, position, int(completed)))
+
+
+def upsert_sql(table, spec, columns, update=True):
+    """
+    Строит INSERT ... ON CONFLICT для набора столбцов.
+
+    spec: {"columns": [...], "key": [...], "natural": [...] или None}.
+    Если в строках есть все столбцы первичного ключа, конфликт ищется по
+    нему, иначе по естественному ключу. Если уникальный индекс
+    естественного ключа построен по выражениям (например, COALESCE для
+    столбца с NULL), они задаются в spec["natural_index"]. Остальные
+    столбцы обновляются; если обновлять нечего или update=False - DO NOTHING.
+    """
+    unknown = [column for column in columns if column not in spec["columns"]]
+    if unknown:
+        raise LoadError(f"Неизвестные столбцы {table}: {', '.join(unknown)}")
+    if all(column in columns for column in spec["key"]):
+        target = spec["key"]
+        conflict = ", ".join(target)
+    elif spec.get("natural") and all(column in columns for column in spec["natural"]):
+        target = spec["natural"]
+        conflict = spec.get("natural_index") or ", ".join(target)
+    else:
+        raise LoadError(f"Для {table} нужен первичный или естественный ключ")
+    updates = [column for column in columns if column not in target] if update else []
+    placeholders = ", ".join("?" * len(columns))
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+           f"ON CONFLICT ({conflict}) ")
+    if updates:
+        sql += "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in updates)
+    else:
+        sql += "DO NOTHING"
+    return sql
+
+
+def load_rows(conn, table, spec, rows, source, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Загружает строки-словари в таблицу пачками через upsert.
+
+    После каждой пачки в той же транзакции сохраняется контрольная точка,
+    поэтому после сбоя повторный вызов с тем же source пропускает уже
+    загруженные строки. Возвращает число строк, записанных этим вызовом.
+    """
+    position, completed = get_checkpoint(conn, source)
+    conn.commit()
+    if completed:
+        print(f"Источник {source} уже загружен, пропускаем")
+        return 0
+
+    columns = None
+    sql = None
+    chunk = []
+    loaded = 0
+
+    def flush(done):
+        nonlocal position, loaded
+        try:
+            if chunk:
+                conn.executemany(sql, chunk)
+            _save_checkpoint(conn, source, table, position + len(chunk), done)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise LoadError(
+                f"Ошибка загрузки {source} после строки {position}: {e}"
+            ) from e
+        position += len(chunk)
+        loaded += len(chunk)
+        chunk.clear()
+
+    for index, row in enumerate(rows):
+        if index < position:
+            continue
+        if columns is None:
+            columns = list(row)
+            sql = upsert_sql(table, spec, columns)
+        chunk.append(tuple(row.get(column) for column in columns))
+        if len(chunk) >= chunk_size:
+            flush(False)
+    flush(True)
+    print(f"Загружено в {table}: {loaded} строк (всего из источника: {position})")
+    return loaded
+
+
+def _clean(value):
+    return None if value == "" else value
+
+
+def read_csv(path):
+    """Потоково читает CSV с заголовком; пустые значения становятся NULL"""
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            yield {column: _clean(value) for column, value in row.items()}
+
+
+def read_json(path):
+    """
+    Читает JSON Lines (.jsonl, .ndjson) построчно; обычный .json должен
+    содержать массив объектов и загружается целиком.
+    """
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(file)
+
+
+def file_source(table, path):
+    """Имя источника по умолчанию: таблица и абсолютный путь к файлу"""
+    return f"{table}:{os.path.abspath(path)}"
+
+
+def load_file(conn, table, spec, path, source=None, chunk_size=LOAD_CHUNK_SIZE):
+    """Загружает CSV или JSON файл в таблицу с контрольными точками"""
+    if source is None:
+        source = file_source(table, path)
+    if path.endswith(".csv"):
+        rows = read_csv(path)
+    elif path.endswith((".json", ".jsonl", ".ndjson")):
+        rows = read_json(path)
+    else:
+        raise LoadError(f"Неизвестный формат файла: {path}")
+    return load_rows(conn, table, spec, rows, source, chunk_size)
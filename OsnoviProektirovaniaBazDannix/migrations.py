@@ -0,0 +1,52 @@
+import sqlite3
+
+
+class MigrationError(Exception):
+    """Ошибка при применении миграции схемы"""
+
+
+def get_version(conn):
+    """Текущая версия схемы (хранится в PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn, migrations):
+    """
+    Применяет миграции с версией больше текущей по возрастанию версий.
+
+    migrations - список (версия, описание, шаг), где шаг - список SQL-команд
+    или функция от соединения. Каждая миграция выполняется в своей
+    транзакции вместе с обновлением user_version. Шаги должны быть
+    идемпотентны (IF NOT EXISTS и т.п.): если шаг сам фиксирует транзакцию,
+    прерванная миграция просто выполнится повторно.
+    Возвращает список примененных версий.
+    """
+    versions = [version for version, _, _ in migrations]
+    if versions != sorted(set(versions)):
+        raise MigrationError("Версии миграций должны строго возрастать")
+
+    current = get_version(conn)
+    applied = []
+    for version, description, step in migrations:
+        if version <= current:
+            continue
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN")
+            if callable(step):
+                step(conn)
+            else:
+                for statement in step:
+                    conn.execute(statement)
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            raise MigrationError(f"Миграция {version} ({description}) не применена: {e}") from e
+        print(f"Применена миграция {version}: {description}")
+        applied.append(version)
+    return applied
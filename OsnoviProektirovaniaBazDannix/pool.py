@@ -0,0 +1,151 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class PoolError(Exception):
+    """Ошибка пула соединений (например, истек таймаут ожидания)"""
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул заранее настроенных соединений с SQLite.
+
+    Соединения создаются лениво, но не больше size штук. Свободные
+    соединения хранятся в очереди; перед выдачей каждое проверяется
+    запросом SELECT 1 и при ошибке пересоздается.
+
+    factory - класс соединения для sqlite3.connect, on_connect - функция,
+    которая вызывается для каждого нового соединения после настройки.
+    Соединение, выданное другим пулом (например, до пересоздания пула),
+    release() не принимает, а закрывает.
+    """
+
+    def __init__(self, database, size=5, timeout=5.0, init_statements=None,
+                 health_check=True, factory=sqlite3.Connection, on_connect=None):
+        if size < 1:
+            raise ValueError("Размер пула должен быть не меньше 1")
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.init_statements = list(init_statements or [])
+        self.health_check = health_check
+        self.factory = factory
+        self.on_connect = on_connect
+        self._idle = queue.LifoQueue(maxsize=size)
+        # Соединения, созданные этим пулом
+        self._owned = set()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        """Открывает новое соединение и выполняет настроечные команды"""
+        conn = sqlite3.connect(self.database, timeout=self.timeout,
+                               check_same_thread=False, factory=self.factory)
+        for statement in self.init_statements:
+            conn.execute(statement)
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        with self._lock:
+            self._owned.add(conn)
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            # Мимо переопределенного execute (например, инструментирования),
+            # чтобы проверка не учитывалась как запрос приложения
+            sqlite3.Connection.execute(conn, "SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Берет соединение из пула, при необходимости создавая новое"""
+        if self._closed:
+            raise PoolError("Пул соединений закрыт")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolError("Нет свободных соединений в пуле") from None
+
+        if self.health_check and not self._is_healthy(conn):
+            self._discard(conn)
+            return self.acquire()
+        return conn
+
+    def release(self, conn):
+        """Возвращает соединение в пул, откатывая незавершенную транзакцию"""
+        if not self.owns(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    def owns(self, conn):
+        """Проверяет, что соединение создано этим пулом"""
+        with self._lock:
+            return conn in self._owned
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._owned.discard(conn)
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: выдает соединение и возвращает его в пул"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Закрывает все свободные соединения и запрещает выдачу новых"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        """Возвращает число созданных и свободных соединений"""
+        return {"size": self.size, "created": self._created,
+                "idle": self._idle.qsize()}
@@ -0,0 +1,319 @@
+"""
+Параллельное построение отчетов по многим базам (арендаторам).
+
+Каждая пара (база, отчет) - отдельная задача для пула процессов. Воркер
+открывает базу только на чтение (URI file:...?mode=ro) с включенным
+mmap, выполняет запрос и отправляет строки пачками в общую очередь.
+Главный процесс отдает пачки по мере поступления, поэтому результаты
+всех отчетов не собираются в памяти целиком; очередь ограничена, и
+воркеры ждут, пока потребитель не заберет готовые пачки.
+
+Число одновременных задач ограничено числом воркеров, а число задач по
+одной базе - per_tenant, чтобы большой арендатор не занимал весь пул и
+не создавал лишнюю конкуренцию за его файл.
+
+Если процесс воркера аварийно завершился, выполнявшиеся задачи
+завершаются с ошибкой, а оставшиеся запускаются в новом пуле.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+from collections import deque, namedtuple
+
+from circulation import (LOAN_DURATION_QUERY, LOANS_PER_READER_QUERY, LOAN_PERIOD_DAYS,
+                         MOST_BORROWED_QUERY, OVERDUE_QUERY)
+import db
+from db1 import BOOKS_WITH_AUTHORS_QUERY, CURRENT_ISSUES_QUERY, READERS_WITH_BOOKS_QUERY
+import feed
+from library_stats import BOOKS_PER_AUTHOR_QUERY
+
+REPORT_WORKERS = os.cpu_count() or 2
+REPORT_PER_TENANT = 2
+REPORT_BATCH_SIZE = 500
+REPORT_MMAP_SIZE = 268435456
+
+# Настройки соединения воркера; журнал и синхронизация не меняются,
+# так как база открыта только на чтение
+READ_PRAGMAS = [
+    "PRAGMA query_only = ON",
+    f"PRAGMA mmap_size = {REPORT_MMAP_SIZE}",
+    "PRAGMA cache_size = -64000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+]
+
+CATEGORY_SUMMARY_QUERY = """
+    SELECT category, COUNT(*) AS posts, SUM(comment_count) AS comments,
+           MAX(created_at) AS last_post
+    FROM post_feed
+    GROUP BY category_id
+    ORDER BY posts DESC, category
+"""
+
+# Отчеты: имя -> (вид базы, sql, параметры). Вид базы определяется по
+# ее таблицам, см. detect_kind()
+REPORTS = {
+    "posts": ("blog", *db._posts_query()),
+    "feed": ("blog", *feed.feed_query()),
+    "category_summary": ("blog", CATEGORY_SUMMARY_QUERY, []),
+    "books_with_authors": ("library", BOOKS_WITH_AUTHORS_QUERY, []),
+    "readers_with_books": ("library", READERS_WITH_BOOKS_QUERY, []),
+    "books_per_author": ("library", BOOKS_PER_AUTHOR_QUERY, []),
+    "current_issues": ("library", CURRENT_ISSUES_QUERY, []),
+    "overdue": ("library", OVERDUE_QUERY, {"as_of": "now", "loan_days": LOAN_PERIOD_DAYS}),
+    "loans_per_reader": ("library", LOANS_PER_READER_QUERY, {"window": 2}),
+    "most_borrowed": ("library", MOST_BORROWED_QUERY, {"limit": 10}),
+    "loan_duration": ("library", LOAN_DURATION_QUERY, []),
+}
+
+# Признак вида базы: таблица, которая есть только в ней
+_KIND_TABLES = {"blog": "posts", "library": "Books"}
+
+# Отчеты по сводкам выдач (circulation.py). Соединение воркера только для
+# чтения и не может обновить сводки, поэтому отстающие сводки - ошибка
+_ROLLUP_REPORTS = {"loans_per_reader", "most_borrowed", "loan_duration"}
+
+_ROLLUP_LAG_QUERY = """
+    SELECT
+        (SELECT COALESCE(MAX(issue_id), 0) FROM Book_Issues)
+            > (SELECT value FROM Circulation_State WHERE name = 'last_issue_id')
+        OR EXISTS (SELECT 1 FROM Circulation_Log)
+"""
+
+# Задача отчета и событие потока результатов. Событие с finished=True
+# завершает задачу: rows - число строк, error - текст ошибки или None.
+# Арендатор - путь к базе в том виде, в котором он передан
+ReportTask = namedtuple('ReportTask', ['tenant', 'database', 'report'])
+ReportEvent = namedtuple('ReportEvent', ['tenant', 'report', 'rows', 'finished', 'error'])
+
+# Очередь результатов, флаг остановки и открытые соединения воркера
+_results = None
+_stop = None
+_connections = {}
+
+
+class ReportError(Exception):
+    """Неизвестный отчет, повтор базы или устаревшие сводки"""
+
+
+def connect_readonly(database):
+    """Соединение только на чтение через URI с включенным mmap"""
+    # Имя файла экранируется: '#' или '?' в нем иначе обрезали бы ?mode=ro
+    from urllib.request import pathname2url
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(database))}?mode=ro", uri=True)
+    for statement in READ_PRAGMAS:
+        conn.execute(statement)
+    return conn
+
+
+def detect_kind(conn):
+    """Возвращает вид базы ('blog' или 'library') или None"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for kind, table in _KIND_TABLES.items():
+        if table in tables:
+            return kind
+    return None
+
+
+def plan_reports(databases, reports=None):
+    """
+    Составляет задачи: для каждой базы - все подходящие ей отчеты из
+    reports (по умолчанию все). Возвращает (задачи, ошибки), где ошибки -
+    [(база, текст)] для баз, которые не удалось открыть или распознать.
+    """
+    reports = list(reports or REPORTS)
+    unknown = [name for name in reports if name not in REPORTS]
+    if unknown:
+        raise ReportError(f"Неизвестные отчеты: {', '.join(unknown)}")
+    seen = {}
+    for database in databases:
+        path = os.path.realpath(database)
+        if path in seen:
+            raise ReportError(f"База {database} указана дважды (как {seen[path]})")
+        seen[path] = database
+    tasks = []
+    failures = []
+    for database in databases:
+        try:
+            conn = connect_readonly(database)
+            try:
+                kind = detect_kind(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            failures.append((database, f"не удалось открыть: {e}"))
+            continue
+        if kind is None:
+            failures.append((database, "не база блога или библиотеки"))
+            continue
+        for name in reports:
+            if REPORTS[name][0] == kind:
+                tasks.append(ReportTask(database, database, name))
+    return tasks, failures
+
+
+def _init_worker(results, stop):
+    global _results, _stop
+    _results = results
+    _stop = stop
+
+
+def _run_task(task_id, database, report, batch_size):
+    """Выполняет отчет в воркере и отправляет строки пачками"""
+    count = 0
+    try:
+        conn = _connections.get(database)
+        if conn is None:
+            conn = _connections[database] = connect_readonly(database)
+        _, sql, params = REPORTS[report]
+        if report in _ROLLUP_REPORTS and conn.execute(_ROLLUP_LAG_QUERY).fetchone()[0]:
+            raise ReportError(
+                "сводки выдач устарели: выполните python circulation.py <база>"
+            )
+        cursor = conn.execute(sql, params)
+        try:
+            while not _stop.is_set():
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                count += len(rows)
+                _results.put((task_id, rows, False, None))
+        finally:
+            cursor.close()
+    except Exception as e:
+        _results.put((task_id, count, True, f"{type(e).__name__}: {e}"))
+        return
+    _results.put((task_id, count, True, None))
+
+
+def run_reports(tasks, workers=REPORT_WORKERS, per_tenant=REPORT_PER_TENANT,
+                batch_size=REPORT_BATCH_SIZE):
+    """
+    Выполняет задачи в пуле из workers процессов, не больше per_tenant
+    задач на одного арендатора одновременно. Генератор событий
+    ReportEvent: пачки строк в порядке поступления и по одному
+    завершающему событию на задачу.
+    """
+    if workers < 1 or per_tenant < 1:
+        raise ValueError("Число воркеров и лимит на арендатора должны быть не меньше 1")
+    tasks = list(tasks)
+    if not tasks:
+        return
+    # Пул процессов нужен только здесь, а не при импорте модуля
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # spawn одинаково работает на всех ОС и не наследует соединения родителя
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue(maxsize=workers * 4)
+    stop = context.Event()
+    pending = deque(enumerate(tasks))
+    running = {}
+    per_tenant_running = {}
+    executor = None
+
+    def finish(task_id):
+        task = tasks[task_id]
+        del running[task_id]
+        per_tenant_running[task.tenant] -= 1
+        return task
+
+    try:
+        while pending or running:
+            if executor is None:
+                executor = ProcessPoolExecutor(workers, mp_context=context,
+                                               initializer=_init_worker,
+                                               initargs=(results, stop))
+            # Задачи, упершиеся в лимит арендатора, остаются в очереди
+            # и запускаются по мере освобождения мест
+            skipped = deque()
+            while pending and len(running) < workers:
+                task_id, task = pending.popleft()
+                if per_tenant_running.get(task.tenant, 0) >= per_tenant:
+                    skipped.append((task_id, task))
+                    continue
+                per_tenant_running[task.tenant] = per_tenant_running.get(task.tenant, 0) + 1
+                running[task_id] = executor.submit(
+                    _run_task, task_id, task.database, task.report, batch_size
+                )
+            pending.extendleft(reversed(skipped))
+
+            try:
+                task_id, rows, finished, error = results.get(timeout=1.0)
+            except queue.Empty:
+                # Воркер мог упасть до отправки завершающего события или
+                # аварийно завершиться вместе с процессом
+                broken = False
+                for task_id, future in list(running.items()):
+                    if future.done() and future.exception() is not None:
+                        error = future.exception()
+                        broken = broken or isinstance(error, BrokenProcessPool)
+                        task = finish(task_id)
+                        yield ReportEvent(task.tenant, task.report, 0, True,
+                                          f"{type(error).__name__}: {error}")
+                if broken:
+                    executor.shutdown(wait=True)
+                    executor = None
+                continue
+            if task_id not in running:
+                # Событие задачи, уже завершенной с ошибкой
+                continue
+            task = tasks[task_id]
+            if finished:
+                finish(task_id)
+            yield ReportEvent(task.tenant, task.report, rows, finished, error)
+    finally:
+        if executor is not None:
+            # Потребитель прекратил чтение: воркеры прерывают отчеты, а
+            # очередь разбирается, чтобы они не ждали места в ней
+            stop.set()
+            for future in running.values():
+                future.cancel()
+            while not all(future.done() for future in running.values()):
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            executor.shutdown(wait=True)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Параллельные отчеты по базам блога и библиотеки (JSON Lines в stdout)"
+    )
+    parser.add_argument("databases", nargs="+", help="файлы баз арендаторов")
+    parser.add_argument("--report", action="append", choices=sorted(REPORTS),
+                        help="отчет (можно несколько раз; по умолчанию все)")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--per-tenant", type=int, default=REPORT_PER_TENANT)
+    parser.add_argument("--batch-size", type=int, default=REPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        tasks, failures = plan_reports(args.databases, args.report)
+    except ReportError as e:
+        print(e, file=sys.stderr)
+        return 1
+    failed = len(failures)
+    for database, error in failures:
+        print(f"{database}: ошибка {error}", file=sys.stderr)
+    for event in run_reports(tasks, args.workers, args.per_tenant, args.batch_size):
+        if not event.finished:
+            for row in event.rows:
+                print(json.dumps({"tenant": event.tenant, "report": event.report, "row": row},
+                                 ensure_ascii=False, default=str))
+        elif event.error:
+            failed += 1
+            print(f"{event.tenant} [{event.report}]: ошибка {event.error}", file=sys.stderr)
+        else:
+            print(f"{event.tenant} [{event.report}]: строк {event.rows}", file=sys.stderr)
+    print(f"Задач: {len(tasks)}, с ошибками: {failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,200 @@
+import re
+import sqlite3
+import sys
+
+# Полнотекстовые индексы FTS5 с внешним содержимым: сами тексты хранятся
+# в posts и comments, в индексах только токены. Синхронизацию выполняют
+# триггеры, поэтому писать в posts/comments можно как обычно.
+SEARCH_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content,
+        content='posts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+        text,
+        content='comments', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts (rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts (rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN
+        INSERT INTO comments_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN
+        INSERT INTO comments_fts (comments_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF text ON comments BEGIN
+        INSERT INTO comments_fts (comments_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO comments_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+# Веса BM25: совпадение в заголовке важнее совпадения в тексте,
+# совпадение в комментарии учитывается с понижающим коэффициентом
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+COMMENT_FACTOR = 0.5
+
+# Сначала ранжируется и обрезается до страницы только набор id по bm25,
+# а snippet() вычисляется во внешнем запросе лишь для строк страницы:
+# FTS5 строит фрагмент по тому же MATCH с ограничением на rowid
+SEARCH_QUERY = f"""
+    WITH hits AS (
+        SELECT
+            rowid AS post_id,
+            NULL AS comment_id,
+            bm25(posts_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) AS score
+        FROM posts_fts
+        WHERE posts_fts MATCH :query
+        UNION ALL
+        SELECT
+            c.post_id,
+            c.id,
+            bm25(comments_fts) * {COMMENT_FACTOR}
+        FROM comments_fts
+        JOIN comments c ON c.id = comments_fts.rowid
+        WHERE comments_fts MATCH :query
+    ),
+    best AS (
+        -- bm25 отрицателен: чем меньше значение, тем релевантнее.
+        -- comment_id берется из строки с минимальным score
+        SELECT post_id, MIN(score) AS score, comment_id
+        FROM hits
+        GROUP BY post_id
+    ),
+    page AS (
+        SELECT post_id, score, comment_id
+        FROM best
+        ORDER BY score, post_id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT
+        p.id,
+        p.title,
+        u.username AS author,
+        c.name AS category,
+        p.created_at,
+        CASE WHEN page.comment_id IS NULL THEN (
+            SELECT snippet(posts_fts, -1, '[', ']', '…', 12)
+            FROM posts_fts
+            WHERE posts_fts MATCH :query AND posts_fts.rowid = page.post_id
+        ) ELSE (
+            SELECT snippet(comments_fts, 0, '[', ']', '…', 12)
+            FROM comments_fts
+            WHERE comments_fts MATCH :query AND comments_fts.rowid = page.comment_id
+        ) END AS snippet,
+        page.score
+    FROM page
+    JOIN posts p ON p.id = page.post_id
+    JOIN users u ON p.user_id = u.id
+    JOIN categories c ON p.category_id = c.id
+    ORDER BY page.score, p.id
+"""
+
+
+def ensure_search_schema(conn):
+    """
+    Создает FTS-индексы и триггеры. Если индексы появились впервые в уже
+    заполненной базе, сразу перестраивает их. Возвращает True при создании.
+    """
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'"
+    ).fetchone() is None
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+    if created:
+        rebuild_search_index(conn)
+    conn.commit()
+    return created
+
+
+def rebuild_search_index(conn):
+    """Перестраивает FTS-индексы по текущему содержимому posts и comments"""
+    conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def to_match_query(text):
+    """
+    Превращает пользовательскую строку в запрос FTS5: каждое слово
+    берется в кавычки как префикс, слова объединяются через AND.
+    Так спецсимволы FTS5 во вводе не приводят к синтаксическим ошибкам.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_posts(conn, query, limit=20, offset=0, raw=False):
+    """
+    Ищет посты по заголовку, тексту и комментариям с ранжированием BM25.
+    Возвращает строки (id, title, author, category, created_at, snippet, score).
+    При raw=True query передается в FTS5 без преобразования.
+    """
+    match = query if raw else to_match_query(query)
+    if not match:
+        return []
+    return conn.execute(
+        SEARCH_QUERY,
+        {"query": match, "limit": limit, "offset": offset}
+    ).fetchall()
+
+
+def main(argv):
+    """python search.py rebuild [файл БД] | python search.py query <текст> [файл БД]"""
+    if len(argv) >= 1 and argv[0] == "rebuild":
+        database = argv[1] if len(argv) > 1 else "blog.db"
+        conn = sqlite3.connect(database)
+        try:
+            if not ensure_search_schema(conn):
+                rebuild_search_index(conn)
+            print(f"Поисковый индекс {database} перестроен")
+        finally:
+            conn.close()
+    elif len(argv) >= 2 and argv[0] == "query":
+        database = argv[2] if len(argv) > 2 else "blog.db"
+        conn = sqlite3.connect(database)
+        try:
+            for post_id, title, author, category, created_at, snippet, score in search_posts(conn, argv[1]):
+                print(f"{post_id} | {title} | {author} | {category} | {snippet}")
+        finally:
+            conn.close()
+    else:
+        print(main.__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""
+Бюджет времени запуска точек входа командной строки.
+
+Время импорта модуля измеряется в отдельном процессе через
+python -X importtime (накопленное время модуля вместе со всеми его
+импортами). Берется минимум из нескольких запусков: так меньше влияние
+шума, а кэш .pyc прогревается первым запуском. Если модуль превысил
+бюджет, команда завершается с кодом 1, поэтому ее можно запускать как
+проверку перед слиянием изменений:
+
+    python startup.py [--repeat N] [модуль ...]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_HARDWARE = os.path.join(os.path.dirname(_HERE), "ArxiterktyraApparatnixCredstv")
+
+# Модуль -> (каталог, бюджет в миллисекундах). Импорт модулей не должен
+# выполнять работу с базой или вычисления - только определения
+STARTUP_BUDGETS = {
+    "db": (_HERE, 50.0),
+    "db1": (_HERE, 40.0),
+    "reports": (_HERE, 80.0),
+    "dz1": (_HARDWARE, 10.0),
+}
+STARTUP_REPEAT = 5
+
+# Строка вывода -X importtime: "import time: self | cumulative | имя"
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_time(module, directory, repeat=STARTUP_REPEAT):
+    """Минимальное накопленное время импорта модуля в миллисекундах"""
+    best = None
+    for _ in range(repeat + 1):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=directory, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+        cumulative = None
+        for line in result.stderr.splitlines():
+            match = _IMPORT_LINE.match(line)
+            if match and not match.group(3) and match.group(4) == module:
+                cumulative = int(match.group(2)) / 1000
+        if cumulative is None:
+            raise RuntimeError(f"В выводе -X importtime нет модуля {module}")
+        if best is None or cumulative < best:
+            best = cumulative
+    return best
+
+
+def check_budgets(modules=None, repeat=STARTUP_REPEAT):
+    """Возвращает [(модуль, мс, бюджет, в пределах бюджета)]"""
+    results = []
+    for module in modules or STARTUP_BUDGETS:
+        directory, budget = STARTUP_BUDGETS[module]
+        elapsed = import_time(module, directory, repeat)
+        results.append((module, elapsed, budget, elapsed <= budget))
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Проверка бюджета времени запуска")
+    parser.add_argument("modules", nargs="*",
+                        help=f"модули из {', '.join(STARTUP_BUDGETS)} (по умолчанию все)")
+    parser.add_argument("--repeat", type=int, default=STARTUP_REPEAT)
+    args = parser.parse_args(argv)
+    unknown = [module for module in args.modules if module not in STARTUP_BUDGETS]
+    if unknown:
+        parser.error(f"нет бюджета для модулей: {', '.join(unknown)}")
+
+    failed = 0
+    for module, elapsed, budget, ok in check_budgets(args.modules, args.repeat):
+        status = "OK" if ok else "ПРЕВЫШЕН"
+        print(f"{module:<8} {elapsed:7.1f} мс  бюджет {budget:5.1f} мс  {status}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import db1
+
+
+@pytest.fixture
+def blog(tmp_path, monkeypatch):
+    """Пустая база блога во временном каталоге; модуль db настроен на нее"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "blog.db"))
+    monkeypatch.setattr(db, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(db, "_pool", None)
+    monkeypatch.setattr(db, "_comment_queue", None)
+    db.configure_cache()
+    db.create_blog_database()
+    yield db
+    if db._comment_queue is not None:
+        db._comment_queue.close()
+    db.get_pool().close()
+    db.configure_cache()
+
+
+@pytest.fixture
+def library(tmp_path):
+    """База библиотеки во временном каталоге со схемой и тестовыми данными"""
+    conn = db1.connect(str(tmp_path / "library.db"))
+    db1.migrate(conn)
+    db1.seed(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,67 @@
+import pytest
+
+
+def _count(blog, table):
+    conn = blog.get_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        blog.release_connection(conn)
+
+
+def test_duplicates_rejected_per_row(blog):
+    blog.add_user("ivan", "ivan@mail.com")
+    results = blog.add_users_bulk([
+        ("maria", "maria@ya.ru"),
+        ("ivan", "other@mail.com"),    # занятое имя
+        ("alex", "maria@ya.ru"),       # повтор email внутри пачки
+        ("petr", "petr@mail.com"),
+    ], chunk_size=2)
+
+    assert [result.error is None for result in results] == [True, False, False, True]
+    assert "username 'ivan'" in results[1].error
+    assert "email 'maria@ya.ru'" in results[2].error
+    assert _count(blog, "users") == 3
+    conn = blog.get_connection()
+    try:
+        for result, username in ((results[0], "maria"), (results[3], "petr")):
+            row = conn.execute("SELECT username FROM users WHERE id = ?", (result.row_id,))
+            assert row.fetchone()[0] == username
+    finally:
+        blog.release_connection(conn)
+
+
+def test_dangling_references_rejected(blog):
+    user = blog.add_user("ivan", "ivan@mail.com")
+    category = blog.add_category("Python")
+    results = blog.create_posts_bulk([
+        ("ok", "текст", user, category),
+        ("нет автора", "текст", user + 100, category),
+        ("нет категории", "текст", user, category + 100),
+    ])
+    assert [result.error for result in results] == [
+        None, "пользователь не существует", "категория не существует"
+    ]
+    comments = blog.add_comments_bulk([("hi", results[0].row_id, user), ("x", 999, user)])
+    assert comments[1].error == "пост не существует"
+    assert _count(blog, "posts") == 1
+    assert _count(blog, "comments") == 1
+
+
+def test_database_error_rolls_back_earlier_chunks(blog):
+    # Вторая пачка падает в SQLite (object() не привязывается как параметр):
+    # первая пачка не должна остаться в базе
+    rows = [(f"user{i}", f"user{i}@mail.com") for i in range(4)] + [("bad", object())]
+    assert blog.add_users_bulk(rows, chunk_size=4) is None
+    assert _count(blog, "users") == 0
+
+
+def test_source_error_rolls_back_earlier_chunks(blog):
+    def rows():
+        for i in range(10):
+            yield (f"user{i}", f"user{i}@mail.com")
+        raise RuntimeError("источник оборвался")
+
+    with pytest.raises(RuntimeError):
+        blog.add_users_bulk(rows(), chunk_size=3)
+    assert _count(blog, "users") == 0
@@ -0,0 +1,74 @@
+import threading
+
+from cache import QueryCache
+
+
+def test_writes_invalidate_cached_posts(blog):
+    user = blog.add_user("ivan", "ivan@mail.com")
+    python = blog.add_category("Python")
+    blog.create_post("Первый", "текст", user, python)
+    assert [post[1] for post in blog.fetch_all_posts()] == ["Первый"]
+    assert len(blog.fetch_posts_by_category("Python")) == 1
+
+    blog.create_post("Второй", "текст", user, python)
+    assert len(blog.fetch_all_posts()) == 2
+    assert len(blog.fetch_posts_by_category("Python")) == 2
+
+    blog.create_posts_bulk([("Третий", "текст", user, python)])
+    assert len(blog.fetch_all_posts()) == 3
+    assert len(blog.fetch_posts_by_category("Python")) == 3
+
+
+def test_new_category_invalidates_cached_empty_result(blog):
+    assert blog.fetch_posts_by_category("SQL") == []
+    user = blog.add_user("ivan", "ivan@mail.com")
+    category = blog.add_category("SQL")
+    blog.create_post("Пост", "текст", user, category)
+    assert len(blog.fetch_posts_by_category("SQL")) == 1
+
+
+def test_repeated_read_is_served_from_cache(blog):
+    blog.fetch_all_posts()
+    hits = blog.get_cache_stats()["hits"]
+    blog.fetch_all_posts()
+    assert blog.get_cache_stats()["hits"] == hits + 1
+
+
+def test_stale_load_does_not_overwrite_newer_data():
+    cache = QueryCache()
+    data = {"value": "old"}
+    loading = threading.Event()
+    written = threading.Event()
+
+    def slow_loader():
+        value = data["value"]
+        loading.set()
+        written.wait(5)
+        return value
+
+    def writer():
+        loading.wait(5)
+        data["value"] = "new"
+        cache.invalidate("t")
+        written.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert cache.get_or_load(("k",), slow_loader, tags=("t",)) == "old"
+    thread.join()
+
+    assert cache.get(("k",)) == (False, None)
+    assert cache.stats()["stale_loads"] == 1
+    assert cache.get_or_load(("k",), lambda: data["value"], tags=("t",)) == "new"
+    assert cache.get(("k",)) == (True, "new")
+
+
+def test_clear_during_load_discards_result():
+    cache = QueryCache()
+
+    def loader():
+        cache.clear()
+        return "old"
+
+    cache.get_or_load(("k",), loader)
+    assert cache.get(("k",)) == (False, None)
@@ -0,0 +1,108 @@
+import db1
+from circulation import refresh_circulation
+
+
+def summaries(conn):
+    books = conn.execute(
+        "SELECT book_id, loans, returned, ROUND(loan_days, 6) FROM Book_Circulation "
+        "WHERE loans != 0 ORDER BY book_id"
+    ).fetchall()
+    readers = conn.execute(
+        "SELECT reader_id, month, loans FROM Reader_Monthly_Loans "
+        "WHERE loans != 0 ORDER BY reader_id, month"
+    ).fetchall()
+    return books, readers
+
+
+def recomputed(conn):
+    """Сводки, посчитанные заново по всей истории выдач"""
+    books = conn.execute("""
+        SELECT book_id, COUNT(*), COUNT(return_date),
+            ROUND(SUM(COALESCE(julianday(return_date) - julianday(issue_date), 0)), 6)
+        FROM Book_Issues GROUP BY book_id ORDER BY book_id
+    """).fetchall()
+    readers = conn.execute("""
+        SELECT reader_id, strftime('%Y-%m', issue_date), COUNT(*)
+        FROM Book_Issues GROUP BY 1, 2 ORDER BY 1, 2
+    """).fetchall()
+    return books, readers
+
+
+def test_seed_builds_summaries(library):
+    assert summaries(library) == recomputed(library)
+    assert library.execute("SELECT COUNT(*) FROM Circulation_Log").fetchone()[0] == 0
+
+
+def test_reseed_changes_nothing(library):
+    before = summaries(library)
+    db1.seed(library)
+    assert refresh_circulation(library) == (0, 0)
+    assert summaries(library) == before
+
+
+def test_insert_is_applied_on_refresh(library):
+    library.execute(
+        "INSERT INTO Book_Issues (book_id, reader_id, issue_date, return_date) "
+        "VALUES (1, 2, '2024-03-01', '2024-03-11')"
+    )
+    library.commit()
+    assert refresh_circulation(library) == (1, 0)
+    assert summaries(library) == recomputed(library)
+    assert library.execute(
+        "SELECT loans, returned, loan_days FROM Book_Circulation WHERE book_id = 1"
+    ).fetchone() == (2, 1, 10.0)
+
+
+def test_insert_with_old_issue_id_goes_through_log(library):
+    library.execute("DELETE FROM Book_Issues WHERE issue_id = 2")
+    library.execute(
+        "INSERT INTO Book_Issues (issue_id, book_id, reader_id, issue_date) "
+        "VALUES (2, 6, 3, '2024-04-02')"
+    )
+    library.commit()
+    assert refresh_circulation(library) == (0, 2)
+    assert summaries(library) == recomputed(library)
+
+
+def test_update_is_applied_as_correction(library):
+    library.execute("UPDATE Book_Issues SET return_date = '2024-01-29' WHERE issue_id = 1")
+    library.execute("UPDATE Book_Issues SET issue_date = '2024-03-05' WHERE issue_id = 3")
+    library.commit()
+    assert refresh_circulation(library) == (0, 4)
+    assert summaries(library) == recomputed(library)
+    assert library.execute(
+        "SELECT returned, loan_days FROM Book_Circulation WHERE book_id = 1"
+    ).fetchone() == (1, 14.0)
+
+
+def test_delete_and_cascade_delete(library):
+    library.execute("DELETE FROM Book_Issues WHERE issue_id = 5")
+    # Удаление читателя каскадно удаляет его выдачи 1 и 4
+    library.execute("DELETE FROM Readers WHERE reader_id = 1")
+    library.commit()
+    assert refresh_circulation(library) == (0, 3)
+    assert summaries(library) == recomputed(library)
+    assert library.execute(
+        "SELECT COUNT(*) FROM Reader_Monthly_Loans WHERE reader_id = 1 AND loans != 0"
+    ).fetchone()[0] == 0
+
+
+def test_changes_before_refresh_are_not_lost(library):
+    # Новая выдача, измененная и удаленная до обновления сводок
+    library.execute(
+        "INSERT INTO Book_Issues (issue_id, book_id, reader_id, issue_date) "
+        "VALUES (10, 3, 4, '2024-05-01')"
+    )
+    library.execute("UPDATE Book_Issues SET return_date = '2024-05-04' WHERE issue_id = 10")
+    library.execute(
+        "INSERT INTO Book_Issues (issue_id, book_id, reader_id, issue_date) "
+        "VALUES (11, 4, 4, '2024-05-02')"
+    )
+    library.execute("DELETE FROM Book_Issues WHERE issue_id = 11")
+    library.commit()
+    refresh_circulation(library)
+    assert summaries(library) == recomputed(library)
+    library.execute("DELETE FROM Books WHERE book_id = 3")
+    library.commit()
+    refresh_circulation(library)
+    assert summaries(library) == recomputed(library)
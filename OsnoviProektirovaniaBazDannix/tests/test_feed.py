@@ -0,0 +1,92 @@
+import pytest
+
+
+def execute(blog, sql, params=()):
+    conn = blog.get_connection()
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        blog.release_connection(conn)
+
+
+def feed_rows(blog):
+    rows, _ = blog.get_feed_page(limit=100)
+    return {row[0]: row[1:] for row in rows}
+
+
+@pytest.fixture
+def posts(blog):
+    """Два автора, две категории и три поста; у первого поста два комментария"""
+    alice = blog.add_user("alice", "alice@example.com")
+    bob = blog.add_user("bob", "bob@example.com")
+    python = blog.add_category("Python")
+    sql = blog.add_category("SQL")
+    first = blog.create_post("Первый", "текст", alice, python)
+    second = blog.create_post("Второй", "текст", bob, sql)
+    third = blog.create_post("Третий", "текст", alice, sql)
+    blog.add_comment("a", first, bob)
+    blog.add_comment("b", first, alice)
+    return {"alice": alice, "bob": bob, "python": python, "sql": sql,
+            "posts": (first, second, third)}
+
+
+def test_insert_fills_feed(blog, posts):
+    first, second, third = posts["posts"]
+    rows = feed_rows(blog)
+    assert set(rows) == {first, second, third}
+    assert rows[first][0] == "Первый"
+    assert rows[first][2:] == ("alice", "Python", 2)
+    assert rows[second][2:] == ("bob", "SQL", 0)
+    assert blog.check_post_feed() == []
+
+
+def test_post_update_and_delete(blog, posts):
+    first, second, third = posts["posts"]
+    execute(blog, "UPDATE posts SET title = ?, user_id = ?, category_id = ? WHERE id = ?",
+            ("Первый (правка)", posts["bob"], posts["sql"], first))
+    rows = feed_rows(blog)
+    assert rows[first][0] == "Первый (правка)"
+    assert rows[first][2:] == ("bob", "SQL", 2)
+    # Удаление поста каскадно удаляет комментарии и строку ленты
+    execute(blog, "DELETE FROM posts WHERE id = ?", (first,))
+    assert set(feed_rows(blog)) == {second, third}
+    assert blog.check_post_feed() == []
+
+
+def test_comment_delete_and_move(blog, posts):
+    first, second, _ = posts["posts"]
+    execute(blog, "UPDATE comments SET post_id = ? WHERE text = 'a'", (second,))
+    rows = feed_rows(blog)
+    assert (rows[first][-1], rows[second][-1]) == (1, 1)
+    # Правка текста комментария счетчики не меняет
+    execute(blog, "UPDATE comments SET text = 'c' WHERE text = 'b'")
+    execute(blog, "DELETE FROM comments WHERE text = 'a'")
+    rows = feed_rows(blog)
+    assert (rows[first][-1], rows[second][-1]) == (1, 0)
+    assert blog.check_post_feed() == []
+
+
+def test_rename_user_and_category(blog, posts):
+    first, second, third = posts["posts"]
+    execute(blog, "UPDATE users SET username = 'alicia' WHERE id = ?", (posts["alice"],))
+    execute(blog, "UPDATE categories SET name = 'Базы данных' WHERE id = ?", (posts["sql"],))
+    rows = feed_rows(blog)
+    assert rows[first][2:4] == ("alicia", "Python")
+    assert rows[second][2:4] == ("bob", "Базы данных")
+    assert rows[third][2:4] == ("alicia", "Базы данных")
+    assert [row[0] for row in blog.get_feed_page(category_name="Базы данных")[0]] == [third, second]
+    assert blog.check_post_feed() == []
+
+
+def test_cascade_delete_user(blog, posts):
+    first, second, third = posts["posts"]
+    blog.add_comment("c", second, posts["alice"])
+    assert feed_rows(blog)[second][-1] == 1
+    # Комментарии alice к чужим постам сначала удаляются явно: у comments.user_id нет каскада
+    execute(blog, "DELETE FROM comments WHERE user_id = ?", (posts["alice"],))
+    execute(blog, "DELETE FROM users WHERE id = ?", (posts["alice"],))
+    rows = feed_rows(blog)
+    assert set(rows) == {second}
+    assert rows[second][-1] == 0
+    assert blog.check_post_feed() == []
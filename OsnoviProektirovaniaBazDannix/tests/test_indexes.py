@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from indexes import QueryPlanError, check_query_plans, ensure_indexes, find_table_scans
+
+
+@pytest.mark.parametrize("detail, tables", [
+    # SQLite 3.36 и новее
+    ("SCAN p", {"p"}),
+    # SQLite до 3.36
+    ("SCAN TABLE posts", {"posts"}),
+    ("SCAN TABLE posts AS p", {"p"}),
+])
+def test_full_scan_is_found(detail, tables):
+    assert find_table_scans([detail], tables) == [detail]
+
+
+@pytest.mark.parametrize("detail", [
+    "SCAN p USING INDEX idx_posts_created",
+    "SCAN p USING COVERING INDEX idx_posts_category_created",
+    "SCAN TABLE posts USING INDEX idx_posts_created",
+    "SCAN TABLE posts USING COVERING INDEX idx_posts_created",
+    "SCAN TABLE posts AS p USING INDEX idx_posts_created",
+    "SCAN TABLE posts AS p USING COVERING INDEX idx_posts_category_created",
+    "SEARCH TABLE posts AS p USING INDEX idx_posts_user (user_id=?)",
+    "SEARCH p USING INTEGER PRIMARY KEY (rowid=?)",
+    "SCAN CONSTANT ROW",
+])
+def test_index_scan_is_not_reported(detail):
+    assert find_table_scans([detail], {"p", "posts"}) == []
+
+
+def test_only_listed_tables_are_reported():
+    plan = ["SCAN TABLE comments AS m", "SCAN TABLE posts AS p"]
+    assert find_table_scans(plan, {"p"}) == ["SCAN TABLE posts AS p"]
+
+
+def test_check_query_plans():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, user_id INTEGER)")
+    hot = [("by_user", "SELECT id FROM posts p WHERE user_id = ?", (1,), {"p"})]
+    with pytest.raises(QueryPlanError):
+        check_query_plans(conn, hot)
+    ensure_indexes(conn, [("idx_posts_user", "posts (user_id)")])
+    assert "by_user" in check_query_plans(conn, hot)
+    conn.close()
+
+
+def test_ensure_indexes_keeps_caller_transaction(tmp_path):
+    path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, user_id INTEGER)")
+    conn.execute("INSERT INTO posts (user_id) VALUES (1)")
+    assert conn.in_transaction
+    assert ensure_indexes(conn, [("idx_posts_user", "posts (user_id)")]) == ["idx_posts_user"]
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 0
+    conn.close()
+
+
+def test_ensure_indexes_commits_own_transaction(tmp_path):
+    path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, user_id INTEGER)")
+    ensure_indexes(conn, [("idx_posts_user", "posts (user_id)")])
+    assert not conn.in_transaction
+    other = sqlite3.connect(path)
+    assert other.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_posts_user'"
+    ).fetchone()[0] == 1
+    other.close()
+    conn.close()
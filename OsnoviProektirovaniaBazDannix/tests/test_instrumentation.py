@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from profiles import get_profile
+
+COUNT_TO = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) SELECT COUNT(*) FROM n"
+
+
+@pytest.fixture
+def instrumented(blog, monkeypatch):
+    monkeypatch.setattr(blog, "_instrumentation", None)
+    blog.configure_instrumentation(slow_query_ms=None, statement_timeout=0.05)
+    yield blog
+    blog.configure_instrumentation(enabled=False)
+
+
+def busy_timeout(conn):
+    return conn.execute("PRAGMA busy_timeout").fetchone()[0]
+
+
+def test_surviving_connection_gets_busy_timeout_back(instrumented):
+    expected = get_profile(instrumented.get_active_profile()[0])["busy_timeout"]
+    # Собственный пул, как у AsyncBlog, переживает выключение сбора метрик
+    pool = instrumented.create_pool(size=1)
+    conn = pool.acquire()
+    try:
+        assert busy_timeout(conn) == 0
+        instrumented.configure_instrumentation(enabled=False)
+        assert busy_timeout(conn) == expected
+        instrumented.configure_instrumentation(slow_query_ms=None)
+        assert busy_timeout(conn) == 0
+        conn.execute("SELECT 1").fetchall()
+        assert conn._busy_timeout == expected / 1000
+    finally:
+        pool.release(conn)
+        pool.close()
+
+
+def test_statement_timeout_ends_with_instrumentation(instrumented):
+    pool = instrumented.create_pool(size=1)
+    conn = pool.acquire()
+    try:
+        conn.execute("SELECT 1").fetchall()
+        instrumented.configure_instrumentation(enabled=False)
+        time.sleep(0.1)
+        # Срок последнего учтенного запроса не прерывает запросы без метрик
+        assert conn.execute(COUNT_TO, (200000,)).fetchone()[0] == 200000
+    finally:
+        pool.release(conn)
+        pool.close()
@@ -0,0 +1,77 @@
+from library_stats import check_stats, get_stat, get_stats
+
+
+def book_count(conn, author_id):
+    row = conn.execute(
+        "SELECT book_count FROM Author_Book_Counts WHERE author_id = ?", (author_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def test_seed_counters_match_tables(library):
+    assert get_stats(library) == {
+        "authors": 4, "genres": 4, "books": 6, "readers": 4, "issues": 6, "open_issues": 4,
+    }
+    assert book_count(library, 1) == 2
+    assert check_stats(library) == {}
+
+
+def test_insert_updates_counters(library):
+    library.execute(
+        "INSERT INTO Authors (author_id, first_name, last_name, birth_year) "
+        "VALUES (5, 'Николай', 'Гоголь', 1809)"
+    )
+    assert book_count(library, 5) == 0
+    library.execute(
+        "INSERT INTO Books (book_id, title, author_id, genre_id, isbn) "
+        "VALUES (7, 'Мертвые души', 5, 3, 'isbn-7')"
+    )
+    library.execute(
+        "INSERT INTO Book_Issues (book_id, reader_id, issue_date) VALUES (7, 1, '2024-03-01')"
+    )
+    library.commit()
+    assert get_stat(library, "authors") == 5
+    assert get_stat(library, "books") == 7
+    assert get_stat(library, "issues") == 7
+    assert get_stat(library, "open_issues") == 5
+    assert book_count(library, 5) == 1
+    assert check_stats(library) == {}
+
+
+def test_update_moves_book_and_closes_issue(library):
+    library.execute("UPDATE Books SET author_id = 3 WHERE book_id = 1")
+    library.execute("UPDATE Book_Issues SET return_date = '2024-02-01' WHERE issue_id = 1")
+    library.commit()
+    assert book_count(library, 1) == 1
+    assert book_count(library, 3) == 2
+    assert get_stat(library, "open_issues") == 3
+    # Изменение даты возврата у закрытой выдачи счетчик не трогает
+    library.execute("UPDATE Book_Issues SET return_date = '2024-02-03' WHERE issue_id = 1")
+    assert get_stat(library, "open_issues") == 3
+    library.execute("UPDATE Book_Issues SET return_date = NULL WHERE issue_id = 1")
+    assert get_stat(library, "open_issues") == 4
+    assert check_stats(library) == {}
+
+
+def test_delete_updates_counters(library):
+    library.execute("DELETE FROM Book_Issues WHERE issue_id = 2")
+    library.execute("DELETE FROM Book_Issues WHERE issue_id = 3")
+    library.commit()
+    assert get_stat(library, "issues") == 4
+    assert get_stat(library, "open_issues") == 3
+    assert check_stats(library) == {}
+
+
+def test_cascade_delete_updates_counters(library):
+    # Толстой: две книги, по одной из них открытая выдача
+    library.execute("DELETE FROM Authors WHERE author_id = 1")
+    library.commit()
+    assert get_stats(library) == {
+        "authors": 3, "genres": 4, "books": 4, "readers": 4, "issues": 4, "open_issues": 2,
+    }
+    assert book_count(library, 1) is None
+    # Удаление жанра каскадно удаляет книги других авторов
+    library.execute("DELETE FROM Genres WHERE genre_id = 1")
+    library.commit()
+    assert book_count(library, 2) == 0
+    assert check_stats(library) == {}
@@ -0,0 +1,35 @@
+import sqlite3
+
+from pool import ConnectionPool
+
+
+def test_release_after_reconfigure_closes_old_connection(blog):
+    old_pool = blog.get_pool()
+    conn = blog.get_connection()
+    new_pool = blog.configure_pool(size=old_pool.size)
+
+    blog.release_connection(conn)
+
+    assert old_pool.stats()["created"] == 0
+    assert new_pool.stats() == {"size": new_pool.size, "created": 0, "idle": 0}
+    # Соединение старого пула закрыто, а не передано новому
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        pass
+    else:
+        raise AssertionError("соединение старого пула осталось открытым")
+    assert blog.add_user("ivan", "ivan@mail.com") is not None
+
+
+def test_release_rejects_foreign_connection(tmp_path):
+    first = ConnectionPool(str(tmp_path / "a.db"), size=1)
+    second = ConnectionPool(str(tmp_path / "a.db"), size=1)
+    conn = first.acquire()
+    assert first.owns(conn) and not second.owns(conn)
+
+    second.release(conn)
+
+    assert second.stats() == {"size": 1, "created": 0, "idle": 0}
+    first.close()
+    second.close()
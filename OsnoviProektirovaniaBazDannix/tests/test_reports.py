@@ -0,0 +1,43 @@
+import os
+import shutil
+import signal
+
+import pytest
+
+import reports
+
+
+@pytest.fixture
+def blog_copy(blog, tmp_path):
+    """Копия базы блога с 300 постами под именем с '#'"""
+    user = blog.add_user("ivan", "ivan@mail.com")
+    category = blog.add_category("Python")
+    blog.create_posts_bulk((f"Пост {i}", "текст", user, category) for i in range(300))
+    blog.get_pool().close()
+    path = str(tmp_path / "a#b.db")
+    shutil.copy(blog.DB_PATH, path)
+    return path
+
+
+def test_readonly_uri_escapes_file_name(blog_copy, tmp_path):
+    tasks, failures = reports.plan_reports([blog_copy], ["posts"])
+    assert failures == []
+    events = list(reports.run_reports(tasks, workers=1))
+    assert events[-1].finished and events[-1].error is None
+    assert events[-1].rows == 300
+    # Без экранирования SQLite открыл бы пустую базу "a" по фрагменту URI
+    assert not os.path.exists(tmp_path / "a")
+
+
+def test_run_survives_killed_worker(blog_copy):
+    tasks, _ = reports.plan_reports([blog_copy], ["posts"])
+    killed = False
+    events = []
+    for event in reports.run_reports(tasks, workers=1, batch_size=1):
+        events.append(event)
+        if not killed:
+            for child in reports.multiprocessing.active_children():
+                os.kill(child.pid, signal.SIGKILL)
+            killed = True
+    assert events[-1].finished
+    assert events[-1].error is not None
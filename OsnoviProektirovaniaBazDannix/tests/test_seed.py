@@ -0,0 +1,56 @@
+import db1
+from library_stats import check_stats
+from migrations import apply_migrations
+
+
+def test_reseed_keeps_returns(library):
+    library.execute("UPDATE Book_Issues SET return_date = '2024-02-01' WHERE issue_id = 1")
+    library.commit()
+    db1.seed(library)
+    assert library.execute(
+        "SELECT return_date FROM Book_Issues WHERE issue_id = 1"
+    ).fetchone()[0] == "2024-02-01"
+    assert library.execute("SELECT COUNT(*) FROM Book_Issues").fetchone()[0] == 6
+    assert check_stats(library) == {}
+
+
+def test_reseed_updates_reference_data(library):
+    library.execute("UPDATE Genres SET genre_name = 'Повесть' WHERE genre_id = 2")
+    library.commit()
+    db1.seed(library)
+    assert library.execute(
+        "SELECT genre_name FROM Genres WHERE genre_id = 2"
+    ).fetchone()[0] == "Рассказ"
+
+
+def test_author_without_birth_year_is_not_duplicated(library, tmp_path):
+    path = tmp_path / "authors.csv"
+    path.write_text("first_name,last_name,birth_year\nГомер,Древний,\nНиколай,Гоголь,1809\n",
+                    encoding="utf-8")
+    db1.load(library, "Authors", str(path))
+    db1.load(library, "Authors", str(path), reset=True)
+    rows = library.execute(
+        "SELECT first_name, birth_year FROM Authors WHERE author_id > 4 ORDER BY author_id"
+    ).fetchall()
+    assert rows == [("Гомер", None), ("Николай", 1809)]
+    assert check_stats(library) == {}
+
+
+def test_migration_merges_authors_without_birth_year(tmp_path):
+    conn = db1.connect(str(tmp_path / "old.db"))
+    apply_migrations(conn, db1.MIGRATIONS[:7])
+    conn.execute("INSERT INTO Genres (genre_id, genre_name) VALUES (1, 'Эпос')")
+    conn.executemany(
+        "INSERT INTO Authors (author_id, first_name, last_name) VALUES (?, 'Гомер', 'Древний')",
+        [(1,), (2,)]
+    )
+    conn.executemany(
+        "INSERT INTO Books (title, author_id, genre_id) VALUES (?, ?, 1)",
+        [("Илиада", 1), ("Одиссея", 2)]
+    )
+    conn.commit()
+    db1.migrate(conn)
+    assert conn.execute("SELECT author_id FROM Authors").fetchall() == [(1,)]
+    assert conn.execute("SELECT DISTINCT author_id FROM Books").fetchall() == [(1,)]
+    assert check_stats(conn) == {}
+    conn.close()
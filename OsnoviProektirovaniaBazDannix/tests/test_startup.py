@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import startup
+
+_HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module", sorted(startup.STARTUP_BUDGETS))
+def test_import_time_within_budget(module):
+    # Отдельный процесс: модули, уже импортированные pytest, не искажают замер
+    result = subprocess.run(
+        [sys.executable, os.path.join(_HERE, "startup.py"), module],
+        capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_db_import_defers_optional_modules():
+    code = (
+        "import sys, db; "
+        "print(','.join(m for m in ('archive', 'search', 'feed', 'comment_queue', "
+        "'instrumentation', 'concurrent.futures', 'http.server') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=_HERE,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""